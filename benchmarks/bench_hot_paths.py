@@ -0,0 +1,283 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Micro benchmarks of the CPU hot paths of the client on fixture payloads (see fixtures.py), without any
+network: date parsing, decoding of response bodies, paging through wave data, sorting the samples of many
+Spotters, unpaginating search results and updating Spotters from their latest data.
+
+Results can be written as JSON and compared against the results of an earlier run, ex. before upgrading:
+
+Usage: python benchmarks/bench_hot_paths.py [--json results.json] [--compare baseline.json] [--threshold 1.25]
+                                            [--filter NAME] [--repeat N]
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from bisect import bisect_right
+from datetime import datetime
+from pysofar import SofarConnection
+from pysofar.decoding import default_decoder, stdlib_decoder
+from pysofar.records import to_records
+from pysofar.sofar import WaveDataQuery, _sort_by_time, _worker, unpaginate
+from pysofar.spotter import Spotter
+from pysofar.tools import iso_to_epoch_ms, parse_date
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fixtures  # noqa: E402
+
+
+class _FixtureQuery(WaveDataQuery):
+    # wave-data query answered from a list of samples, with the exclusive start and inclusive end of the endpoint
+    __slots__ = ('samples', 'timestamps')
+
+    def execute(self):
+        start = bisect_right(self.timestamps, self._params.get('startDate', ''))
+        end = bisect_right(self.timestamps, self._params.get('endDate', self.timestamps[-1]))
+        dkey = 'frequencyData' if self._params.get('includeFrequencyData') == 'true' else 'waves'
+        return {'spotterId': self.spotter_id, dkey: self.samples[start:min(end, start + self._limit)]}
+
+
+# ---------------------------------- Benchmarks -------------------------------------- #
+# Each benchmark is set up once and returns the function to time and the number of items it processes per call
+
+def _parse_date_api():
+    timestamps = [sample['timestamp'] for sample in fixtures.load('wave_data')['data']['waves']]
+    return lambda: [parse_date(timestamp) for timestamp in timestamps], len(timestamps)
+
+
+def _parse_date_other():
+    dates = [timestamp[:10] for timestamp in
+             (sample['timestamp'] for sample in fixtures.load('wave_data')['data']['waves'])]
+    return lambda: [parse_date(date) for date in dates], len(dates)
+
+
+def _epoch_ms():
+    timestamps = [sample['timestamp'] for sample in fixtures.load('wave_data')['data']['waves']]
+    return lambda: [iso_to_epoch_ms(timestamp) for timestamp in timestamps], len(timestamps)
+
+
+def _decoder(decoder, name):
+    def setup():
+        body = fixtures.dumps(fixtures.load(name))
+        return lambda: decoder(body), len(body)
+    return setup
+
+
+def _wave_data_walk(data_type, fixture):
+    def setup():
+        dkey = 'frequencyData' if data_type == 'frequency' else 'waves'
+        samples = fixtures.load(fixture)['data'][dkey]
+        api = SofarConnection(custom_token='benchmark-token')
+        worker = _worker(data_type)
+
+        def walk():
+            query = _FixtureQuery('SPOT-0001', limit=100 if data_type == 'frequency' else 500,
+                                  start_date='2000-01-01', end_date=samples[-1]['timestamp'], api=api)
+            query.samples = samples
+            query.timestamps = [sample['timestamp'] for sample in samples]
+            return worker(query)
+
+        return walk, len(samples)
+    return setup
+
+
+def _sort_spotters(spotters=20):
+    def setup():
+        page = fixtures.load('wave_data')['data']['waves']
+        # the samples of every Spotter in time order, one Spotter after another as collected by worker_wrapper
+        records = [{**sample, 'spotterId': f'SPOT-{n:04d}'} for n in range(spotters) for sample in page]
+        return lambda: _sort_by_time(list(records)), len(records)
+    return setup
+
+
+def _search_unpaginate():
+    body = fixtures.dumps(fixtures.load('search'))
+    decoder = default_decoder()
+
+    def get_function(endpoint_suffix, params):
+        return decoder(body)
+
+    return lambda: list(unpaginate(get_function, 'search', {})), len(decoder(body)['data'])
+
+
+def _spotter_update():
+    fleet = [response['data'] for response in fixtures.load('latest_data')]
+    spotters = [Spotter(data['spotterId'], data['spotterName']) for data in fleet]
+
+    def update():
+        for spotter, data in zip(spotters, fleet):
+            spotter._apply_latest_data(data)
+
+    return update, len(fleet)
+
+
+def _records():
+    data = fixtures.load('wave_data')['data']
+    waves = data['waves']
+    return lambda: to_records({'waves': list(waves)}), len(waves)
+
+
+def _arrays():
+    from pysofar.arrays import records_to_arrays
+    waves = fixtures.load('wave_data')['data']['waves']
+    return lambda: records_to_arrays(waves), len(waves)
+
+
+def _spectra():
+    from pysofar.spectra import SpectralData
+    spectra = fixtures.load('frequency_data')['data']['frequencyData']
+    return lambda: SpectralData.from_records(spectra), len(spectra)
+
+
+BENCHMARKS = {
+    'parse_date.api_timestamps': _parse_date_api,
+    'parse_date.dates': _parse_date_other,
+    'iso_to_epoch_ms': _epoch_ms,
+    'decode.stdlib.wave_data': _decoder(stdlib_decoder, 'wave_data'),
+    'decode.stdlib.frequency_data': _decoder(stdlib_decoder, 'frequency_data'),
+    'decode.default.wave_data': _decoder(default_decoder(), 'wave_data'),
+    'decode.default.frequency_data': _decoder(default_decoder(), 'frequency_data'),
+    'worker.waves': _wave_data_walk('waves', 'wave_data'),
+    'worker.frequency': _wave_data_walk('frequency', 'frequency_data'),
+    'worker_wrapper.sort': _sort_spotters(),
+    'search.unpaginate': _search_unpaginate,
+    'spotter.update': _spotter_update,
+    'records.to_records': _records,
+    'arrays.records_to_arrays': _arrays,
+    'spectra.from_records': _spectra,
+}
+
+# benchmarks needing optional dependencies
+_REQUIRES = {'arrays.records_to_arrays': 'numpy', 'spectra.from_records': 'numpy'}
+
+
+# ---------------------------------- Running -------------------------------------- #
+def _available(name):
+    module = _REQUIRES.get(name)
+    if module is None:
+        return True
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def run(name: str, repeat: int = 5) -> dict:
+    """
+    Times a benchmark: the number of calls per run is chosen to take at least 0.2 seconds, best and median of
+    repeat runs
+
+    :param name: Name of the benchmark
+    :param repeat: Number of runs
+
+    :return: Dictionary of the seconds per call (best and median), calls per run, items per call and the
+             microseconds per item of the best run
+    """
+    fn, items = BENCHMARKS[name]()
+    fn()
+
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    times = [elapsed / number for elapsed in timer.repeat(repeat=repeat, number=number)]
+
+    best = min(times)
+    return {'best': best, 'median': statistics.median(times), 'number': number, 'repeat': repeat,
+            'items': items, 'us_per_item': best / items * 1e6}
+
+
+def metadata() -> dict:
+    """
+
+    :return: Description of the environment of the run
+    """
+    versions = {}
+    for module in ('pysofar', 'numpy', 'orjson', 'requests'):
+        try:
+            from importlib.metadata import version
+            versions[module] = version(module)
+        except Exception:
+            versions[module] = None
+
+    return {
+        'created': parse_date(datetime.utcnow()),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'versions': versions,
+        'decoder': getattr(default_decoder(), '__module__', None),
+        'fixtures': {name: 'recorded' if os.path.exists(os.path.join(fixtures.FIXTURE_DIR, f'{name}.json.gz'))
+                     else 'generated' for name in fixtures.GENERATORS},
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+
+    :param results: The benchmarks of this run
+    :param baseline: The benchmarks of an earlier run
+    :param threshold: Ratio of the best times above which a benchmark counts as a regression
+
+    :return: Names of the benchmarks slower than the baseline by more than the threshold
+    """
+    regressions = []
+
+    print(f'\n{"benchmark":<32}{"baseline us":>14}{"now us":>12}{"ratio":>8}')
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        before, now = baseline[name]['best'] * 1e6, result['best'] * 1e6
+        ratio = now / before
+        flag = '  slower' if ratio > threshold else ''
+        print(f'{name:<32}{before:>14.1f}{now:>12.1f}{ratio:>8.2f}{flag}')
+
+        if ratio > threshold:
+            regressions.append(name)
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--json', help='path to write the results to')
+    parser.add_argument('--compare', help='path of the results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='slowdown ratio counted as a regression, the exit status is 1 if any')
+    parser.add_argument('--filter', default='', help='only run the benchmarks whose name contains this')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark')
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name and _available(name)]
+
+    print(f'{"benchmark":<32}{"us / call":>12}{"items":>8}{"us / item":>12}')
+    results = {}
+    for name in names:
+        result = results[name] = run(name, args.repeat)
+        print(f'{name:<32}{result["best"] * 1e6:>12.1f}{result["items"]:>8}{result["us_per_item"]:>12.3f}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'meta': metadata(), 'benchmarks': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['benchmarks']
+        if len(compare(results, baseline, args.threshold)) > 0:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
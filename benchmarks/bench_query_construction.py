@@ -0,0 +1,59 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Benchmark of the cost of constructing queries, with and without a shared client context
+
+Usage: python benchmarks/bench_query_construction.py [--number N]
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from pysofar import SofarConnection
+from pysofar.sofar import WaveDataQuery
+
+import argparse
+import sys
+import timeit
+import tracemalloc
+
+
+def _per_query(statement, number):
+    # best of 5 runs, in microseconds per constructed query
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def _size(factory, count=1000):
+    # allocated bytes per constructed query
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    queries = [factory(i) for i in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del queries
+    return allocated / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--number', type=int, default=2000, help='queries constructed per run')
+    args = parser.parse_args(argv)
+
+    api = SofarConnection(custom_token='benchmark-token')
+    args_of = {'limit': 500, 'start_date': '2021-01-01', 'end_date': '2021-02-01'}
+
+    shared = _per_query(lambda: WaveDataQuery('SPOT-0001', api=api, **args_of), args.number)
+    standalone = _per_query(lambda: WaveDataQuery('SPOT-0001', **args_of), max(1, args.number // 10))
+
+    print(f'{"":<28}{"us / query":>12}{"bytes / query":>16}')
+    print(f'{"shared context (api=...)":<28}{shared:>12.1f}'
+          f'{_size(lambda i: WaveDataQuery(f"SPOT-{i:04d}", api=api, **args_of)):>16.0f}')
+    print(f'{"standalone (reads env)":<28}{standalone:>12.1f}'
+          f'{_size(lambda i: WaveDataQuery(f"SPOT-{i:04d}", **args_of)):>16.0f}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Fixture payloads of the benchmarks: wave-data pages with frequency data and directional moments, search
+pages and latest-data for a fleet of Spotters.
+
+Recorded responses in benchmarks/fixtures/<name>.json.gz are used when present. Otherwise realistic payloads
+(same fields, sizes and number formats as the API) are generated with a fixed seed, so every run measures the
+same data. To record responses of your own account (needs a token, see the README):
+
+Usage: python benchmarks/fixtures.py --record SPOTTER_ID [--start-date 2021-01-01] [--end-date 2021-01-08]
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from datetime import datetime, timedelta
+from pysofar.tools import parse_date
+
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import sys
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# frequency axis of the Spotter spectra, 0.0293 to 0.6543 Hz
+FREQUENCIES = [round(0.0293 + 0.0098 * i, 4) for i in range(39)] + \
+              [round(0.4121 + 0.0195 * i, 4) for i in range(13)]
+
+START = datetime(2021, 1, 1)
+SEED = 1
+
+
+def load(name: str):
+    """
+
+    :param name: Name of the fixture: 'wave_data', 'frequency_data', 'search' or 'latest_data'
+
+    :return: The recorded response body of the fixture if there is one, else the generated one
+    """
+    path = os.path.join(FIXTURE_DIR, f'{name}.json.gz')
+    if os.path.exists(path):
+        with gzip.open(path, 'rt') as f:
+            return json.load(f)
+
+    return GENERATORS[name]()
+
+
+def dumps(payload) -> bytes:
+    """
+
+    :return: The payload encoded as a response body
+    """
+    return json.dumps(payload).encode()
+
+
+# ---------------------------------- Generated payloads -------------------------------------- #
+def _location(rng, i):
+    return {'latitude': round(37.5 + 0.001 * math.sin(i / 20) + rng.gauss(0, 1e-5), 6),
+            'longitude': round(-122.8 + 0.001 * math.cos(i / 20) + rng.gauss(0, 1e-5), 6)}
+
+
+def _wave(rng, timestamp, i):
+    return {
+        'significantWaveHeight': round(1.5 + 0.5 * math.sin(i / 48) + rng.gauss(0, 0.05), 2),
+        'peakPeriod': round(rng.uniform(6, 16), 2),
+        'meanPeriod': round(rng.uniform(5, 10), 2),
+        'peakDirection': round(rng.uniform(250, 310), 3),
+        'peakDirectionalSpread': round(rng.uniform(10, 40), 3),
+        'meanDirection': round(rng.uniform(250, 310), 3),
+        'meanDirectionalSpread': round(rng.uniform(20, 50), 3),
+        'timestamp': timestamp,
+        **_location(rng, i),
+        'processing_source': 'embedded',
+    }
+
+
+def _spectrum(rng, timestamp, i):
+    peak = rng.uniform(0.06, 0.15)
+    density = [round(2.0 * math.exp(-((f - peak) / 0.02) ** 2) + 1e-5 / f ** 2 + rng.uniform(0, 1e-3), 6)
+               for f in FREQUENCIES]
+    moments = {key: [round(rng.uniform(-1, 1), 6) for _ in FREQUENCIES] for key in ('a1', 'b1', 'a2', 'b2')}
+
+    return {
+        'frequency': FREQUENCIES,
+        'df': [0.0098] * 39 + [0.0195] * 13,
+        'varianceDensity': density,
+        'direction': [round(rng.uniform(0, 360), 3) for _ in FREQUENCIES],
+        'directionalSpread': [round(rng.uniform(10, 80), 3) for _ in FREQUENCIES],
+        **moments,
+        'timestamp': timestamp,
+        **_location(rng, i),
+        'processing_source': 'embedded',
+    }
+
+
+def wave_data(samples: int = 500, spotter_id: str = 'SPOT-0001'):
+    """
+
+    :return: A wave-data response with a page of 500 wave samples and track points, 30 minutes apart
+    """
+    rng = random.Random(SEED)
+    timestamps = [parse_date(START + timedelta(minutes=30 * i)) for i in range(samples)]
+
+    return {'data': {
+        'spotterId': spotter_id,
+        'waves': [_wave(rng, timestamp, i) for i, timestamp in enumerate(timestamps)],
+        'track': [{'timestamp': timestamp, **_location(rng, i), 'processing_source': 'embedded'}
+                  for i, timestamp in enumerate(timestamps)],
+        'frequencyData': [],
+        'wind': [],
+        'surfaceTemp': [],
+        'barometerData': [],
+        'partitionData': [],
+    }}
+
+
+def frequency_data(samples: int = 100, spotter_id: str = 'SPOT-0001'):
+    """
+
+    :return: A wave-data response with a page of 100 spectra with directional moments, and their wave samples
+    """
+    rng = random.Random(SEED)
+    timestamps = [parse_date(START + timedelta(minutes=30 * i)) for i in range(samples)]
+
+    return {'data': {
+        'spotterId': spotter_id,
+        'waves': [_wave(rng, timestamp, i) for i, timestamp in enumerate(timestamps)],
+        'track': [],
+        'frequencyData': [_spectrum(rng, timestamp, i) for i, timestamp in enumerate(timestamps)],
+        'wind': [],
+        'surfaceTemp': [],
+        'barometerData': [],
+        'partitionData': [],
+    }}
+
+
+def search(samples: int = 500, spotters: int = 25):
+    """
+
+    :return: A search response with a page of wave samples of many Spotters
+    """
+    rng = random.Random(SEED)
+    data = []
+    for i in range(samples):
+        spotter_id = f'SPOT-{i % spotters:04d}'
+        timestamp = parse_date(START + timedelta(minutes=30 * (i // spotters)))
+        data.append({'spotterId': spotter_id, **_wave(rng, timestamp, i)})
+
+    return {'data': data, 'metadata': {'page': {'hasMoreData': False, 'nextPage': None}}}
+
+
+def latest_data(spotters: int = 500):
+    """
+
+    :return: List of latest-data responses of a fleet of Spotters, with wind, barometer and surface temperature
+    """
+    rng = random.Random(SEED)
+    responses = []
+    for n in range(spotters):
+        spotter_id = f'SPOT-{n:04d}'
+        timestamps = [parse_date(START + timedelta(minutes=30 * i + n)) for i in range(3)]
+        responses.append({'data': {
+            'spotterId': spotter_id,
+            'spotterName': f'Spotter {n}',
+            'payloadType': 'waves',
+            'batteryPower': rng.randint(20, 100),
+            'batteryVoltage': round(rng.uniform(3.5, 4.2), 2),
+            'solarVoltage': round(rng.uniform(0, 6), 2),
+            'humidity': round(rng.uniform(5, 40), 1),
+            'track': [{'timestamp': timestamp, **_location(rng, i)} for i, timestamp in enumerate(timestamps)],
+            'waves': [_wave(rng, timestamp, i) for i, timestamp in enumerate(timestamps)],
+            'frequencyData': [],
+            'wind': [{'speed': round(rng.uniform(0, 15), 2), 'direction': round(rng.uniform(0, 360), 1),
+                      'seasurfaceId': 1, 'timestamp': timestamp, **_location(rng, i)}
+                     for i, timestamp in enumerate(timestamps)],
+            'barometerData': [{'value': round(rng.uniform(990, 1030), 1), 'units': 'hPa', 'timestamp': timestamp,
+                               **_location(rng, i)} for i, timestamp in enumerate(timestamps)],
+            'surfaceTemp': [{'degrees': round(rng.uniform(10, 20), 2), 'timestamp': timestamp, **_location(rng, i)}
+                            for i, timestamp in enumerate(timestamps)],
+        }})
+
+    return responses
+
+
+GENERATORS = {
+    'wave_data': wave_data,
+    'frequency_data': frequency_data,
+    'search': search,
+    'latest_data': latest_data,
+}
+
+
+# ---------------------------------- Recording -------------------------------------- #
+def record(spotter_id: str, start_date: str, end_date: str):
+    """
+    Records the responses of the API for a Spotter of your account as fixtures
+
+    :param spotter_id: The Spotter whose data is recorded
+    :param start_date: Start of the recorded period
+    :param end_date: End of the recorded period
+    """
+    from pysofar.sofar import SofarApi, WaveDataQuery
+
+    api = SofarApi()
+
+    waves = WaveDataQuery(spotter_id, limit=500, start_date=start_date, end_date=end_date, api=api)
+    waves.track(True)
+
+    spectra = WaveDataQuery(spotter_id, limit=100, start_date=start_date, end_date=end_date, api=api)
+    spectra.frequency(True)
+    spectra.directional_moments(True)
+
+    # the bodies of the responses, as the queries and api methods return their data
+    fixtures = {
+        'wave_data': {'data': waves.execute()},
+        'frequency_data': {'data': spectra.execute()},
+        'latest_data': [{'data': api.get_latest_data(_id, include_wind_data=True, include_barometer_data=True,
+                                                     include_surface_temp_data=True)}
+                        for _id in api.device_ids],
+    }
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, payload in fixtures.items():
+        with gzip.open(os.path.join(FIXTURE_DIR, f'{name}.json.gz'), 'wt') as f:
+            json.dump(payload, f)
+        print(f'recorded {name}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--record', metavar='SPOTTER_ID', required=True, help='Spotter to record the data of')
+    parser.add_argument('--start-date', default=parse_date(datetime.utcnow() - timedelta(days=7)))
+    parser.add_argument('--end-date', default=parse_date(datetime.utcnow()))
+    args = parser.parse_args(argv)
+
+    record(args.record, args.start_date, args.end_date)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Load driver running the fleet wide methods of the client (get_all_data, get_spotters and its refresh,
+search, cellular signal metrics) against the local mock of the Wave API (benchmarks/mock_server.py), reporting the
+throughput, requests, retries and peak memory of each.
+
+The mock server runs in its own process, so generating and encoding its responses does not compete with the
+client for the interpreter. Pass --url to use a server started separately instead.
+
+Usage: python benchmarks/load_fleet.py [--spotters 1000] [--days 1] [--latency 0.05] [--error-rate 0.01]
+                                       [--rate-limit 200] [--max-concurrency 16] [--scenarios all_data spotters]
+                                       [--memory] [--json results.json]
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from datetime import timedelta
+from pysofar.metrics import MetricsCollector
+from pysofar.tools import epoch_ms_to_iso, iso_to_epoch_ms
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def _start_server(args):
+    # the mock server in a child process, and the url it listens on
+    command = [sys.executable, '-m', 'mock_server', '--port', '0', '--spotters', str(args.spotters),
+               '--cadence', str(args.cadence), '--latency', *[str(value) for value in args.latency],
+               '--error-rate', str(args.error_rate)]
+    if args.rate_limit is not None:
+        command += ['--rate-limit', str(args.rate_limit)]
+
+    # the mock server is a module next to this script
+    path = [os.path.dirname(os.path.abspath(__file__))] + sys.path
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(path))
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, env=environment)
+    return server, server.stdout.readline().strip()
+
+
+# ---------------------------------- Scenarios -------------------------------------- #
+# Each scenario runs against the api and returns the number of samples or Spotters it received
+
+def _all_data(api, start, end, state):
+    data = api.get_all_data(start, end)
+    return sum(len(samples) for samples in data.values())
+
+
+def _wave_data(api, start, end, state):
+    return len(api.get_wave_data(start, end)['waves'])
+
+
+def _spotters(api, start, end, state):
+    state['spotters'] = api.get_spotters()
+    return len(state['spotters'])
+
+
+def _refresh(api, start, end, state):
+    if 'spotters' not in state:
+        state['spotters'] = api.get_spotters()
+    return len(api.get_spotters(state['spotters']))
+
+
+def _search(api, start, end, state):
+    return len(api.search('envelope', [(-160, 20), (-120, 50)], start, end, page_size=500))
+
+
+def _cellular(api, start, end, state):
+    from pysofar.sofar import CellularSignalMetricsQuery
+
+    def _metrics(spotter_id):
+        return len(CellularSignalMetricsQuery(spotter_id, limit=100, api=api).execute())
+
+    return sum(api.scheduler.map(_metrics, api.device_ids, endpoint='cellular-signal-metrics'))
+
+
+SCENARIOS = {
+    'all_data': _all_data,
+    'wave_data': _wave_data,
+    'spotters': _spotters,
+    'refresh': _refresh,
+    'search': _search,
+    'cellular': _cellular,
+}
+
+
+def run(name: str, api, collector: MetricsCollector, start: str, end: str, state: dict,
+        memory: bool = False) -> dict:
+    """
+    Runs a scenario
+
+    :param name: Name of the scenario
+    :param api: SofarApi pointed at the mock server, with the collector as hooks
+    :param collector: The MetricsCollector of the api
+    :param start: Start of the period of the data requested
+    :param end: End of the period
+    :param state: Dictionary shared by the scenarios of a run, ex. the Spotters a refresh updates
+    :param memory: Set to True to trace the peak memory allocated by the scenario (slows it down)
+
+    :return: Dictionary of the seconds taken, items received, requests, retries and errors, the throughputs, and
+             the peak traced memory in bytes if traced
+    """
+    collector.reset()
+    if memory:
+        tracemalloc.start()
+
+    started = time.perf_counter()
+    items = SCENARIOS[name](api, start, end, state)
+    seconds = time.perf_counter() - started
+
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    endpoints = collector.summary()['endpoints'].values()
+    requests = sum(endpoint['requests'] for endpoint in endpoints)
+
+    return {
+        'seconds': seconds,
+        'items': items,
+        'items_per_second': items / seconds,
+        'requests': requests,
+        'requests_per_second': requests / seconds,
+        'retries': sum(endpoint['retries'] for endpoint in endpoints),
+        'errors': sum(endpoint['errors'] for endpoint in endpoints),
+        'bytes_in': sum(endpoint['bytes_in'] for endpoint in endpoints),
+        'peak_traced_bytes': peak,
+    }
+
+
+def _max_rss():
+    # peak resident memory of this process in bytes, None where not available
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='url of a running mock server, otherwise one is started')
+    parser.add_argument('--spotters', type=int, default=1000, help='number of Spotters of the mock fleet')
+    parser.add_argument('--cadence', type=float, default=1800.0, help='seconds between reports of a Spotter')
+    parser.add_argument('--days', type=float, default=1.0, help='length of the period of data requested')
+    parser.add_argument('--latency', type=float, nargs='+', default=[0.0],
+                        help='seconds each response is delayed by, or the low and high of a uniform delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with a 500')
+    parser.add_argument('--rate-limit', type=float, default=None, help='requests per second the server allows')
+    parser.add_argument('--max-concurrency', type=int, default=None, help='max_concurrency of the SofarApi')
+    parser.add_argument('--client-rate-limit', type=float, default=None, help='rate_limit of the SofarApi')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--memory', action='store_true', help='trace the peak memory of every scenario')
+    parser.add_argument('--json', help='path to write the results to')
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = _start_server(args)
+
+    # the mock fleet reports at real time, so the period ends just before now
+    end = epoch_ms_to_iso(int(time.time() * 1000))
+    start = epoch_ms_to_iso(iso_to_epoch_ms(end) - int(timedelta(days=args.days).total_seconds() * 1000))
+
+    os.environ.update({'WF_URL': f'{url}/api', 'WF_USER_REST_URL': f'{url}/user-rest'})
+    from pysofar.sofar import SofarApi
+
+    collector = MetricsCollector()
+    options = {'max_concurrency': args.max_concurrency} if args.max_concurrency is not None else {}
+    api = SofarApi(custom_token='mock', rate_limit=args.client_rate_limit, hooks=collector, **options)
+
+    results = {}
+    state = {}
+    try:
+        print(f'{"scenario":<12}{"seconds":>10}{"items":>10}{"items/s":>12}{"requests":>10}{"req/s":>10}'
+              f'{"retries":>9}{"errors":>8}{"peak MB":>9}')
+        for name in args.scenarios:
+            result = results[name] = run(name, api, collector, start, end, state, args.memory)
+            peak = f'{result["peak_traced_bytes"] / 1e6:>9.1f}' if result['peak_traced_bytes'] is not None else \
+                f'{"-":>9}'
+            print(f'{name:<12}{result["seconds"]:>10.2f}{result["items"]:>10}{result["items_per_second"]:>12.0f}'
+                  f'{result["requests"]:>10}{result["requests_per_second"]:>10.0f}{result["retries"]:>9}'
+                  f'{result["errors"]:>8}{peak}')
+    finally:
+        api.close()
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    rss = _max_rss()
+    if rss is not None:
+        print(f'\npeak resident memory of the client process: {rss / 1e6:.1f} MB')
+
+    if args.json:
+        meta = {'spotters': args.spotters, 'days': args.days, 'latency': args.latency, 'error_rate': args.error_rate,
+                'rate_limit': args.rate_limit, 'max_concurrency': args.max_concurrency, 'max_rss_bytes': rss}
+        with open(args.json, 'w') as f:
+            json.dump({'meta': meta, 'scenarios': results}, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,624 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: A local mock of the Wave API serving a synthetic fleet of Spotters, to test and size clients against
+fleets of thousands of Spotters without touching production.
+
+It mimics /devices, /device-radius, /latest-data, /wave-data (limits of 500 samples per page, 100 for frequency
+data, paged by timestamp), /search (pages linked by nextPage), /change-name and the user-rest
+devices/<id>/cellular-signal-metrics endpoint, with configurable latency, error rate and 429 throttling.
+
+Usage: python benchmarks/mock_server.py [--port 8000] [--spotters 1000] [--latency 0.05] [--error-rate 0.01]
+                                        [--rate-limit 100]
+
+Then point the client at it with WF_URL=http://127.0.0.1:8000/api and
+WF_USER_REST_URL=http://127.0.0.1:8000/user-rest (see MockServer.environ)
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pysofar.tools import epoch_ms_to_iso, iso_to_epoch_ms
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import argparse
+import heapq
+import json
+import math
+import random
+import sys
+import threading
+import time
+
+# frequency axis of the Spotter spectra, 0.0293 to 0.6543 Hz
+FREQUENCIES = [round(0.0293 + 0.0098 * i, 4) for i in range(39)] + [round(0.4121 + 0.0195 * i, 4) for i in range(13)]
+BANDWIDTHS = [0.0098] * 39 + [0.0195] * 13
+_SPREADS = [round(20 + 60 * f, 3) for f in FREQUENCIES]
+_TAILS = [1e-5 / f ** 2 for f in FREQUENCIES]
+
+# maximum samples per wave-data page, and per page including frequency data
+WAVE_DATA_LIMIT = 500
+FREQUENCY_DATA_LIMIT = 100
+
+# maximum results per search page
+SEARCH_PAGE_SIZE = 500
+
+_EARTH_RADIUS = 6371000.0
+
+
+class SyntheticFleet:
+    """
+    A fleet of Spotters reporting at a fixed cadence, each from its own offset, since the origin. Samples are
+    computed from the Spotter and report number when requested, so fleets of any size and period take no memory
+    """
+    def __init__(self, spotters: int = 1000, cadence: float = 1800.0, origin: str = '2020-01-01T00:00:00.000Z',
+                 seed: int = 1, clock=time.time):
+        """
+
+        :param spotters: Number of Spotters of the account
+        :param cadence: Seconds between the reports of a Spotter
+        :param origin: Time of the first reports of the fleet
+        :param seed: Seed of the Spotters' locations and offsets
+        :param clock: Clock in epoch seconds, the time of the latest reports
+        """
+        rng = random.Random(seed)
+
+        self.cadence = int(cadence * 1000)
+        self.origin = iso_to_epoch_ms(origin)
+        self.clock = clock
+
+        self.ids = [f'SPOT-{n:04d}' for n in range(spotters)]
+        self.names = {spotter_id: f'Spotter {n}' for n, spotter_id in enumerate(self.ids)}
+        self.index = {spotter_id: n for n, spotter_id in enumerate(self.ids)}
+        self.offsets = [rng.randrange(self.cadence) for _ in self.ids]
+        # spread over the north east pacific
+        self.homes = [(rng.uniform(20.0, 50.0), rng.uniform(-160.0, -120.0)) for _ in self.ids]
+
+    def now(self) -> int:
+        return int(self.clock() * 1000)
+
+    # ---------------------------------- Report times -------------------------------------- #
+    def _report(self, n: int, k: int) -> int:
+        return self.origin + self.offsets[n] + k * self.cadence
+
+    def reports_after(self, n: int, after: int, until: int = None, limit: int = None) -> range:
+        """
+
+        :param n: Index of the Spotter
+        :param after: Exclusive lower bound, epoch ms
+        :param until: Inclusive upper bound, epoch ms. Defaults to now
+        :param limit: Optional maximum number of reports
+
+        :return: Range of the numbers of the reports in the period
+        """
+        until = self.now() if until is None else min(until, self.now())
+        first = max(0, (after - self.origin - self.offsets[n]) // self.cadence + 1)
+        last = (until - self.origin - self.offsets[n]) // self.cadence
+
+        stop = max(first, last + 1)
+        if limit is not None:
+            stop = min(stop, first + limit)
+        return range(first, stop)
+
+    def latest_reports(self, n: int, count: int = 3) -> range:
+        """
+
+        :return: Range of the numbers of the last count reports of the Spotter
+        """
+        last = (self.now() - self.origin - self.offsets[n]) // self.cadence
+        return range(max(0, last - count + 1), last + 1)
+
+    # ---------------------------------- Samples -------------------------------------- #
+    def location(self, n: int, k: int) -> dict:
+        latitude, longitude = self.homes[n]
+        return {'latitude': round(latitude + 0.01 * math.sin(k / 20 + n), 6),
+                'longitude': round(longitude + 0.01 * math.cos(k / 20 + n), 6)}
+
+    def wave(self, n: int, k: int) -> dict:
+        return {
+            'significantWaveHeight': round(1.5 + 0.8 * math.sin(k / 48 + n) + 0.1 * _noise(n, k, 1), 2),
+            'peakPeriod': round(10 + 4 * math.sin(k / 96 + n) + _noise(n, k, 2), 2),
+            'meanPeriod': round(7 + 2 * math.sin(k / 96 + n) + 0.5 * _noise(n, k, 3), 2),
+            'peakDirection': round(280 + 30 * math.sin(k / 200 + n), 3),
+            'peakDirectionalSpread': round(25 + 10 * _noise(n, k, 4), 3),
+            'meanDirection': round(280 + 25 * math.sin(k / 200 + n), 3),
+            'meanDirectionalSpread': round(35 + 10 * _noise(n, k, 5), 3),
+            'timestamp': epoch_ms_to_iso(self._report(n, k)),
+            **self.location(n, k),
+            'processing_source': 'embedded',
+        }
+
+    def track(self, n: int, k: int) -> dict:
+        return {'timestamp': epoch_ms_to_iso(self._report(n, k)), **self.location(n, k),
+                'processing_source': 'embedded'}
+
+    def wind(self, n: int, k: int) -> dict:
+        return {'speed': round(6 + 4 * math.sin(k / 30 + n) + _noise(n, k, 6), 2),
+                'direction': round(270 + 40 * math.sin(k / 50 + n), 1), 'seasurfaceId': 1,
+                'timestamp': epoch_ms_to_iso(self._report(n, k)), **self.location(n, k)}
+
+    def surface_temp(self, n: int, k: int) -> dict:
+        return {'degrees': round(15 + 2 * math.sin(k / 48 + n) + 0.1 * _noise(n, k, 7), 2),
+                'timestamp': epoch_ms_to_iso(self._report(n, k)), **self.location(n, k)}
+
+    def barometer(self, n: int, k: int) -> dict:
+        return {'value': round(1013 + 10 * math.sin(k / 150 + n) + 0.5 * _noise(n, k, 8), 1), 'units': 'hPa',
+                'timestamp': epoch_ms_to_iso(self._report(n, k)), **self.location(n, k)}
+
+    def spectrum(self, n: int, k: int, directional_moments: bool = False) -> dict:
+        peak = 0.1 + 0.04 * math.sin(k / 96 + n)
+        energy = 2.0 + math.sin(k / 48 + n)
+        direction = 250 + 30 * math.sin(k / 200 + n)
+        spectrum = {
+            'frequency': FREQUENCIES,
+            'df': BANDWIDTHS,
+            'varianceDensity': [round(energy * math.exp(-((f - peak) / 0.02) ** 2) + tail, 6)
+                                for f, tail in zip(FREQUENCIES, _TAILS)],
+            'direction': [round(direction + 60 * f, 3) for f in FREQUENCIES],
+            'directionalSpread': _SPREADS,
+            'timestamp': epoch_ms_to_iso(self._report(n, k)),
+            **self.location(n, k),
+            'processing_source': 'embedded',
+        }
+
+        if directional_moments:
+            theta = math.radians(280 + 25 * math.sin(k / 200 + n))
+            spread = 0.7 - 0.3 * math.sin(k / 48 + n) ** 2
+            spectrum.update({
+                'a1': [round(spread * math.cos(theta), 6)] * len(FREQUENCIES),
+                'b1': [round(spread * math.sin(theta), 6)] * len(FREQUENCIES),
+                'a2': [round(spread ** 2 * math.cos(2 * theta), 6)] * len(FREQUENCIES),
+                'b2': [round(spread ** 2 * math.sin(2 * theta), 6)] * len(FREQUENCIES),
+            })
+
+        return spectrum
+
+    def cellular_metric(self, n: int, k: int) -> dict:
+        return {'epochMs': self._report(n, k), 'timestamp': epoch_ms_to_iso(self._report(n, k)),
+                'rssi': round(-75 + 10 * _noise(n, k, 9)), 'rsrp': round(-100 + 10 * _noise(n, k, 10)),
+                'rsrq': round(-10 + 4 * _noise(n, k, 11)), 'sinr': round(10 + 8 * _noise(n, k, 12)),
+                'carrier': 'mock', 'technology': 'LTE-M'}
+
+    def latest_data(self, n: int, options: dict) -> dict:
+        """
+
+        :param n: Index of the Spotter
+        :param options: Query parameters of the latest-data request
+
+        :return: The data of a latest-data response, with the last reports of the Spotter
+        """
+        reports = self.latest_reports(n)
+        moments = options.get('includeDirectionalMoments') == 'true'
+
+        data = {
+            'spotterId': self.ids[n],
+            'spotterName': self.names[self.ids[n]],
+            'payloadType': 'full_waves' if moments else 'waves',
+            'batteryPower': 20 + (n * 37) % 81,
+            'batteryVoltage': round(3.6 + 0.5 * abs(math.sin(n)), 2),
+            'solarVoltage': round(max(0.0, 6 * math.sin(reports.stop / 24 + n)), 2),
+            'humidity': round(10 + 20 * abs(math.sin(n / 3)), 1),
+            'track': [self.track(n, k) for k in reports],
+            'waves': [self.wave(n, k) for k in reports],
+            'frequencyData': [self.spectrum(n, k, True) for k in reports] if moments else [],
+        }
+
+        for flag, key, sample in (('includeWindData', 'wind', self.wind),
+                                  ('includeBarometerData', 'barometerData', self.barometer),
+                                  ('includeSurfaceTempData', 'surfaceTemp', self.surface_temp)):
+            if options.get(flag) == 'true':
+                data[key] = [sample(n, k) for k in reports]
+
+        return data
+
+    def in_shape(self, n: int, shape: str, vertices: list, radius: float) -> bool:
+        """
+
+        :param shape: 'circle' or 'envelope'
+        :param vertices: Longitude, latitude pairs of the center of the circle, or two corners of the envelope
+        :param radius: Radius of the circle in meters
+
+        :return: True if the home of the Spotter lies in the shape
+        """
+        latitude, longitude = self.homes[n]
+        if shape == 'circle':
+            return _distance(latitude, longitude, vertices[1], vertices[0]) <= radius
+
+        longitudes, latitudes = sorted(vertices[0::2]), sorted(vertices[1::2])
+        return longitudes[0] <= longitude <= longitudes[-1] and latitudes[0] <= latitude <= latitudes[-1]
+
+
+def _noise(n, k, channel):
+    # deterministic pseudo random value in [-0.5, 0.5) of a report
+    return ((n * 2654435761 + k * 40503 + channel * 97) % 10007) / 10007 - 0.5
+
+
+def _distance(lat1, lon1, lat2, lon2):
+    # great circle distance in meters
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + \
+        math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * _EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+class _Throttle:
+    # non blocking token bucket: requests above the rate are answered with a 429
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """
+
+        :return: None if the request may proceed, otherwise the seconds until a token is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.mock.handle(self)
+
+    def do_POST(self):
+        self.server.mock.handle(self)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockServer:
+    """
+    Local http server of the Wave API, serving a SyntheticFleet. Runs in a background thread:
+
+        with MockServer(SyntheticFleet(spotters=1000), latency=0.05) as server:
+            os.environ.update(server.environ())
+            api = SofarApi(custom_token='mock')
+    """
+    def __init__(self, fleet: SyntheticFleet = None, latency=0.0, error_rate: float = 0.0, rate_limit: float = None,
+                 burst: float = None, token: str = None, host: str = '127.0.0.1', port: int = 0, seed: int = 1):
+        """
+
+        :param fleet: The fleet to serve. Defaults to SyntheticFleet()
+        :param latency: Seconds every response is delayed by, or a (low, high) tuple of a uniform random delay
+        :param error_rate: Fraction of the requests answered with a 500
+        :param rate_limit: Optional sustained requests per second, requests above it are answered with a 429 and
+                           a Retry-After header
+        :param burst: Number of requests allowed at once before throttling. Defaults to one second of rate_limit
+        :param token: Optional token the requests need to have, any token is accepted if None
+        :param host: Host to listen on
+        :param port: Port to listen on, 0 for any free port
+        :param seed: Seed of the random latency and errors
+        """
+        self.fleet = fleet if fleet is not None else SyntheticFleet()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle = _Throttle(rate_limit, burst) if rate_limit is not None else None
+        self.token = token
+
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._requests = defaultdict(int)
+        self._statuses = defaultdict(int)
+        self._bytes_out = 0
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.mock = self
+        self._thread = None
+
+    # ---------------------------------- Running -------------------------------------- #
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def api_url(self) -> str:
+        return f'{self.url}/api'
+
+    @property
+    def user_rest_url(self) -> str:
+        return f'{self.url}/user-rest'
+
+    def environ(self) -> dict:
+        """
+
+        :return: The environment variables pointing the client at this server
+        """
+        return {'WF_URL': self.api_url, 'WF_USER_REST_URL': self.user_rest_url}
+
+    def start(self):
+        """
+        Serves in a background thread
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-wave-api', daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        """
+        Stops serving and closes the socket
+        """
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self) -> dict:
+        """
+
+        :return: Dictionary of the number of requests per endpoint, responses per status and bytes sent
+        """
+        with self._stats_lock:
+            return {'requests': dict(self._requests), 'statuses': dict(self._statuses), 'bytes_out': self._bytes_out}
+
+    # ---------------------------------- Requests -------------------------------------- #
+    def handle(self, request: _Handler):
+        """
+        Answers a request, after the configured latency, with a throttled, failed or regular response
+        """
+        url = urlsplit(request.path)
+        segments = [segment for segment in url.path.split('/') if segment]
+        params = dict(parse_qsl(url.query))
+        endpoint = '/'.join(segments[1:])
+
+        length = int(request.headers.get('Content-Length') or 0)
+        body = request.rfile.read(length) if length > 0 else b''
+
+        latency, failed = self._draw()
+        if latency > 0:
+            time.sleep(latency)
+
+        headers = {}
+        wait = self.throttle.take() if self.throttle is not None else None
+        if wait is not None:
+            status, payload = 429, {'message': 'Too many requests'}
+            headers['Retry-After'] = f'{wait:.3f}'
+        elif failed:
+            status, payload = 500, {'message': 'Internal server error'}
+        elif self.token is not None and request.headers.get('token') != self.token:
+            status, payload = 401, {'message': 'Invalid token'}
+        else:
+            status, payload = self._route(segments, endpoint, params, body)
+
+        content = json.dumps(payload).encode()
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(content)))
+        for name, value in headers.items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(content)
+
+        with self._stats_lock:
+            self._requests[segments[-1] if segments else ''] += 1
+            self._statuses[status] += 1
+            self._bytes_out += len(content)
+
+    def _draw(self):
+        # latency and failure of a request
+        with self._rng_lock:
+            latency = self._rng.uniform(*self.latency) if isinstance(self.latency, (tuple, list)) else self.latency
+            failed = self.error_rate > 0 and self._rng.random() < self.error_rate
+        return latency, failed
+
+    def _route(self, segments, endpoint, params, body):
+        if len(segments) == 0 or segments[0] not in ('api', 'user-rest'):
+            return 404, {'message': 'Not found'}
+
+        if segments[0] == 'user-rest':
+            if len(segments) == 4 and segments[1] == 'devices' and segments[3] == 'cellular-signal-metrics':
+                return self._cellular_signal_metrics(segments[2], params)
+            return 404, {'message': 'Not found'}
+
+        routes = {
+            'devices': self._devices,
+            'device-radius': self._device_radius,
+            'latest-data': self._latest_data,
+            'wave-data': self._wave_data,
+            'search': self._search,
+            'change-name': self._change_name,
+        }
+        route = routes.get(endpoint)
+        if route is None:
+            return 404, {'message': 'Not found'}
+
+        try:
+            return route(params, body)
+        except (KeyError, ValueError) as e:
+            return 400, {'message': f'Invalid request: {e}'}
+
+    def _spotter(self, spotter_id):
+        n = self.fleet.index.get(spotter_id)
+        if n is None:
+            raise ValueError(f'unknown spotterId {spotter_id}')
+        return n
+
+    def _devices(self, params, body):
+        fleet = self.fleet
+        return 200, {'message': '', 'data': {'devices': [{'spotterId': spotter_id, 'name': fleet.names[spotter_id]}
+                                                         for spotter_id in fleet.ids]}}
+
+    def _device_radius(self, params, body):
+        fleet = self.fleet
+        devices = []
+        for n, spotter_id in enumerate(fleet.ids):
+            k = fleet.latest_reports(n, 1)
+            if len(k) > 0:
+                devices.append({'spotterId': spotter_id, 'name': fleet.names[spotter_id], **fleet.track(n, k[0])})
+        return 200, {'message': '', 'data': {'devices': devices}}
+
+    def _latest_data(self, params, body):
+        n = self._spotter(params['spotterId'])
+        return 200, {'data': self.fleet.latest_data(n, params)}
+
+    def _wave_data(self, params, body):
+        fleet = self.fleet
+        n = self._spotter(params['spotterId'])
+
+        start = iso_to_epoch_ms(params['startDate']) if 'startDate' in params else fleet.origin - 1
+        end = iso_to_epoch_ms(params['endDate']) if 'endDate' in params else None
+
+        def included(flag, default='false'):
+            return params.get(flag, default) == 'true'
+
+        limit = min(int(params.get('limit', 20)), WAVE_DATA_LIMIT)
+        if included('includeFrequencyData'):
+            limit = min(limit, FREQUENCY_DATA_LIMIT)
+
+        reports = fleet.reports_after(n, start, end, limit)
+        moments = included('includeDirectionalMoments')
+
+        data = {'spotterId': fleet.ids[n], 'limit': limit}
+        for flag, default, key, sample in (
+                ('includeWaves', 'true', 'waves', fleet.wave),
+                ('includeTrack', 'false', 'track', fleet.track),
+                ('includeWindData', 'false', 'wind', fleet.wind),
+                ('includeSurfaceTempData', 'false', 'surfaceTemp', fleet.surface_temp),
+                ('includeBarometerData', 'false', 'barometerData', fleet.barometer)):
+            data[key] = [sample(n, k) for k in reports] if included(flag, default) else []
+
+        data['frequencyData'] = [fleet.spectrum(n, k, moments) for k in reports] \
+            if included('includeFrequencyData') else []
+
+        return 200, {'data': data}
+
+    def _search(self, params, body):
+        fleet = self.fleet
+        shape = params['shape']
+        if shape not in ('circle', 'envelope'):
+            raise ValueError(f'unknown shape {shape}')
+
+        vertices = [float(value) for value in params['shapeParams'].split(',')]
+        radius = float(params['radius']) if shape == 'circle' else None
+        page_size = min(int(params.get('pageSize', 100)), SEARCH_PAGE_SIZE)
+
+        start = iso_to_epoch_ms(params['startDate'])
+        end = min(iso_to_epoch_ms(params['endDate']), fleet.now())
+
+        # the results are ordered by time then Spotter, a page continues after the (time, Spotter) of its cursor
+        after = [int(value) for value in params['cursor'].split(':')] if 'cursor' in params else \
+            [start, len(fleet.ids)]
+
+        # next report of every Spotter in the shape, merged in time order
+        heap = []
+        for n in range(len(fleet.ids)):
+            if not fleet.in_shape(n, shape, vertices, radius):
+                continue
+            reports = fleet.reports_after(n, after[0] - 1 if n > after[1] else after[0], end, 1)
+            if len(reports) > 0:
+                heap.append((fleet._report(n, reports[0]), n, reports[0]))
+        heapq.heapify(heap)
+
+        results = []
+        while len(heap) > 0 and len(results) <= page_size:
+            timestamp, n, k = heapq.heappop(heap)
+            results.append((timestamp, n, k))
+            if fleet._report(n, k + 1) <= end:
+                heapq.heappush(heap, (fleet._report(n, k + 1), n, k + 1))
+
+        has_more = len(results) > page_size
+        results = results[:page_size]
+
+        page = {'hasMoreData': has_more, 'nextPage': None}
+        if has_more:
+            timestamp, n, _ = results[-1]
+            query = {key: value for key, value in params.items() if key != 'cursor'}
+            page['nextPage'] = f'{self.api_url}/search?{urlencode({**query, "cursor": f"{timestamp}:{n}"})}'
+
+        data = [{'spotterId': fleet.ids[n], **fleet.wave(n, k)} for _, n, k in results]
+        return 200, {'data': data, 'metadata': {'page': page}}
+
+    def _change_name(self, params, body):
+        body = json.loads(body or b'{}')
+        spotter_id, name = body['spotterId'], body['name']
+        self._spotter(spotter_id)
+
+        self.fleet.names[spotter_id] = name
+        return 200, {'message': f'{spotter_id} updated', 'data': {'spotterId': spotter_id, 'name': name}}
+
+    def _cellular_signal_metrics(self, spotter_id, params):
+        fleet = self.fleet
+        try:
+            n = self._spotter(spotter_id)
+            limit = int(params.get('limit', 20))
+            since = int(params['since_epoch_ms']) if 'since_epoch_ms' in params else None
+            before = int(params['before_epoch_ms']) if 'before_epoch_ms' in params else None
+        except ValueError as e:
+            return 400, {'message': f'Invalid request: {e}'}
+
+        ascending = params.get('order_ascending') == 'true'
+        if ascending:
+            reports = fleet.reports_after(n, since if since is not None else fleet.origin - 1,
+                                          before - 1 if before is not None else None, limit)
+        else:
+            # the newest first
+            until = before - 1 if before is not None else None
+            reports = fleet.reports_after(n, since if since is not None else fleet.origin - 1, until)
+            reports = reversed(reports[-limit:])
+
+        options = {'spotterId': spotter_id, 'limit': limit, 'orderAscending': ascending, 'startEpochMs': None,
+                   'endEpochMs': None, 'sinceEpochMs': since, 'beforeEpochMs': before}
+        return 200, {'data': [fleet.cellular_metric(n, k) for k in reports], 'options': options}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local mock of the Wave API serving a synthetic fleet')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on, 0 for any free port')
+    parser.add_argument('--spotters', type=int, default=1000, help='number of Spotters of the fleet')
+    parser.add_argument('--cadence', type=float, default=1800.0, help='seconds between reports of a Spotter')
+    parser.add_argument('--origin', default='2020-01-01T00:00:00.000Z', help='time of the first reports')
+    parser.add_argument('--latency', type=float, nargs='+', default=[0.0],
+                        help='seconds each response is delayed by, or the low and high of a uniform delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with a 500')
+    parser.add_argument('--rate-limit', type=float, default=None,
+                        help='sustained requests per second, above it requests are answered with a 429')
+    parser.add_argument('--burst', type=float, default=None, help='requests allowed at once before throttling')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    fleet = SyntheticFleet(args.spotters, args.cadence, args.origin, args.seed)
+    latency = args.latency[0] if len(args.latency) == 1 else tuple(args.latency[:2])
+    server = MockServer(fleet, latency, args.error_rate, args.rate_limit, args.burst, host=args.host,
+                        port=args.port, seed=args.seed)
+
+    # the first line tells a parent process where to connect
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
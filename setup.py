@@ -12,6 +12,14 @@ setuptools.setup(
         'requests',
         'python-dotenv'
     ],
+    extras_require={
+        'async': ['aiohttp'],
+        'arrays': ['numpy'],
+        'pandas': ['numpy', 'pandas'],
+        'arrow': ['numpy', 'pyarrow'],
+        'fast-json': ['orjson'],
+        'http2': ['httpx[http2]'],
+    },
     description='Python client for interfacing with the Sofar Wavefleet API to access Spotter Data',
     long_description=readme_contents,
     long_description_content_type='text/markdown',
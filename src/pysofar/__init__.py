@@ -10,6 +10,14 @@ import os
 import dotenv
 import requests
 import json
+import time
+
+from pysofar.decoding import default_decoder
+from pysofar.metrics import RequestHooks, endpoint_name
+from pysofar.store import DataStore
+from pysofar.throttle import RetryPolicy, TokenBucket
+from pysofar.transport import DEFAULT_POOL_SIZE, RequestsTransport, Transport, new_http_session
+from typing import Callable, NamedTuple
 
 def get_token():
     # config values
@@ -28,38 +36,252 @@ def get_endpoint():
         _endpoint = 'https://api.sofarocean.com/api'
     return _endpoint
 
+
+def _header(token):
+    return {'token': token, 'Content-Type': 'application/json'}
+
+
+class ClientContext(NamedTuple):
+    """
+    Immutable settings of a client: its token, endpoint, pooled session, transport and request settings. Queries,
+    Spotters and workers created from a SofarApi borrow its context, so creating them reads no configuration and opens
+    nothing
+    """
+    token: str
+    endpoint: str
+    header: dict
+    http_session: requests.Session = None
+    rate_limiter: TokenBucket = None
+    retry_policy: RetryPolicy = None
+    store: DataStore = None
+    decoder: Callable = None
+    hooks: RequestHooks = None
+    transport: Transport = None
+
+    @classmethod
+    def create(cls, custom_token=None, **settings) -> 'ClientContext':
+        """
+        Context with the token (unless given) and endpoint read from the environment
+
+        :param custom_token: Optional api token, otherwise read from the environment
+        :param settings: Optional http_session, rate_limiter, retry_policy, store, decoder, hooks or transport
+
+        :return: The new ClientContext
+        """
+        token = custom_token or get_token()
+        settings['retry_policy'] = settings.get('retry_policy') or RetryPolicy()
+        settings['decoder'] = settings.get('decoder') or default_decoder()
+        return cls(token, get_endpoint(), _header(token), **settings)
+
+
+def _shared_context(api):
+    # context of the parent api, shared by a connection created from it
+    return api.context if api is not None else None
+
+
+class _ContextField:
+    # connection attribute read from its context. Setting it gives the connection a changed copy of the context
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, connection, owner=None):
+        if connection is None:
+            return self
+        return getattr(connection._context, self.name)
+
+    def __set__(self, connection, value):
+        connection._context = connection._context._replace(**{self.name: value})
+
+
 class SofarConnection:
     """
     Base Parent class for connections to the API
     Use SofarApi in sofar.py in practice
     """
-    def __init__(self, custom_token=None):
-        self._token = custom_token or get_token()
-        self.endpoint = get_endpoint()
-        self.header = {'token': self._token, 'Content-Type': 'application/json'}
+    __slots__ = ('_context', '_owns_http_session', '_pool_size')
+
+    endpoint = _ContextField('endpoint')
+    header = _ContextField('header')
+    rate_limiter = _ContextField('rate_limiter')
+    retry_policy = _ContextField('retry_policy')
+    store = _ContextField('store')
+    decoder = _ContextField('decoder')
+    hooks = _ContextField('hooks')
+
+    def __init__(self, custom_token=None, http_session: requests.Session = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 rate_limiter: TokenBucket = None, retry_policy: RetryPolicy = None, store: DataStore = None,
+                 decoder=None, context: ClientContext = None, hooks: RequestHooks = None, transport: Transport = None):
+        """
+
+        :param custom_token: Optional api token, otherwise read from the environment
+        :param http_session: Optional pooled session to share with another connection. If not given a new
+                             one is created and owned by this connection
+        :param pool_size: Number of pooled connections per host when creating a new session
+        :param rate_limiter: Optional token bucket every request has to take a token from
+        :param retry_policy: Retry policy for throttled (429) or failed requests. Defaults to RetryPolicy()
+        :param store: Optional local store of downloaded data, so only data not already stored is requested
+        :param decoder: Optional function decoding the raw bytes of a response body. Defaults to orjson when
+                        installed, else the standard library json module
+        :param context: Optional context of a parent connection to borrow (see ClientContext), instead of reading
+                        the token and endpoint from the environment. The other settings are then ignored
+        :param hooks: Optional RequestHooks (ex. pysofar.metrics.MetricsCollector) called on the events of every
+                      request
+        :param transport: Optional Transport sending the requests (see pysofar.transport), ex. an HttpxTransport
+                          for HTTP/2 or a ReplayTransport of recorded responses. Defaults to a RequestsTransport
+                          over the pooled http session. A given transport is not closed by close()
+        """
+        if context is None:
+            context = ClientContext.create(custom_token, http_session=http_session, rate_limiter=rate_limiter,
+                                           retry_policy=retry_policy, store=store, decoder=decoder, hooks=hooks,
+                                           transport=transport)
+        elif custom_token is not None:
+            context = context._replace(token=custom_token, header=_header(custom_token))
+
+        self._context = context
+        # the session is owned by this connection only if it creates it, see http_session
+        self._owns_http_session = False
+        self._pool_size = pool_size
+
+    @property
+    def context(self) -> ClientContext:
+        """
+        Context shared with the connections created from this one. Creates the transport (and the pooled http
+        session it uses by default) if needed, so that it is shared as well
+
+        :return: ClientContext
+        """
+        self.transport
+        return self._context
+
+    @property
+    def http_session(self):
+        """
+        Pooled http session used for all requests of this connection, created on first use. A session created
+        here is owned by this connection and closed by close(), a session set from outside is not
+
+        :return: requests Session
+        """
+        if self._context.http_session is None:
+            self._context = self._context._replace(http_session=new_http_session(self._pool_size))
+            self._owns_http_session = True
+        return self._context.http_session
+
+    @http_session.setter
+    def http_session(self, value):
+        previous = self._context.http_session
+        if self._owns_http_session and previous is not None and previous is not value:
+            # the session this connection created is replaced, so nothing else closes it
+            previous.close()
+        self._owns_http_session = False
+
+        transport = self._context.transport
+        if isinstance(transport, RequestsTransport):
+            # the default transport is recreated over the new session
+            transport = None
+        self._context = self._context._replace(http_session=value, transport=transport)
+
+    @property
+    def transport(self) -> Transport:
+        """
+        Transport sending the requests of this connection. Defaults to a RequestsTransport over the pooled http
+        session, created on first use
+
+        :return: Transport
+        """
+        if self._context.transport is None:
+            transport = RequestsTransport(self.http_session)
+            self._context = self._context._replace(transport=transport)
+        return self._context.transport
+
+    def close(self):
+        """
+        Closes the pooled connections, if this connection owns them
+        """
+        if self._owns_http_session and self._context.http_session is not None:
+            self._context.http_session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     # Helper methods
     def _get(self, endpoint_suffix, params: dict = None):
         url = f"{self.endpoint}/{endpoint_suffix}"
-        if params is None:
-            response = requests.get(url, headers=self.header)
-        else:
-            response = requests.get(url, headers=self.header, params=params)
+        response = self._request('GET', url, endpoint_suffix, params=params)
 
         status = response.status_code
-        data = response.json()
+        data = self._decode(endpoint_suffix, response.content)
 
         return status, data
 
     def _post(self, endpoint_suffix, json_data):
-        response = requests.get(f"{self.endpoint}/{endpoint_suffix}",
-                                json=json_data,
-                                headers=self.header)
+        response = self._request('POST', f"{self.endpoint}/{endpoint_suffix}", endpoint_suffix, json=json_data)
         status = response.status_code
-        data = response.json()
+        data = self._decode(endpoint_suffix, response.content)
 
         return status, data
 
+    def _decode(self, endpoint_suffix, content):
+        hooks = self.hooks
+        if hooks is None:
+            return self.decoder(content)
+
+        started = time.perf_counter()
+        data = self.decoder(content)
+        hooks.decode(endpoint_name(endpoint_suffix), time.perf_counter() - started, len(content))
+        return data
+
+    def _request(self, method, url, endpoint_suffix: str = '', **kwargs):
+        # sends a request through the rate limiter and the transport, retrying throttled and failed requests
+        hooks = self.hooks
+        if hooks is not None:
+            endpoint = endpoint_name(endpoint_suffix)
+            hooks.request_start(endpoint)
+            started = time.perf_counter()
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            transport = self.transport
+            try:
+                response = transport.request(method, url, self.header, **kwargs)
+            except transport.errors:
+                # failures without a response, ex. a dropped connection or a timeout
+                if not self.retry_policy.should_retry(attempt):
+                    if hooks is not None:
+                        hooks.request_end(endpoint, None, time.perf_counter() - started, 0, attempt)
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                if hooks is not None:
+                    hooks.retry(endpoint, attempt, None, delay)
+                self.retry_policy.sleep(delay)
+                attempt += 1
+                continue
+            except Exception:
+                # not retried, but still reported
+                if hooks is not None:
+                    hooks.request_end(endpoint, None, time.perf_counter() - started, 0, attempt)
+                raise
+
+            if not self.retry_policy.should_retry(attempt, response.status_code):
+                if hooks is not None:
+                    hooks.request_end(endpoint, response.status_code, time.perf_counter() - started,
+                                      len(response.content), attempt)
+                return response
+
+            delay = self.retry_policy.backoff(attempt, response.headers.get('Retry-After'))
+            if hooks is not None:
+                hooks.retry(endpoint, attempt, response.status_code, delay)
+            if response.status_code == 429 and self.rate_limiter is not None:
+                # hold back the requests of all other threads as well
+                self.rate_limiter.pause(delay)
+
+            self.retry_policy.sleep(delay)
+            attempt += 1
+
     def set_token(self, new_token):
-        self._token = new_token
-        self.header.update({'token': new_token})
+        self._context = self._context._replace(token=new_token, header=_header(new_token))
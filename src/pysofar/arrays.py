@@ -0,0 +1,423 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Columnar (NumPy) representation of Spotter data
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from array import array
+from datetime import datetime
+from pysofar.tools import epoch_ms_to_iso, iso_to_epoch_ms, to_epoch_ms
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_NAN = float('nan')
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('numpy is required for array output. Install it with `pip install pysofar[arrays]`')
+
+
+# ---------------------------------- Columns -------------------------------------- #
+class _FloatColumn:
+    # numbers (and booleans) as float64, missing values as nan
+    def __init__(self, length):
+        self.values = array('d', [_NAN]) * length
+
+    def append(self, value):
+        if isinstance(value, str):
+            raise TypeError(value)
+        self.values.append(_NAN if value is None else float(value))
+
+    def append_missing(self):
+        self.values.append(_NAN)
+
+    def __len__(self):
+        return len(self.values)
+
+    def build(self):
+        return np.frombuffer(self.values, dtype=np.float64).copy(), None
+
+    def as_objects(self):
+        return [None if v != v else v for v in self.values]
+
+
+class _TimeColumn(_FloatColumn):
+    # ISO8601 timestamps as int64 epoch milliseconds
+    _MISSING = -2 ** 63
+
+    def __init__(self, length):
+        self.values = array('q', [self._MISSING]) * length
+
+    def append(self, value):
+        if isinstance(value, str):
+            self.values.append(iso_to_epoch_ms(value))
+        elif value is None:
+            self.values.append(self._MISSING)
+        elif isinstance(value, datetime):
+            self.values.append(to_epoch_ms(value))
+        else:
+            raise TypeError(value)
+
+    def append_missing(self):
+        self.values.append(self._MISSING)
+
+    def build(self):
+        return np.frombuffer(self.values, dtype=np.int64).copy(), None
+
+    def as_objects(self):
+        return list(self.values)
+
+
+class _CategoryColumn:
+    # strings as int32 codes into a list of categories, missing values as -1
+    def __init__(self, length):
+        self.codes = array('i', [-1]) * length
+        self.categories = {}
+
+    def append(self, value):
+        if value is None:
+            self.codes.append(-1)
+            return
+
+        if not isinstance(value, str):
+            raise TypeError(value)
+
+        code = self.categories.get(value)
+        if code is None:
+            code = self.categories[value] = len(self.categories)
+        self.codes.append(code)
+
+    def append_missing(self):
+        self.codes.append(-1)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def build(self):
+        return np.frombuffer(self.codes, dtype=np.int32).copy(), np.array(list(self.categories), dtype=object)
+
+    def as_objects(self):
+        labels = list(self.categories)
+        return [labels[code] if code >= 0 else None for code in self.codes]
+
+
+class _ObjectColumn:
+    # anything else (ex. the lists of frequency data) as python objects
+    def __init__(self, length, values=None):
+        self.values = values if values is not None else [None] * length
+
+    def append(self, value):
+        self.values.append(value)
+
+    def append_missing(self):
+        self.values.append(None)
+
+    def __len__(self):
+        return len(self.values)
+
+    def build(self):
+        values = np.empty(len(self.values), dtype=object)
+        values[:] = self.values
+        return values, None
+
+
+def _new_column(key, value, length):
+    if key == 'timestamp' and isinstance(value, (str, datetime)):
+        return _TimeColumn(length)
+    if isinstance(value, (bool, int, float)):
+        return _FloatColumn(length)
+    if isinstance(value, str):
+        return _CategoryColumn(length)
+    return _ObjectColumn(length)
+
+
+def parse_timestamps(timestamps):
+    """
+    Vectorized conversion of a whole page of ISO 8601 timestamps (UTC), parsed by NumPy in a single call instead of
+    one at a time
+
+    :param timestamps: Sequence of timestamps as strings (ex. '2024-01-01T00:00:00.000Z'), None where missing
+
+    :return: datetime64[ms] array, NaT where missing. Use .view('int64') for epoch milliseconds
+    """
+    _require_numpy()
+
+    strings = []
+    for value in timestamps:
+        if value is None:
+            strings.append('NaT')
+        elif value[-1:] == 'Z':
+            strings.append(value[:-1])
+        elif value.find('+', 10) >= 0 or value.find('-', 10) >= 0:
+            # NumPy does not take utc offsets, these are converted as by the rest of the client
+            strings.append(epoch_ms_to_iso(iso_to_epoch_ms(value))[:-1])
+        else:
+            strings.append(value)
+
+    return np.array(strings, dtype='datetime64[ms]')
+
+
+# ---------------------------------- Builder -------------------------------------- #
+class ColumnBuilder:
+    """
+    Accumulates samples into compact columns as pages are decoded, so a list of all the sample dictionaries
+    never has to be kept
+    """
+    def __init__(self):
+        self._columns = {}
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def extend(self, records):
+        """
+
+        :param records: Iterable of samples (dictionaries). The timestamps of a list of samples (ex. a page) are
+                        parsed at once
+        """
+        epochs = _page_epochs(records) if isinstance(records, list) else None
+        if epochs is None:
+            for record in records:
+                self.append(record)
+        else:
+            for record, epoch in zip(records, epochs):
+                self.append(record, epoch)
+
+    def append(self, record: dict, epoch: int = None):
+        """
+
+        :param record: A sample as a dictionary
+        :param epoch: Optional timestamp of the sample already parsed to epoch milliseconds
+        """
+        columns = self._columns
+        length = self._length
+        appended = 0
+
+        for key, value in record.items():
+            column = columns.get(key)
+
+            if column is None:
+                if value is None:
+                    # the type of a column is only known from its first value
+                    continue
+                column = columns[key] = _new_column(key, value, length)
+
+            if epoch is not None and key == 'timestamp' and type(column) is _TimeColumn:
+                column.values.append(epoch)
+                appended += 1
+                continue
+
+            try:
+                column.append(value)
+            except (TypeError, ValueError):
+                # values of mixed types are kept as python objects
+                column = columns[key] = _ObjectColumn(length, column.as_objects())
+                column.append(value)
+            appended += 1
+
+        self._length = length + 1
+
+        if appended != len(columns):
+            for column in columns.values():
+                if len(column) == length:
+                    column.append_missing()
+
+    def build(self):
+        """
+
+        :return: The accumulated samples as RecordArrays
+        """
+        _require_numpy()
+
+        columns = {}
+        categories = {}
+        for key, column in self._columns.items():
+            columns[key], labels = column.build()
+            if labels is not None:
+                categories[key] = labels
+
+        return RecordArrays(columns, categories, self._length)
+
+
+def _page_epochs(records):
+    # epoch milliseconds of the timestamps of a page of samples, None when they can not all be parsed at once
+    if np is None or len(records) < 2:
+        return None
+
+    try:
+        timestamps = [record['timestamp'] for record in records]
+        if not all(isinstance(timestamp, str) for timestamp in timestamps):
+            return None
+        return parse_timestamps(timestamps).view(np.int64).tolist()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def records_to_arrays(records) -> 'RecordArrays':
+    """
+    Converts samples to a struct of NumPy arrays
+
+    :param records: Iterable of samples (dictionaries), ex. the wave data of a query
+
+    :return: RecordArrays of the samples
+    """
+    builder = ColumnBuilder()
+    builder.extend(records)
+    return builder.build()
+
+
+# ---------------------------------- Arrays -------------------------------------- #
+class RecordArrays:
+    """
+    Struct of NumPy arrays holding samples column wise, one array per field:
+        - timestamp: int64 epoch milliseconds
+        - numeric fields: float64, nan where missing
+        - string fields (ex. spotterId): int32 codes into the field's categories, -1 where missing.
+          Use labels(field) for the strings
+        - other fields: object arrays
+    """
+    def __init__(self, columns: dict, categories: dict = None, length: int = None):
+        self.columns = columns
+        self.categories = categories or {}
+
+        if length is None:
+            length = len(next(iter(columns.values()))) if len(columns) > 0 else 0
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    def __contains__(self, key):
+        return key in self.columns
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def keys(self):
+        return self.columns.keys()
+
+    def items(self):
+        return self.columns.items()
+
+    def labels(self, key):
+        """
+
+        :param key: Name of a string field
+
+        :return: Object array of the field's strings, None where missing
+        """
+        categories = np.append(self.categories[key], None)
+        return categories[self.columns[key]]
+
+    def take(self, indices) -> 'RecordArrays':
+        """
+
+        :param indices: Integer array of the samples to select, or a boolean mask
+
+        :return: New RecordArrays of the selected samples
+        """
+        columns = {key: values[indices] for key, values in self.columns.items()}
+        return RecordArrays(columns, dict(self.categories))
+
+    def sort(self) -> 'RecordArrays':
+        """
+
+        :return: The samples in (stable) timestamp order
+        """
+        if 'timestamp' not in self.columns:
+            return self
+        return self.take(np.argsort(self.columns['timestamp'], kind='stable'))
+
+    def to_dataframe(self):
+        """
+
+        :return: The samples as a pandas DataFrame, see pysofar.frames.to_dataframe
+        """
+        from pysofar.frames import to_dataframe
+        return to_dataframe(self)
+
+    def to_arrow(self):
+        """
+
+        :return: The samples as an Arrow Table, see pysofar.frames.to_arrow
+        """
+        from pysofar.frames import to_arrow
+        return to_arrow(self)
+
+    def __repr__(self):
+        return f"RecordArrays({self._length} samples, fields: {', '.join(self.columns)})"
+
+    @staticmethod
+    def concatenate(parts) -> 'RecordArrays':
+        """
+        Joins RecordArrays, merging the categories of string fields and filling fields missing from some parts
+
+        :param parts: List of RecordArrays
+
+        :return: New RecordArrays with the samples of all parts in order
+        """
+        _require_numpy()
+
+        parts = [part for part in parts if len(part) > 0]
+        if len(parts) == 0:
+            return RecordArrays({}, {}, 0)
+        if len(parts) == 1:
+            return parts[0]
+
+        keys = []
+        for part in parts:
+            keys.extend(key for key in part.keys() if key not in keys)
+
+        columns = {}
+        categories = {}
+        for key in keys:
+            kinds = {part.columns[key].dtype for part in parts if key in part}
+
+            if any(key in part.categories for part in parts) and kinds == {np.dtype(np.int32)}:
+                columns[key], categories[key] = _concatenate_categories(parts, key)
+            else:
+                columns[key] = np.concatenate([_column_or_missing(part, key, kinds) for part in parts])
+
+        return RecordArrays(columns, categories)
+
+
+def _column_or_missing(part, key, kinds):
+    if key in part:
+        if len(kinds) == 1:
+            return part.columns[key]
+        # mixed kinds fall back to objects, with string categories decoded to their labels rather than codes
+        return part.labels(key) if key in part.categories else part.columns[key].astype(object)
+
+    if kinds == {np.dtype(np.int64)}:
+        return np.full(len(part), _TimeColumn._MISSING, dtype=np.int64)
+    if kinds == {np.dtype(np.float64)}:
+        return np.full(len(part), _NAN)
+    return np.full(len(part), None, dtype=object)
+
+
+def _concatenate_categories(parts, key):
+    labels = {}
+    codes = []
+
+    for part in parts:
+        if key not in part:
+            codes.append(np.full(len(part), -1, dtype=np.int32))
+            continue
+
+        part_labels = part.categories[key]
+        mapping = np.array([labels.setdefault(label, len(labels)) for label in part_labels] + [-1], dtype=np.int32)
+        codes.append(mapping[part.columns[key]])
+
+    return np.concatenate(codes), np.array(list(labels), dtype=object)
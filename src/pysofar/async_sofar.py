@@ -0,0 +1,578 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: asyncio classes used to connect to the Sofar API and return data
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from datetime import datetime
+from itertools import chain
+from pysofar import get_token, get_endpoint, ClientContext, DEFAULT_POOL_SIZE
+from pysofar.decoding import default_decoder
+from pysofar.metrics import RequestHooks, endpoint_name
+from pysofar.records import to_records
+from pysofar.sofar import SofarApi, WaveDataQuery, SofarUserRestQuery, _Boundary, _PageWalk, _latest_data_params, \
+    _search_params, _sort_by_time, _stale_spotters
+from pysofar.throttle import RetryPolicy, TokenBucket
+from pysofar.wavefleet_exceptions import QueryError
+from typing import List, Tuple
+
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Default maximum number of requests in flight at once for a single client
+DEFAULT_MAX_CONCURRENCY = 64
+
+
+class AsyncSofarConnection:
+    """
+    Base Parent class for asyncio connections to the API
+    Use AsyncSofarApi in practice
+    """
+    def __init__(self, custom_token=None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 pool_size: int = DEFAULT_POOL_SIZE, decoder=None, hooks: RequestHooks = None,
+                 rate_limit: float = None, retry_policy: RetryPolicy = None):
+        """
+
+        :param custom_token: Optional api token, otherwise read from the environment
+        :param max_concurrency: Maximum number of requests in flight at once
+        :param pool_size: Maximum number of open connections per host
+        :param decoder: Optional function decoding the raw bytes of a response body. Defaults to orjson when
+                        installed, else the standard library json module
+        :param hooks: Optional RequestHooks called on the events of every request, see pysofar.metrics
+        :param rate_limit: Optional maximum sustained number of requests per second
+        :param retry_policy: Retry policy for throttled (429) or failed requests. Defaults to RetryPolicy().
+                             Its backoffs are waited with asyncio.sleep rather than the policy's sleep function
+        """
+        if aiohttp is None:
+            raise ImportError('aiohttp is required for the asyncio client. Install it with `pip install pysofar[async]`')
+
+        self._token = custom_token or get_token()
+        self.endpoint = get_endpoint()
+        self.header = {'token': self._token, 'Content-Type': 'application/json'}
+
+        self.max_concurrency = max_concurrency
+        self._pool_size = pool_size
+        self.decoder = decoder or default_decoder()
+        self.hooks = hooks
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit is not None else None
+        self.retry_policy = retry_policy or RetryPolicy()
+
+        # created on first use, since they must belong to a running event loop
+        self.http_session = None
+        self._semaphore = None
+
+    def _ensure_session(self):
+        if self.http_session is None:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self._pool_size)
+            self.http_session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        """
+        Closes the pooled connections
+        """
+        if self.http_session is not None:
+            await self.http_session.close()
+            self.http_session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # Helper methods
+    async def _request(self, url, params: dict = None, json_data: dict = None, endpoint_suffix: str = '',
+                       method: str = 'GET'):
+        # like SofarConnection._request, through the rate limiter and retrying throttled and failed requests
+        self._ensure_session()
+
+        if params is not None:
+            # unlike requests, aiohttp does not drop parameters without a value
+            params = {key: value for key, value in params.items() if value is not None}
+
+        hooks = self.hooks
+        if hooks is not None:
+            name = endpoint_name(endpoint_suffix)
+            hooks.request_start(name)
+            started = time.perf_counter()
+
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                wait = self.rate_limiter.reserve()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+
+            try:
+                async with self._semaphore:
+                    async with self.http_session.request(method, url, headers=self.header, params=params,
+                                                         json=json_data) as response:
+                        status = response.status
+                        retry_after = response.headers.get('Retry-After')
+                        content = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                # failures without a response, ex. a dropped connection or a timeout
+                if not self.retry_policy.should_retry(attempt):
+                    if hooks is not None:
+                        hooks.request_end(name, None, time.perf_counter() - started, 0, attempt)
+                    raise
+                delay = self.retry_policy.backoff(attempt)
+                if hooks is not None:
+                    hooks.retry(name, attempt, None, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            if not self.retry_policy.should_retry(attempt, status):
+                break
+
+            delay = self.retry_policy.backoff(attempt, retry_after)
+            if hooks is not None:
+                hooks.retry(name, attempt, status, delay)
+            if status == 429 and self.rate_limiter is not None:
+                # hold back the other requests of this client as well
+                self.rate_limiter.pause(delay)
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        if hooks is None:
+            return status, self.decoder(content)
+
+        received = time.perf_counter()
+        hooks.request_end(name, status, received - started, len(content), attempt)
+        data = self.decoder(content)
+        hooks.decode(name, time.perf_counter() - received, len(content))
+
+        return status, data
+
+    async def _get(self, endpoint_suffix, params: dict = None, endpoint: str = None):
+        return await self._request(f"{endpoint or self.endpoint}/{endpoint_suffix}", params=params,
+                                   endpoint_suffix=endpoint_suffix)
+
+    async def _post(self, endpoint_suffix, json_data):
+        return await self._request(f"{self.endpoint}/{endpoint_suffix}", json_data=json_data,
+                                   endpoint_suffix=endpoint_suffix, method='POST')
+
+    @property
+    def context(self) -> ClientContext:
+        """
+        Context (token, endpoint and settings) of this client, borrowed by its queries
+
+        :return: ClientContext, without a (synchronous) http session
+        """
+        return ClientContext(self._token, self.endpoint, self.header, rate_limiter=self.rate_limiter,
+                             retry_policy=self.retry_policy, decoder=self.decoder, hooks=self.hooks)
+
+    def set_token(self, new_token):
+        self._token = new_token
+        self.header.update({'token': new_token})
+
+    @property
+    def token(self):
+        return self._token
+
+
+class AsyncSofarApi(AsyncSofarConnection):
+    """
+    Class for interfacing with the Sofar Wavefleet API from asyncio code.
+    Mirrors SofarApi, with every api method being a coroutine.
+    Unlike SofarApi it has no local store (see pysofar.store): all data is requested from the api
+    """
+    def __init__(self, custom_token=None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 pool_size: int = DEFAULT_POOL_SIZE, decoder=None, hooks: RequestHooks = None,
+                 rate_limit: float = None, retry_policy: RetryPolicy = None):
+        """
+
+        :param custom_token: Optional api token, otherwise read from the environment
+        :param max_concurrency: Maximum number of requests in flight at once across all calls on this api
+        :param pool_size: Maximum number of open connections per host
+        :param decoder: Optional function decoding the raw bytes of a response body. Defaults to orjson when
+                        installed, else the standard library json module
+        :param hooks: Optional RequestHooks called on the events of every request, see pysofar.metrics
+        :param rate_limit: Optional maximum sustained number of requests per second, shared with the sync_api
+        :param retry_policy: Retry policy for throttled (429) or failed requests. Defaults to RetryPolicy(),
+                             RetryPolicy(max_retries=0) disables retries
+        """
+        super().__init__(custom_token, max_concurrency=max_concurrency, pool_size=pool_size, decoder=decoder,
+                         hooks=hooks, rate_limit=rate_limit, retry_policy=retry_policy)
+
+        # populated by sync(), which is awaited on first use of the multi Spotter endpoints
+        self.devices = []
+        self.device_ids = []
+        self._synced = False
+
+        # shared by the Spotters of get_spotters, created on first use
+        self._sync_api = None
+
+    @property
+    def sync_api(self) -> SofarApi:
+        """
+        SofarApi with the token, endpoint and settings of this client, shared by the Spotters of get_spotters for
+        their own (synchronous) api methods. Created on first use and closed with this client
+
+        :return: SofarApi
+        """
+        if self._sync_api is None:
+            self._sync_api = SofarApi(self._token, pool_size=self._pool_size, retry_policy=self.retry_policy,
+                                      decoder=self.decoder, hooks=self.hooks)
+            self._sync_api.endpoint = self.endpoint
+            self._sync_api.rate_limiter = self.rate_limiter
+        return self._sync_api
+
+    async def close(self):
+        """
+        Closes the pooled connections, and those of the sync_api if created
+        """
+        await super().close()
+
+        if self._sync_api is not None:
+            self._sync_api.close()
+            self._sync_api = None
+
+    # ---------------------------------- Simple Device Endpoints -------------------------------------- #
+    async def get_device_location_data(self):
+        """
+
+        :return: The most recent locations of all Spotters belonging to this account
+        """
+        status_code, data = await self._get('device-radius')
+
+        if status_code != 200:
+            raise QueryError(data['message'])
+
+        return data['data']['devices']
+
+    # ---------------------------------- Single Spotter Endpoints -------------------------------------- #
+    async def get_latest_data(self, spotter_id: str,
+                              include_wind_data: bool = False,
+                              include_directional_moments: bool = False,
+                              include_barometer_data: bool = False,
+                              include_partition_data: bool = False,
+                              include_surface_temp_data: bool = False
+                              ):
+        """
+        See SofarApi.get_latest_data
+
+        :return: The latest data values based on the given parameters from the requested Spotter
+        """
+        params = _latest_data_params(spotter_id, include_wind_data, include_directional_moments,
+                                     include_barometer_data, include_partition_data, include_surface_temp_data)
+
+        scode, results = await self._get('/latest-data', params=params)
+
+        if scode != 200:
+            raise QueryError(results['message'])
+
+        return results['data']
+
+    async def get_sensor_data(self, spotter_id: str, start_date: str, end_date: str):
+        """
+        See SofarApi.get_sensor_data
+
+        :return: Data as a json from the requested Spotter
+        """
+        params = {
+            "spotterId": spotter_id,
+            "startDate": start_date,
+            "endDate": end_date
+        }
+
+        scode, results = await self._get('/sensor-data', params=params)
+
+        if scode != 200:
+            raise QueryError(results['message'])
+
+        return results['data']
+
+    async def update_spotter_name(self, spotter_id, new_spotter_name):
+        """
+        See SofarApi.update_spotter_name
+
+        :return: The new name if the query succeeds else throws an error
+        """
+        body = {
+            "spotterId": spotter_id,
+            "name": new_spotter_name
+        }
+
+        scode, response = await self._post("change-name", body)
+
+        if scode != 200:
+            raise QueryError(f"{response['message']}")
+
+        return new_spotter_name
+
+    async def get_cellular_signal_metrics(self, spotter_id: str, limit: int = 20, order_ascending: bool = False,
+                                          start_epoch_ms: int = None, end_epoch_ms: int = None):
+        """
+        See Spotter.grab_cellular_signal_metrics
+
+        :return: Data as a json based on the given query parameters
+        """
+        params = {
+            'spotterId': spotter_id,
+            'limit': limit,
+            'order_ascending': str(order_ascending).lower(),
+        }
+
+        if start_epoch_ms:
+            params['since_epoch_ms'] = str(start_epoch_ms)
+
+        if end_epoch_ms:
+            params['before_epoch_ms'] = str(end_epoch_ms)
+
+        scode, data = await self._get(f"devices/{spotter_id}/cellular-signal-metrics", params=params,
+                                      endpoint=SofarUserRestQuery.get_user_rest_endpoint())
+
+        if scode != 200:
+            raise QueryError(data['message'])
+
+        return data['data']
+
+    # ---------------------------------- Multi Spotter Endpoints -------------------------------------- #
+    async def get_wave_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+        """
+        See SofarApi.get_wave_data
+        """
+        return await self._get_all_data(['waves'], start_date, end_date, params)
+
+    async def get_wind_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+        """
+        See SofarApi.get_wind_data
+        """
+        return await self._get_all_data(['wind'], start_date, end_date, params)
+
+    async def get_frequency_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+        """
+        See SofarApi.get_frequency_data
+        """
+        return await self._get_all_data(['frequency'], start_date, end_date, params)
+
+    async def get_track_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+        """
+        See SofarApi.get_track_data
+        """
+        return await self._get_all_data(['track'], start_date, end_date, params)
+
+    async def get_all_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+        """
+        See SofarApi.get_all_data
+        """
+        return await self._get_all_data(['waves', 'wind', 'frequency', 'track'], start_date, end_date, params)
+
+    async def get_spotters(self, spotters: list = None):
+        """
+        Spotter objects for all devices, updated with their latest data.
+        The Spotters' own (synchronous) api methods share this client's sync_api
+
+        :param spotters: Optional Spotter objects of a previous call to refresh, see
+                         pysofar.sofar.get_and_update_spotters
+
+        :return: A list of the Spotter objects associated with this account
+        """
+        from pysofar.spotter import Spotter
+
+        await self._ensure_synced()
+
+        async def _update_worker(sptr):
+            sptr._apply_latest_data(await self.get_latest_data(sptr.id))
+            return sptr
+
+        async def _spot_worker(device):
+            return await _update_worker(Spotter(device['spotterId'], device['name'], self.sync_api))
+
+        if spotters is None:
+            return list(await asyncio.gather(*[_spot_worker(device) for device in self.devices]))
+
+        current, stale, new_devices = _stale_spotters(spotters, self.devices, await self.get_device_location_data())
+        await asyncio.gather(*[_update_worker(sptr) for sptr in stale])
+        added = await asyncio.gather(*[_spot_worker(device) for device in new_devices])
+
+        return current + list(added)
+
+    async def search(self, shape: str, shape_params: List[Tuple], start_date: str, end_date: str,
+                     radius=None, page_size=100, return_generator=False):
+        """
+        See SofarApi.search. If return_generator is True an async generator is returned
+        """
+        params = _search_params(shape, shape_params, start_date, end_date, radius, page_size)
+
+        async def get_function(endpoint_suffix, params):
+            scode, data = await self._get(endpoint_suffix, params=params)
+            if scode != 200:
+                raise QueryError(data['message'])
+            return data
+
+        if return_generator:
+            return async_unpaginate(get_function, 'search', params)
+        else:
+            return [item async for item in async_unpaginate(get_function, 'search', params)]
+
+    # ---------------------------------- Helper Functions -------------------------------------- #
+    async def sync(self):
+        """
+        Refreshes the devices belonging to this account
+        """
+        scode, data = await self._get('/devices')
+
+        if scode != 200:
+            raise QueryError(data['message'])
+
+        self.devices = data['data']['devices']
+        self.device_ids = [device['spotterId'] for device in self.devices]
+        self._synced = True
+
+    async def _ensure_synced(self):
+        if not self._synced:
+            await self.sync()
+
+    async def _get_all_data(self, worker_names: list, start_date: str = None, end_date: str = None,
+                            params: dict = None):
+        await self._ensure_synced()
+
+        # default to bound values if not included
+        st = start_date or '2000-01-01T00:00:00.000Z'
+        end = end_date or datetime.utcnow()
+
+        async def helper(_name):
+            queries = [AsyncWaveDataQuery(_id, limit=500, start_date=st, end_date=end, params=params, api=self)
+                       for _id in self.device_ids]
+
+            # every walk shares this api's semaphore, which bounds the requests in flight
+            worker_data = await asyncio.gather(*[_async_worker(_name, query) for query in queries])
+            return _sort_by_time(list(chain(*worker_data)))
+
+        all_data = await asyncio.gather(*[helper(_name) for _name in worker_names])
+
+        return {name: l for name, l in zip(worker_names, all_data)}
+
+
+class AsyncWaveDataQuery(WaveDataQuery):
+    """
+    asyncio version of WaveDataQuery. Requests go through the given AsyncSofarApi
+    """
+    __slots__ = ('_owns_api', '_api')
+
+    _MISSING = WaveDataQuery._MISSING
+
+    def __init__(self, spotter_id: str, limit: int = 20, start_date=_MISSING, end_date=_MISSING, params=None,
+                 api: AsyncSofarConnection = None):
+        """
+        See WaveDataQuery
+
+        :param api: Optional AsyncSofarApi whose connections and concurrency limit are shared, otherwise
+                    a connection owned by this query is created
+        """
+        self._owns_api = api is None
+        self._api = api or AsyncSofarConnection()
+        super().__init__(spotter_id, limit, start_date, end_date, params, api=self._api)
+
+    async def execute(self):
+        """
+        Calls the api wave-data endpoint.
+        If successful, returns the queried data with the set query parameters
+
+        :return: Data as a dictionary, of records if set with as_records
+        """
+        scode, data = await self._api._get('wave-data', params=self._params)
+
+        if scode != 200:
+            raise QueryError(data['message'])
+
+        data = data['data']
+        if self._as_records:
+            data = to_records(data)
+
+        return data
+
+    def copy(self, start_date=_MISSING, end_date=_MISSING):
+        """
+        Copy of this query with the same parameters, sharing this query's AsyncSofarApi
+
+        :param start_date: Optional new start date for the copy, None for no lower bound
+        :param end_date: Optional new end date for the copy, None for no upper bound
+
+        :return: The new AsyncWaveDataQuery
+        """
+        start_date = self.start_date if start_date is self._MISSING else start_date
+        end_date = self.end_date if end_date is self._MISSING else end_date
+
+        params = {key: value for key, value in self._params.items() if key not in ('startDate', 'endDate')}
+
+        query = AsyncWaveDataQuery(self.spotter_id, self._limit, start_date, end_date, params=params, api=self._api)
+        query.as_records(self._as_records)
+
+        return query
+
+    def shards(self, count: int):
+        """
+        Splits the period of this query into consecutive time shards. See WaveDataQuery.shards
+
+        :param count: The number of shards. Queries without a start date can not be split
+
+        :return: A list of AsyncWaveDataQuery, one per shard, in time order
+        """
+        # the shards are copies of this query, so asyncio queries as well
+        return super().shards(count)
+
+    async def close(self):
+        """
+        Closes the pooled connections, if this query owns them
+        """
+        if self._owns_api:
+            await self._api.close()
+
+
+# ---------------------------------- Workers -------------------------------------- #
+async def _async_worker(data_type, data_query: AsyncWaveDataQuery):
+    """
+    Worker to grab data from certain data type for a specific query. See _worker in sofar.py
+
+    :param data_type: The desired data type
+    :param data_query: The query to page through
+
+    :return: All data of that type for the query's Spotter in the query period
+    """
+    walk = _PageWalk(data_query, data_type)
+
+    query_data = []
+    boundary = _Boundary()
+    while not walk.done:
+        results = walk.advance(await data_query.execute())
+        query_data.extend(boundary.drop_overlap(results))
+
+    return query_data
+
+
+async def async_unpaginate(get_function, endpoint_suffix, params):
+    """
+    Async generator to unpaginate a paginated request. See unpaginate in sofar.py
+
+    :param get_function: the coroutine _get fuction that takes an endpoint suffix and params as arguments
+    :param endpoint_suffix: endpoint to hit from the Sofar Api
+    :param params: dict of additional query parameters to write beyond default values
+    """
+    suffix = endpoint_suffix
+    while True:
+        page = await get_function(suffix, params)
+
+        for item in page['data']:
+            yield item
+
+        if page['metadata']['page']['hasMoreData']:
+            url = page['metadata']['page']['nextPage']
+            suffix = endpoint_suffix + url.split(endpoint_suffix)[1]
+            params = None
+        else:
+            break
@@ -0,0 +1,40 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: JSON decoding of API responses
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def stdlib_decoder(content: bytes):
+    """
+    Decodes a response body with the standard library
+
+    :param content: Raw (utf-8) bytes of the response body
+
+    :return: The decoded JSON
+    """
+    return json.loads(content)
+
+
+def default_decoder():
+    """
+    Fastest available decoder: orjson when installed (`pip install pysofar[fast-json]`), else the standard library.
+    Both decode straight from the raw bytes of the response, without decoding them to a string first
+
+    :return: Function decoding the raw bytes of a response body
+    """
+    if orjson is not None:
+        return orjson.loads
+
+    return stdlib_decoder
@@ -0,0 +1,129 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Vectorized estimation of directional wave spectra from the directional moments of frequency data
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from pysofar.arrays import _require_numpy
+from pysofar.spectra import SpectralData
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Number of spectra estimated at once by default, bounding the size of the temporary arrays
+DEFAULT_CHUNK_SIZE = 256
+
+
+def default_directions():
+    """
+
+    :return: Directions (nautical, coming from) in degrees, 0 to 355 in steps of 5
+    """
+    _require_numpy()
+    return np.arange(0.0, 360.0, 5.0)
+
+
+def directional_spectrum(spectra: SpectralData, directions=None, method: str = 'mem',
+                         chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Estimates the directional spectra E(f, direction) = E(f) * D(f, direction) of all spectra of a SpectralData
+    from their directional moments (a1, b1, a2, b2), computing chunk_size spectra at a time
+
+    :param spectra: SpectralData including the directional moments, ex. from
+                    get_frequency_data(as_spectra=True). Query the data with directional_moments(True)
+    :param directions: Directions (nautical, coming from) in degrees to evaluate. Defaults to default_directions()
+    :param method: The directional spreading estimator:
+                    - 'mem': maximum entropy method (Lygre & Krogstad, 1986), using a1, b1, a2 and b2
+                    - 'cos2s': cosine-2s distribution (Longuet-Higgins et al., 1963) fit to a1 and b1
+    :param chunk_size: Number of spectra estimated at once
+
+    :return: (time x frequency x direction) array of the energy density in m^2/Hz/degree
+    """
+    directions = default_directions() if directions is None else np.asarray(directions, dtype=np.float64)
+    output = np.empty((len(spectra), len(spectra.frequency), len(directions)))
+
+    for start, density in iter_directional_spectrum(spectra, directions, method, chunk_size):
+        output[start:start + len(density)] = density
+
+    return output
+
+
+def iter_directional_spectrum(spectra: SpectralData, directions=None, method: str = 'mem',
+                              chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """
+    Generator version of directional_spectrum, so that the full (time x frequency x direction) output never has to
+    be held in memory at once
+
+    :return: Generator of tuples of the index of the first spectrum of a chunk and the chunk's
+             (time x frequency x direction) energy density
+    """
+    _require_numpy()
+
+    if method not in _ESTIMATORS:
+        raise ValueError(f"method needs to be one of {', '.join(_ESTIMATORS)}")
+
+    moments = ('a1', 'b1', 'a2', 'b2') if method == 'mem' else ('a1', 'b1')
+    missing = [key for key in moments if key not in spectra]
+    if len(missing) > 0:
+        raise ValueError(f"the spectra do not include the directional moments {', '.join(missing)}. "
+                         f"Query them with directional_moments(True)")
+
+    directions = default_directions() if directions is None else np.asarray(directions, dtype=np.float64)
+    # cartesian angles of the nautical directions, matching the convention of the moments
+    angles = np.radians(270.0 - directions)
+    step = _direction_step(directions)
+
+    estimator = _ESTIMATORS[method]
+    for start in range(0, len(spectra), chunk_size):
+        rows = slice(start, start + chunk_size)
+        spreading = estimator(*[spectra[key][rows, :, None] for key in moments], angles)
+
+        # normalized so the spreading integrates to one over the evaluated directions
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spreading /= (spreading * step).sum(axis=2, keepdims=True)
+
+        yield start, spreading * spectra['varianceDensity'][rows, :, None]
+
+
+def _cos2s(a1, b1, angles):
+    # cosine-2s spreading, with the mean direction and spread of the first order moments
+    mean_angle = np.arctan2(b1, a1)
+    r1 = np.clip(np.sqrt(a1 ** 2 + b1 ** 2), 0.0, 1 - 1e-6)
+    s = r1 / (1 - r1)
+
+    return np.abs(np.cos((angles - mean_angle) / 2)) ** (2 * s)
+
+
+def _mem(a1, b1, a2, b2, angles):
+    # maximum entropy spreading of Lygre & Krogstad (1986)
+    c1 = a1 + 1j * b1
+    c2 = a2 + 1j * b2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phi1 = (c1 - c2 * np.conj(c1)) / (1 - np.abs(c1) ** 2)
+    phi2 = c2 - c1 * phi1
+
+    numerator = (1 - phi1 * np.conj(c1) - phi2 * np.conj(c2)).real
+    denominator = np.abs(1 - phi1 * np.exp(-1j * angles) - phi2 * np.exp(-2j * angles)) ** 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.clip(numerator / denominator, 0.0, None)
+
+
+def _direction_step(directions):
+    # width in degrees of the direction bins, for evenly or unevenly spaced directions around the circle
+    if len(directions) < 2:
+        return np.full(len(directions), 360.0)
+
+    following = np.mod(np.roll(directions, -1) - directions, 360.0)
+    preceding = np.mod(directions - np.roll(directions, 1), 360.0)
+    return (following + preceding) / 2
+
+
+_ESTIMATORS = {'mem': _mem, 'cos2s': _cos2s}
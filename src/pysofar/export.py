@@ -0,0 +1,105 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Streaming export of Spotter data to Parquet files partitioned by Spotter and day
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from datetime import datetime
+from pysofar.arrays import ColumnBuilder
+from pysofar.frames import to_arrow
+from pysofar.sofar import WaveDataQuery, _Boundary, _borrow_scheduler, _iter_pages
+
+import os
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+def export_parquet(api, root: str, start_date: str = None, end_date: str = None, data_types=('waves',),
+                   params: dict = None, spotter_ids: list = None, compression: str = 'snappy') -> list:
+    """
+    Streams wave-data pages of all Spotters into Parquet files, one file per data type, Spotter and day, laid out
+    as hive partitions:
+
+        root/data_type=waves/spotter_id=SPOT-0001/date=2021-01-01/part-0.parquet
+
+    Pages are written out as soon as a day is complete, so at most one day of data per concurrently walked
+    Spotter is held in memory. Existing files of an exported day are replaced, so the export of a period can
+    simply be run again. Note that the first and last day only hold the samples within the exported period
+
+    :param api: The SofarApi to request the data with
+    :param root: Directory to write the partitions to
+    :param start_date: ISO8601 start date of data period
+    :param end_date: ISO8601 end date of data period
+    :param data_types: Data types to export, ex. waves, wind, track, frequency
+    :param params: dict of additional query parameters to write beyond default values
+    :param spotter_ids: Spotters to export. Defaults to all of the api's devices
+
+    :return: List of the paths of the written files
+    """
+    if pq is None:
+        raise ImportError('pyarrow is required for Parquet export. Install it with `pip install pysofar[arrow]`')
+
+    st = start_date or '2000-01-01T00:00:00.000Z'
+    end = end_date or datetime.utcnow()
+    spotter_ids = spotter_ids if spotter_ids is not None else api.device_ids
+
+    with _borrow_scheduler(api) as scheduler:
+        futures = [scheduler.submit(_export_walk, WaveDataQuery(_id, limit=500, start_date=st, end_date=end,
+                                                                params=params, api=api),
+                                    data_type, root, compression, endpoint='wave-data')
+                   for data_type in data_types for _id in spotter_ids]
+
+        return [path for paths in scheduler.wait(futures) for path in paths]
+
+
+def partition_path(root: str, data_type: str, spotter_id: str, day: str) -> str:
+    """
+
+    :return: Path of the Parquet file of a data type, Spotter and day (YYYY-MM-DD)
+    """
+    return os.path.join(root, f'data_type={data_type}', f'spotter_id={spotter_id}', f'date={day}', 'part-0.parquet')
+
+
+def _export_walk(data_query, data_type, root, compression):
+    # pages through a single Spotter's period, writing every day once its last sample has arrived
+    written = []
+    builder = ColumnBuilder()
+    day = None
+    boundary = _Boundary()
+
+    for results in _iter_pages(data_query, data_type):
+        for record in boundary.drop_overlap(results):
+            record_day = record['timestamp'][:10]
+
+            if record_day != day:
+                if day is not None:
+                    written.append(_write_day(builder, root, data_type, data_query.spotter_id, day, compression))
+                builder = ColumnBuilder()
+                day = record_day
+
+            # the partition already holds the Spotter id
+            builder.append({key: value for key, value in record.items() if key != 'spotterId'})
+
+    if day is not None:
+        written.append(_write_day(builder, root, data_type, data_query.spotter_id, day, compression))
+
+    return written
+
+
+def _write_day(builder, root, data_type, spotter_id, day, compression):
+    path = partition_path(root, data_type, spotter_id, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # written next to the final file and moved in place, so readers never see a partial file
+    temp_path = path + '.tmp'
+    pq.write_table(to_arrow(builder.build()), temp_path, compression=compression)
+    os.replace(temp_path, path)
+
+    return path
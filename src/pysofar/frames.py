@@ -0,0 +1,158 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Conversion of Spotter data to pandas DataFrames and Arrow Tables
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from pysofar.arrays import RecordArrays, records_to_arrays, _TimeColumn
+from pysofar.spectra import SpectralData
+
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+def to_dataframe(data):
+    """
+    Converts Spotter data to pandas DataFrames.
+
+    Columns are built directly from the samples (or the arrays of as_arrays=True results), so the samples are
+    never held both as dictionaries and as a DataFrame when given a generator, ex. search(..., return_generator=True)
+        - timestamp: datetime64 in UTC, NaT where missing
+        - numeric fields: float64, nan where missing
+        - string fields (ex. spotterId): categorical
+
+    :param data: One of
+                    - RecordArrays (as_arrays=True results)
+                    - SpectralData, flattened to one row per spectrum and frequency
+                    - a list or iterable of samples, ex. the results of search, get_wave_data
+                      or CellularSignalMetricsQuery.execute
+                    - a dictionary of Spotter id to SpectralData (as_spectra=True results), as a single table
+                    - a dictionary of data type to any of the above, ex. the results of get_all_data (including
+                      as_arrays=True and return_generator=True) or Spotter.grab_data
+
+    :return: A DataFrame, or a dictionary of data type to DataFrame if given a dictionary
+    """
+    if pd is None:
+        raise ImportError('pandas is required for DataFrame output. Install it with `pip install pysofar[pandas]`')
+
+    return _convert(data, _arrays_to_dataframe)
+
+
+def to_arrow(data):
+    """
+    Converts Spotter data to Arrow Tables. Same as to_dataframe, with timestamps as timestamp[ms, UTC], string
+    fields dictionary encoded and missing values as nulls
+
+    :param data: RecordArrays, SpectralData, a list or iterable of samples, or a dictionary of data type to any of
+                 those, see to_dataframe
+
+    :return: A Table, or a dictionary of data type to Table if given a dictionary
+    """
+    if pa is None:
+        raise ImportError('pyarrow is required for Arrow output. Install it with `pip install pysofar[arrow]`')
+
+    return _convert(data, _arrays_to_table)
+
+
+def _convert(data, convert):
+    if isinstance(data, dict):
+        if len(data) > 0 and all(isinstance(value, SpectralData) for value in data.values()):
+            # the Spotter id to SpectralData of as_spectra=True results
+            return convert(RecordArrays.concatenate([_spectra_to_arrays(value) for value in data.values()]))
+
+        # only the data types, ex. not the spotterId of grab_data results
+        return {key: _convert(value, convert) for key, value in data.items() if not _is_scalar(value)}
+
+    if isinstance(data, SpectralData):
+        data = _spectra_to_arrays(data)
+    elif not isinstance(data, RecordArrays):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            raise TypeError(f"can not convert {type(data).__name__} to a table, expected RecordArrays, SpectralData, "
+                            f"samples or a dictionary of those")
+        data = records_to_arrays(data)
+
+    return convert(data)
+
+
+def _is_scalar(value):
+    # a single value of a results dictionary rather than data, ex. its spotterId
+    return value is None or isinstance(value, (str, int, float))
+
+
+def _spectra_to_arrays(spectra: SpectralData):
+    # one row per spectrum and frequency, with the columns of the frequencyData samples
+    size = len(spectra.frequency)
+    columns = {
+        'timestamp': np.repeat(spectra.timestamp, size),
+        'latitude': np.repeat(spectra.latitude, size),
+        'longitude': np.repeat(spectra.longitude, size),
+        'frequency': np.tile(spectra.frequency, len(spectra)),
+        'df': np.tile(spectra.df, len(spectra)),
+    }
+    columns.update((key, values.reshape(-1)) for key, values in spectra.fields.items())
+
+    categories = {}
+    if spectra.spotter_id is not None:
+        columns['spotterId'] = np.zeros(len(spectra) * size, dtype=np.int32)
+        categories['spotterId'] = np.array([spectra.spotter_id], dtype=object)
+
+    return RecordArrays(columns, categories, len(spectra) * size)
+
+
+def _arrays_to_dataframe(arrays: RecordArrays):
+    columns = {}
+
+    for key, values in arrays.items():
+        if key in arrays.categories:
+            columns[key] = pd.Categorical.from_codes(values, categories=arrays.categories[key])
+        elif values.dtype == np.int64:
+            # the missing value of the int64 timestamps is NaT, so this is a view of the same data
+            columns[key] = pd.DatetimeIndex(values.view('datetime64[ms]')).tz_localize('UTC')
+        else:
+            columns[key] = values
+
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(arrays)), copy=False)
+
+
+def _arrays_to_table(arrays: RecordArrays):
+    columns = {}
+
+    for key, values in arrays.items():
+        if key in arrays.categories:
+            indices = pa.array(values, mask=values < 0)
+            columns[key] = pa.DictionaryArray.from_arrays(indices, pa.array(list(arrays.categories[key]),
+                                                                            type=pa.string()))
+        elif values.dtype == np.int64:
+            columns[key] = pa.array(values, type=pa.timestamp('ms', tz='UTC'), mask=values == _TimeColumn._MISSING)
+        elif values.dtype == np.float64:
+            columns[key] = pa.array(values, from_pandas=True)
+        else:
+            columns[key] = _object_array(values)
+
+    return pa.table(columns)
+
+
+def _object_array(values):
+    try:
+        return pa.array(values, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # values of mixed types are kept as json
+        return pa.array([None if value is None else json.dumps(value) for value in values], type=pa.string())
@@ -0,0 +1,234 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Instrumentation hooks for the requests of a client, and an in memory metrics collector
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import threading
+
+# Upper bounds in seconds of the latency histogram buckets. Slower requests fall in a last, unbounded bucket
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def endpoint_name(endpoint_suffix: str) -> str:
+    """
+
+    :param endpoint_suffix: Path of a request relative to the api endpoint, ex. '/latest-data',
+                            'devices/SPOT-0001/cellular-signal-metrics' or 'search?shape=circle&...' for the next
+                            pages of a search
+
+    :return: Name of the endpoint without Spotter ids or query, ex. 'latest-data' or 'cellular-signal-metrics'
+    """
+    return urlsplit(endpoint_suffix).path.strip('/').rsplit('/', 1)[-1]
+
+
+class RequestHooks:
+    """
+    Hooks called by a client (and everything created from it) as it makes requests. Every hook does nothing here;
+    subclass and override the events of interest. Hooks are called from the worker threads, so implementations
+    need to be thread safe
+    """
+    def request_start(self, endpoint: str):
+        """
+        A request is about to be sent, before waiting on the rate limiter
+
+        :param endpoint: Name of the endpoint, see endpoint_name
+        """
+
+    def request_end(self, endpoint: str, status: int, seconds: float, bytes_in: int, retries: int):
+        """
+        A request is done
+
+        :param endpoint: Name of the endpoint
+        :param status: HTTP status of the final response, None if the request failed without one
+        :param seconds: Time from request_start to the final response, including retries and rate limiting
+        :param bytes_in: Size of the final response body
+        :param retries: Number of retries it took
+        """
+
+    def retry(self, endpoint: str, attempt: int, status: int, delay: float):
+        """
+        A throttled or failed request is retried
+
+        :param endpoint: Name of the endpoint
+        :param attempt: Number of the attempt that failed, starting at 0
+        :param status: HTTP status of the failed attempt, None for a connection error or timeout
+        :param delay: Backoff in seconds before the next attempt
+        """
+
+    def decode(self, endpoint: str, seconds: float, bytes_in: int):
+        """
+        A response body was decoded
+
+        :param endpoint: Name of the endpoint
+        :param seconds: Time taken by the decoder
+        :param bytes_in: Size of the decoded body
+        """
+
+    def page(self, spotter_id: str, data_type: str, samples: int):
+        """
+        A page of wave data arrived while paging through a period
+
+        :param spotter_id: The Spotter the page belongs to
+        :param data_type: The data type of the samples, ex. 'waves'. A page of several data types calls this
+                          for each of them
+        :param samples: Number of samples in the page
+        """
+
+    def queue_wait(self, endpoint: str, seconds: float):
+        """
+        A task of the worker pool started
+
+        :param endpoint: Endpoint of the task, None for tasks without one
+        :param seconds: Time the task waited in the queue
+        """
+
+    def stage(self, name: str, seconds: float, items: int):
+        """
+        A processing step of the results finished, ex. 'sort' when the samples of all Spotters are ordered
+
+        :param name: Name of the step
+        :param seconds: Time taken
+        :param items: Number of samples processed
+        """
+
+
+class _EndpointStats:
+    __slots__ = ('requests', 'retries', 'errors', 'bytes_in', 'seconds', 'max_seconds', 'decode_seconds',
+                 'queue_waits', 'queue_seconds', 'statuses', 'histogram')
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.queue_waits = 0
+        self.queue_seconds = 0.0
+        self.statuses = defaultdict(int)
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+class MetricsCollector(RequestHooks):
+    """
+    Hooks keeping counts, timings and latency histograms per endpoint in memory.
+
+    Pass one to a SofarApi with `SofarApi(hooks=MetricsCollector())`, run the calls of interest and read
+    summary(), ex. to tell whether time goes to the network, decoding or sorting the results
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(_EndpointStats)
+        self._pages = defaultdict(lambda: [0, 0])
+        self._stages = defaultdict(lambda: [0, 0.0, 0])
+
+    def request_end(self, endpoint: str, status: int, seconds: float, bytes_in: int, retries: int):
+        with self._lock:
+            stats = self._endpoints[endpoint]
+            stats.requests += 1
+            stats.retries += retries
+            stats.bytes_in += bytes_in
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.statuses[status] += 1
+            stats.histogram[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            if status is None or status >= 400:
+                stats.errors += 1
+
+    def decode(self, endpoint: str, seconds: float, bytes_in: int):
+        with self._lock:
+            self._endpoints[endpoint].decode_seconds += seconds
+
+    def page(self, spotter_id: str, data_type: str, samples: int):
+        with self._lock:
+            counts = self._pages[spotter_id, data_type]
+            counts[0] += 1
+            counts[1] += samples
+
+    def queue_wait(self, endpoint: str, seconds: float):
+        with self._lock:
+            stats = self._endpoints[endpoint]
+            stats.queue_waits += 1
+            stats.queue_seconds += seconds
+
+    def stage(self, name: str, seconds: float, items: int):
+        with self._lock:
+            totals = self._stages[name]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += items
+
+    def histogram(self, endpoint: str) -> list:
+        """
+
+        :param endpoint: Name of the endpoint, ex. 'wave-data'
+
+        :return: List of (upper bound in seconds, number of requests) of the latency buckets, the last bound is
+                 infinite
+        """
+        with self._lock:
+            counts = list(self._endpoints[endpoint].histogram) if endpoint in self._endpoints else \
+                [0] * (len(LATENCY_BUCKETS) + 1)
+
+        return list(zip(LATENCY_BUCKETS + (float('inf'),), counts))
+
+    def pages(self) -> dict:
+        """
+
+        :return: Dictionary of (Spotter id, data type) to a tuple of the number of pages and samples received
+        """
+        with self._lock:
+            return {key: tuple(counts) for key, counts in self._pages.items()}
+
+    def summary(self) -> dict:
+        """
+
+        :return: Dictionary with:
+                    - endpoints: per endpoint, the number of requests, retries and errors, the status codes, bytes
+                      received, total and mean request seconds, max request seconds, decode seconds and the mean
+                      queue wait of its tasks in the worker pool
+                    - stages: per processing step, the number of runs, total seconds and samples processed
+                    - pages: total pages and samples received
+        """
+        with self._lock:
+            endpoints = {}
+            for endpoint, stats in self._endpoints.items():
+                endpoints[endpoint] = {
+                    'requests': stats.requests,
+                    'retries': stats.retries,
+                    'errors': stats.errors,
+                    'statuses': dict(stats.statuses),
+                    'bytes_in': stats.bytes_in,
+                    'seconds': stats.seconds,
+                    'mean_seconds': stats.seconds / stats.requests if stats.requests > 0 else None,
+                    'max_seconds': stats.max_seconds,
+                    'decode_seconds': stats.decode_seconds,
+                    'mean_queue_wait': stats.queue_seconds / stats.queue_waits if stats.queue_waits > 0 else None,
+                }
+
+            stages = {name: {'runs': runs, 'seconds': seconds, 'items': items}
+                      for name, (runs, seconds, items) in self._stages.items()}
+
+            pages = {'pages': sum(counts[0] for counts in self._pages.values()),
+                     'samples': sum(counts[1] for counts in self._pages.values())}
+
+        return {'endpoints': endpoints, 'stages': stages, 'pages': pages}
+
+    def reset(self):
+        """
+        Clears all collected metrics
+        """
+        with self._lock:
+            self._endpoints.clear()
+            self._pages.clear()
+            self._stages.clear()
@@ -0,0 +1,157 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Compact record types for Spotter samples
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from collections.abc import MutableMapping
+
+
+class SpotterRecord(MutableMapping):
+    """
+    Base of the record types. A sample stored in __slots__ instead of a dictionary, so the keys are not kept
+    per sample. Records can be used as dictionaries (record['timestamp'], record.get, record.items, ...) as well as
+    through attributes (record.timestamp). Fields the API did not return are missing, as with dictionaries, and
+    fields not known to the record type are kept in an extra dictionary.
+
+    Use dict(record) where an actual dictionary is needed, ex. for json.dumps
+    """
+    __slots__ = ('_extra',)
+    _fields = ()
+    _field_set = frozenset()
+
+    def __init__(self, data=None):
+        """
+
+        :param data: Optional dictionary of the sample's fields
+        """
+        self._extra = None
+
+        if data is not None:
+            for key, value in data.items():
+                self[key] = value
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls._fields)
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            setattr(self, key, value)
+        elif self._extra is None:
+            self._extra = {key: value}
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __iter__(self):
+        for key in self._fields:
+            if hasattr(self, key):
+                yield key
+
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __getstate__(self):
+        return dict(self)
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self)})'
+
+
+class WaveSample(SpotterRecord):
+    _fields = ('timestamp', 'significantWaveHeight', 'peakPeriod', 'meanPeriod', 'peakDirection',
+               'peakDirectionalSpread', 'meanDirection', 'meanDirectionalSpread', 'latitude', 'longitude',
+               'processing_source', 'spotterId')
+    __slots__ = _fields
+
+
+class WindSample(SpotterRecord):
+    _fields = ('timestamp', 'speed', 'direction', 'seasurfaceId', 'latitude', 'longitude', 'processing_source',
+               'spotterId')
+    __slots__ = _fields
+
+
+class TrackPoint(SpotterRecord):
+    _fields = ('timestamp', 'latitude', 'longitude', 'processing_source', 'spotterId')
+    __slots__ = _fields
+
+
+class SurfaceTempSample(SpotterRecord):
+    _fields = ('timestamp', 'degrees', 'latitude', 'longitude', 'processing_source', 'spotterId')
+    __slots__ = _fields
+
+
+class BarometerSample(SpotterRecord):
+    _fields = ('timestamp', 'value', 'units', 'unit_type', 'data_type_name', 'prominence', 'sensorPosition',
+               'latitude', 'longitude', 'processing_source', 'spotterId')
+    __slots__ = _fields
+
+
+class FrequencySample(SpotterRecord):
+    _fields = ('timestamp', 'frequency', 'df', 'varianceDensity', 'direction', 'directionalSpread', 'a1', 'b1',
+               'a2', 'b2', 'latitude', 'longitude', 'processing_source', 'spotterId')
+    __slots__ = _fields
+
+
+# record type of the results of each data type in a wave-data response
+RECORD_TYPES = {
+    'waves': WaveSample,
+    'wind': WindSample,
+    'track': TrackPoint,
+    'surfaceTemp': SurfaceTempSample,
+    'barometerData': BarometerSample,
+    'frequencyData': FrequencySample,
+}
+
+
+def to_records(data: dict) -> dict:
+    """
+    Converts the samples of a wave-data response to record types, in place.
+
+    The records are built from the decoded dictionaries, as the decoders can not tell the data type of a sample
+    while parsing, so decoding still allocates a dictionary per sample. Each dictionary is replaced by its record
+    in the same list though, releasing it as soon as it is converted rather than once the whole page is
+
+    :param data: The data of a wave-data response, ex. the result of WaveDataQuery.execute
+
+    :return: The same dictionary, with the lists of samples of the known data types as records
+    """
+    for dkey, record_type in RECORD_TYPES.items():
+        results = data.get(dkey)
+        if results:
+            for i, sample in enumerate(results):
+                results[i] = record_type(sample)
+
+    return data
@@ -0,0 +1,214 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Bounded thread scheduler shared by everything created from a SofarApi
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from collections import deque, defaultdict
+from concurrent.futures import Future
+
+import threading
+import time
+
+# Default number of worker threads, the global cap on concurrent tasks
+DEFAULT_MAX_CONCURRENCY = 16
+
+# Default number of seconds an idle worker thread waits for a task before exiting
+DEFAULT_IDLE_TIMEOUT = 30.0
+
+
+class _Task:
+    __slots__ = ('fn', 'args', 'endpoint', 'future', 'queued')
+
+    def __init__(self, fn, args, endpoint):
+        self.fn = fn
+        self.args = args
+        self.endpoint = endpoint
+        self.future = Future()
+        self.queued = time.perf_counter()
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            self.future.set_result(self.fn(*self.args))
+        except BaseException as e:
+            self.future.set_exception(e)
+
+
+class Scheduler:
+    """
+    A single pool of worker threads with a global concurrency cap and optional per endpoint limits.
+
+    All tasks share one queue, so workers pick up whatever task is next regardless of the data type or call
+    it belongs to. Tasks whose endpoint is at its limit are skipped in favour of other queued tasks. A worker
+    waiting on the results of tasks it submitted runs queued tasks itself in the meantime, so tasks can fan out
+    further work without deadlocking the pool.
+
+    Worker threads are started as tasks are queued and exit after idle_timeout seconds without a task, so an idle
+    scheduler holds no threads
+    """
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, endpoint_limits: dict = None,
+                 hooks=None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        """
+
+        :param max_concurrency: Number of worker threads, the maximum number of tasks running at once
+        :param endpoint_limits: Optional dictionary of endpoint (ex. 'wave-data', 'latest-data') to the maximum
+                                number of tasks for that endpoint running at once
+        :param hooks: Optional RequestHooks (see pysofar.metrics) told how long each task waited in the queue
+        :param idle_timeout: Seconds an idle worker thread waits for a task before exiting. None to keep the
+                             workers until shutdown
+        """
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency needs to be at least 1')
+
+        self.max_concurrency = max_concurrency
+        self.endpoint_limits = dict(endpoint_limits or {})
+        self.hooks = hooks
+        self.idle_timeout = idle_timeout
+
+        self._queue = deque()
+        self._running = defaultdict(int)
+        self._condition = threading.Condition()
+        self._threads = []
+        self._local = threading.local()
+        self._shutdown = False
+        self._started = 0
+
+    def submit(self, fn, *args, endpoint: str = None) -> Future:
+        """
+        Queues a task
+
+        :param fn: The function to run
+        :param args: Arguments to call it with
+        :param endpoint: Optional endpoint the task requests from, for the per endpoint limits
+
+        :return: Future of the task's result
+        """
+        task = _Task(fn, args, endpoint)
+
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError('Cannot submit to a scheduler which has been shut down')
+
+            self._queue.append(task)
+            if len(self._threads) < self.max_concurrency:
+                self._start_worker()
+            self._condition.notify_all()
+
+        task.future.add_done_callback(self._notify)
+
+        return task.future
+
+    def map(self, fn, iterable, endpoint: str = None) -> list:
+        """
+        Runs fn over the items of iterable on the pool
+
+        :return: List of the results in order
+        """
+        return self.wait([self.submit(fn, item, endpoint=endpoint) for item in iterable])
+
+    def starmap(self, fn, iterable, endpoint: str = None) -> list:
+        """
+        Runs fn over the argument tuples of iterable on the pool
+
+        :return: List of the results in order
+        """
+        return self.wait([self.submit(fn, *args, endpoint=endpoint) for args in iterable])
+
+    def wait(self, futures) -> list:
+        """
+        Waits for futures submitted to this scheduler. If called from one of its workers, queued tasks are run
+        while waiting
+
+        :return: List of the results in order. The first exception raised by a task is re-raised
+        """
+        helping = getattr(self._local, 'worker', False)
+
+        for future in futures:
+            while not future.done():
+                task = self._take(block=False) if helping else None
+
+                if task is not None:
+                    self._run(task)
+                    continue
+
+                with self._condition:
+                    if not future.done():
+                        self._condition.wait()
+
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """
+        Stops the worker threads once the queued tasks are done
+        """
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+            threads = list(self._threads)
+
+        for thread in threads:
+            if thread is not threading.current_thread():
+                thread.join()
+
+    # ---------------------------------- Helper Functions -------------------------------------- #
+    def _start_worker(self):
+        thread = threading.Thread(target=self._work, name=f'pysofar-worker-{self._started}', daemon=True)
+        self._started += 1
+        self._threads.append(thread)
+        thread.start()
+
+    def _work(self):
+        self._local.worker = True
+
+        while True:
+            task = self._take(block=True)
+            if task is None:
+                return
+            self._run(task)
+
+    def _take(self, block: bool):
+        # next queued task whose endpoint is below its limit. None if blocking and shut down with an empty queue,
+        # or idle for idle_timeout, in which case the calling worker is retired
+        with self._condition:
+            idle_since = time.monotonic()
+
+            while True:
+                for task in self._queue:
+                    limit = self.endpoint_limits.get(task.endpoint)
+                    if limit is None or self._running[task.endpoint] < limit:
+                        self._queue.remove(task)
+                        self._running[task.endpoint] += 1
+                        return task
+
+                if not block or (self._shutdown and len(self._queue) == 0):
+                    return None
+
+                timeout = None
+                if self.idle_timeout is not None and len(self._queue) == 0:
+                    timeout = self.idle_timeout - (time.monotonic() - idle_since)
+                    if timeout <= 0:
+                        self._threads.remove(threading.current_thread())
+                        return None
+
+                self._condition.wait(timeout)
+
+    def _run(self, task: _Task):
+        if self.hooks is not None:
+            self.hooks.queue_wait(task.endpoint, time.perf_counter() - task.queued)
+
+        try:
+            task.run()
+        finally:
+            with self._condition:
+                self._running[task.endpoint] -= 1
+                self._condition.notify_all()
+
+    def _notify(self, _future):
+        with self._condition:
+            self._condition.notify_all()
@@ -8,30 +8,86 @@ Sofar Ocean Technologies
 
 Authors: Mike Sosa et al.
 """
+from contextlib import contextmanager
 from datetime import datetime
 from itertools import chain
-from multiprocessing.pool import ThreadPool
-from pysofar import SofarConnection
-from pysofar.tools import parse_date
+from pysofar import SofarConnection, DEFAULT_POOL_SIZE, _shared_context
+from pysofar.arrays import ColumnBuilder, RecordArrays, parse_timestamps, records_to_arrays
+from pysofar.metrics import RequestHooks
+from pysofar.records import to_records
+from pysofar.scheduler import Scheduler, DEFAULT_MAX_CONCURRENCY
+from pysofar.spectra import SpectralData
+from pysofar.store import DataStore
+from pysofar.throttle import RetryPolicy, TokenBucket
+from pysofar.tools import epoch_ms_to_iso, iso_to_epoch_ms, parse_date, to_epoch_ms
+from pysofar.transport import Transport
+from pysofar.watch import watch
 from pysofar.wavefleet_exceptions import QueryError
+from operator import itemgetter
 from typing import List, Tuple, Dict
 
+import hashlib
+import heapq
+import json
 import os
+import time
 import warnings
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 class SofarApi(SofarConnection):
     """
     Class for interfacing with the Sofar Wavefleet API
     """
-    def __init__(self, custom_token=None):
-        if custom_token is not None:
-            super().__init__(custom_token)
-        else:
-            super().__init__()
+    def __init__(self, custom_token=None, pool_size: int = DEFAULT_POOL_SIZE,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, endpoint_limits: dict = None,
+                 rate_limit: float = None, retry_policy: RetryPolicy = None, store=None, decoder=None,
+                 device_cache: str = None, device_cache_ttl: float = 3600, hooks: RequestHooks = None,
+                 transport: Transport = None):
+        """
+
+        :param custom_token: Optional api token, otherwise read from the environment
+        :param pool_size: Number of keep-alive connections per host shared by this api and every query,
+                          Spotter and worker created from it
+        :param max_concurrency: Global cap on the number of concurrent requests made by the multi Spotter methods
+        :param endpoint_limits: Optional dictionary of endpoint (ex. 'wave-data', 'latest-data') to the maximum
+                                number of concurrent requests to it
+        :param rate_limit: Optional maximum sustained number of requests per second, shared by this api and
+                           every query, Spotter and worker created from it
+        :param retry_policy: Retry policy for throttled (429) or failed requests. Defaults to RetryPolicy(),
+                             RetryPolicy(max_retries=0) disables retries
+        :param store: Optional DataStore (or path of one) keeping downloaded wave data on disk. The multi Spotter
+                      methods and queries created from this api then only request periods not already stored
+        :param decoder: Optional function decoding the raw bytes of a response body. Defaults to orjson when
+                        installed, else the standard library json module
+        :param device_cache: Optional path of a file keeping a snapshot of the device list, so that new apis
+                             (ex. in short lived jobs) do not need to request it again
+        :param device_cache_ttl: Age in seconds after which the device snapshot is requested again
+        :param hooks: Optional RequestHooks called on the events of every request, page and worker task of this
+                      api and everything created from it, ex. pysofar.metrics.MetricsCollector
+        :param transport: Optional Transport sending the requests of this api and everything created from it, ex.
+                          pysofar.transport.HttpxTransport for HTTP/2 or ReplayTransport for recorded responses.
+                          Defaults to a RequestsTransport over the pooled http session
+        """
+        rate_limiter = TokenBucket(rate_limit) if rate_limit is not None else None
+        if isinstance(store, str):
+            store = DataStore(store)
+
+        super().__init__(custom_token, pool_size=pool_size, rate_limiter=rate_limiter, retry_policy=retry_policy,
+                         store=store, decoder=decoder, hooks=hooks, transport=transport)
 
-        self.devices = []
-        self.device_ids = []
-        self._sync()
+        # single pool of workers shared by every multi Spotter method of this api
+        self.scheduler = Scheduler(max_concurrency, endpoint_limits, hooks)
+
+        self.device_cache = device_cache
+        self.device_cache_ttl = device_cache_ttl
+
+        # the devices are requested (or read from the device cache) on first use
+        self._device_list = None
+        self._device_ids = None
 
     # ---------------------------------- Simple Device Endpoints -------------------------------------- #
     def get_device_location_data(self):
@@ -61,22 +117,8 @@ class SofarApi(SofarConnection):
 
         :return: The latest data values based on the given parameters from the requested Spotter
         """
-        params = {'spotterId': spotter_id}
-
-        if include_directional_moments:
-            params['includeDirectionalMoments'] = 'true'
-
-        if include_wind_data:
-            params['includeWindData'] = 'true'
-
-        if include_barometer_data:
-            params['includeBarometerData'] = 'true'
-
-        if include_partition_data:
-            params['includePartitionData'] = 'true'
-
-        if include_surface_temp_data:
-            params['includeSurfaceTempData'] = 'true'
+        params = _latest_data_params(spotter_id, include_wind_data, include_directional_moments,
+                                     include_barometer_data, include_partition_data, include_surface_temp_data)
 
         scode, results = self._get('/latest-data', params=params)
 
@@ -138,99 +180,162 @@ class SofarApi(SofarConnection):
         return new_spotter_name
 
     # ---------------------------------- Multi Spotter Endpoints -------------------------------------- #
-    def get_wave_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+    def get_wave_data(self, start_date: str = None, end_date: str = None, params: dict = None,
+                      time_shards: int = 1, as_arrays: bool = False, return_generator: bool = False,
+                      as_records: bool = False):
         """
         Get all wave data for related Spotters
 
         :param start_date: ISO8601 start date of data period
         :param end_date: ISO8601 end date of data period
         :param params: dict of additional query parameters to write beyond default values
+        :param time_shards: Number of time shards each Spotter's period is split into and fetched concurrently
+        :param as_arrays: Defaults to False. Set to True to return the data as a struct of NumPy arrays
+                          (RecordArrays), built while the pages are decoded
+        :param return_generator: Defaults to False. Set to True to get a generator of the data in time order,
+                                 merged from the pages of all Spotters as they arrive. Can not be used with as_arrays
+        :param as_records: Defaults to False. Set to True to get the samples as compact record types
+                           (see pysofar.records) instead of dictionaries
 
         :return: Wave data as a list
         """
-        return self._get_all_data(['waves'], start_date, end_date, params)
+        return self._get_all_data(['waves'], start_date, end_date, params, time_shards, as_arrays=as_arrays,
+                                  return_generator=return_generator, as_records=as_records)
 
-    def get_wind_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+    def get_wind_data(self, start_date: str = None, end_date: str = None, params: dict = None,
+                      time_shards: int = 1, as_arrays: bool = False, return_generator: bool = False,
+                      as_records: bool = False):
         """
         Get all wind data for related Spotters
 
         :param start_date: ISO8601 start date of data period
         :param end_date: ISO8601 end date of data period
         :param params: dict of additional query parameters to write beyond default values
+        :param time_shards: Number of time shards each Spotter's period is split into and fetched concurrently
+        :param as_arrays: Defaults to False. Set to True to return the data as a struct of NumPy arrays
+                          (RecordArrays), built while the pages are decoded
+        :param return_generator: Defaults to False. Set to True to get a generator of the data in time order,
+                                 merged from the pages of all Spotters as they arrive. Can not be used with as_arrays
+        :param as_records: Defaults to False. Set to True to get the samples as compact record types
+                           (see pysofar.records) instead of dictionaries
 
         :return: Wind data as a list
         """
-        return self._get_all_data(['wind'], start_date, end_date, params)
+        return self._get_all_data(['wind'], start_date, end_date, params, time_shards, as_arrays=as_arrays,
+                                  return_generator=return_generator, as_records=as_records)
 
-    def get_frequency_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+    def get_frequency_data(self, start_date: str = None, end_date: str = None, params: dict = None,
+                           time_shards: int = 1, return_generator: bool = False, as_records: bool = False,
+                           as_spectra: bool = False):
         """
         Get all Frequency data for related Spotters
 
         :param start_date: ISO8601 start date of data period
         :param end_date: ISO8601 end date of data period
         :param params: dict of additional query parameters to write beyond default values
-
-        :return: Frequency data as a list
+        :param time_shards: Number of time shards each Spotter's period is split into and fetched concurrently
+        :param return_generator: Defaults to False. Set to True to get a generator of the data in time order,
+                                 merged from the pages of all Spotters as they arrive
+        :param as_records: Defaults to False. Set to True to get the samples as compact record types
+                           (see pysofar.records) instead of dictionaries
+        :param as_spectra: Defaults to False. Set to True to get, under the 'frequency' key, a dictionary of Spotter
+                           id to SpectralData, the Spotter's spectra stacked into (time x frequency) NumPy arrays
+
+        :return: Dictionary with the frequency data under the 'frequency' key, as a list, or a dictionary of
+                 Spotter id to SpectralData if as_spectra
         """
-        return self._get_all_data(['frequency'], start_date, end_date, params)
+        if as_spectra:
+            st = start_date or '2000-01-01T00:00:00.000Z'
+            end = end_date or datetime.utcnow()
+            return {'frequency': spectra_worker_wrapper((self.device_ids, st, end, params), api=self,
+                                                        time_shards=time_shards)}
+
+        return self._get_all_data(['frequency'], start_date, end_date, params, time_shards,
+                                  return_generator=return_generator, as_records=as_records)
 
-    def get_track_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+    def get_track_data(self, start_date: str = None, end_date: str = None, params: dict = None,
+                       time_shards: int = 1, as_arrays: bool = False, return_generator: bool = False,
+                       as_records: bool = False):
         """
         Get all track data for related Spotters
 
         :param start_date: ISO8601 start date of data period
         :param end_date: ISO8601 end date of data period
         :param params: dict of additional query parameters to write beyond default values
+        :param time_shards: Number of time shards each Spotter's period is split into and fetched concurrently
+        :param as_arrays: Defaults to False. Set to True to return the data as a struct of NumPy arrays
+                          (RecordArrays), built while the pages are decoded
+        :param return_generator: Defaults to False. Set to True to get a generator of the data in time order,
+                                 merged from the pages of all Spotters as they arrive. Can not be used with as_arrays
+        :param as_records: Defaults to False. Set to True to get the samples as compact record types
+                           (see pysofar.records) instead of dictionaries
 
         :return: track data as a list
         """
-        return self._get_all_data(['track'], start_date, end_date, params)
+        return self._get_all_data(['track'], start_date, end_date, params, time_shards, as_arrays=as_arrays,
+                                  return_generator=return_generator, as_records=as_records)
 
-    def get_all_data(self, start_date: str = None, end_date: str = None, params: dict = None):
+    def get_all_data(self, start_date: str = None, end_date: str = None, params: dict = None,
+                     time_shards: int = 1, combined: bool = False, as_arrays: bool = False,
+                     return_generator: bool = False, as_records: bool = False):
         """
         Get all data for related Spotters
 
         :param start_date: ISO8601 start date of data period
         :param end_date: ISO8601 end date of data period
         :param params: dict of additional query parameters to write beyond default values
+        :param time_shards: Number of time shards each Spotter's period is split into and fetched concurrently
+        :param combined: Defaults to False. Set to True to request all data types together in one paginated walk
+                         per Spotter instead of one walk per data type, cutting the number of requests
+        :param as_arrays: Defaults to False. Set to True to return the data of each type as a struct of NumPy
+                          arrays (RecordArrays), built while the pages are decoded
+        :param return_generator: Defaults to False. Set to True to get a generator per data type of the data in
+                                 time order, merged from the pages of all Spotters as they arrive. Can not be
+                                 used with combined or as_arrays
+        :param as_records: Defaults to False. Set to True to get the samples as compact record types
+                           (see pysofar.records) instead of dictionaries
+
+        :return: Dictionary of data type to the data as a list
+        """
+        return self._get_all_data(['waves', 'wind', 'frequency', 'track'], start_date, end_date, params, time_shards,
+                                  combined, as_arrays=as_arrays, return_generator=return_generator,
+                                  as_records=as_records)
 
-        :return: Data as a list
+    def watch(self, spotter_ids: list = None, **options):
         """
-        return self._get_all_data(['waves', 'wind', 'frequency', 'track'], start_date, end_date, params)
+        Generator polling the latest data of Spotters, each just after its next report is expected, and yielding
+        only the new samples. See pysofar.watch.watch for the options
 
-    def get_spotters(self): return get_and_update_spotters(_api=self)
+        :param spotter_ids: Ids of the Spotters to watch. Defaults to all related Spotters
 
-    def search(self, shape:str, shape_params:List[Tuple], start_date:str, end_date:str,
-               radius=None, page_size=100,return_generator=False):
+        :return: Generator of dictionaries with the spotterId and, per data type, the list of new samples
+        """
+        return watch(self, spotter_ids, **options)
 
-        if shape not in ('circle','envelope'):
-            raise TypeError('Shape needs to be one of type Circle or Envelope')
+    def export_parquet(self, root: str, start_date: str = None, end_date: str = None, data_types=('waves',),
+                       params: dict = None):
+        """
+        Streams the data of all related Spotters into Parquet files partitioned by data type, Spotter and day.
+        See pysofar.export.export_parquet
 
-        if page_size > 500:
-            warnings.warn('Maximum page size is 500')
-            page_size=500
+        :param root: Directory to write the partitions to
+        :param start_date: ISO8601 start date of data period
+        :param end_date: ISO8601 end date of data period
+        :param data_types: Data types to export, ex. waves, wind, track, frequency
+        :param params: dict of additional query parameters to write beyond default values
 
-        if shape == 'circle' and radius is None:
-            raise ValueError('Radius needs to be set when shape is circle')
+        :return: List of the paths of the written files
+        """
+        from pysofar.export import export_parquet
+        return export_parquet(self, root, start_date, end_date, data_types, params)
 
-        # flatten
-        if shape == 'envelope':
-            vertices = []
-            for point in shape_params:
-                vertices += point
-        elif shape == 'circle':
-            vertices = shape_params
+    def get_spotters(self, spotters: list = None): return get_and_update_spotters(_api=self, spotters=spotters)
+
+    def search(self, shape:str, shape_params:List[Tuple], start_date:str, end_date:str,
+               radius=None, page_size=100,return_generator=False):
+
+        params = _search_params(shape, shape_params, start_date, end_date, radius, page_size)
 
-        params = {
-            'shape':shape,
-            # convert list to a comma seperated string of values. Requests does not
-            # like iterators as argument.
-            'shapeParams':','.join([str(x) for x in vertices]),
-            'startDate':start_date,
-            'endDate':end_date,
-            'pageSize':page_size,
-            'radius':radius
-        }
         def get_function(endpoint_suffix,params ):
             scode, data = self._get(endpoint_suffix, params=params)
             if scode != 200:
@@ -242,10 +347,49 @@ class SofarApi(SofarConnection):
         else:
             return list(unpaginate(get_function,'search',params))
 
+    def close(self):
+        """
+        Stops the worker threads and closes the pooled connections. Spotters and queries still holding this api
+        can use it after, new workers and connections are then started as needed
+        """
+        scheduler = self.scheduler
+        scheduler.shutdown()
+        self.scheduler = Scheduler(scheduler.max_concurrency, scheduler.endpoint_limits, scheduler.hooks,
+                                   scheduler.idle_timeout)
+        super().close()
+
     # ---------------------------------- Helper Functions -------------------------------------- #
+    @property
+    def devices(self):
+        """
+        Spotters that belong to this account, synced on first access
+
+        :return: List of dictionaries of the Spotters' id and name
+        """
+        if self._device_list is None:
+            self._sync()
+        return self._device_list
+
+    @devices.setter
+    def devices(self, value):
+        self._device_list = value
+        self._device_ids = None
+
+    @property
+    def device_ids(self):
+        """
+        :return: List of the ids of the Spotters that belong to this account, synced on first access
+        """
+        if self._device_ids is None:
+            self._device_ids = [device['spotterId'] for device in self.devices]
+        return self._device_ids
+
+    @device_ids.setter
+    def device_ids(self, value): self._device_ids = value
+
     @property
     def token(self):
-        return self._token
+        return self._context.token
 
     @token.setter
     def token(self, value):
@@ -253,15 +397,23 @@ class SofarApi(SofarConnection):
         self.set_token(value)
 
         try:
-            self._sync()
+            self._sync(use_cache=False)
         except QueryError:
             print('Authentication failed. Please check the key')
             print('Reverting to old key')
             self.set_token(temp)
 
-    def _sync(self):
-        self.devices = self._devices()
-        self.device_ids = [device['spotterId'] for device in self.devices]
+    def _sync(self, use_cache: bool = True):
+        devices = None
+        if use_cache and self.device_cache is not None:
+            devices = _load_device_snapshot(self.device_cache, self.token, self.device_cache_ttl)
+
+        if devices is None:
+            devices = self._devices()
+            if self.device_cache is not None:
+                _save_device_snapshot(self.device_cache, self.token, devices)
+
+        self.devices = devices
 
     def _devices(self):
         # Helper function to access the devices endpoint
@@ -285,27 +437,32 @@ class SofarApi(SofarConnection):
 
         return spot_data
 
-    def _get_all_data(self, worker_names: list, start_date: str = None, end_date: str = None, params: dict = None):
-        # helper function to return another function used for grabbing all data from Spotters in a period
-        def helper(_name):
-            _ids = self.device_ids
+    def _get_all_data(self, worker_names: list, start_date: str = None, end_date: str = None, params: dict = None,
+                      time_shards: int = 1, combined: bool = False, as_arrays: bool = False,
+                      return_generator: bool = False, as_records: bool = False):
+        # default to bound values if not included
+        st = start_date or '2000-01-01T00:00:00.000Z'
+        end = end_date or datetime.utcnow()
 
-            # default to bound values if not included
-            st = start_date or '2000-01-01T00:00:00.000Z'
-            end = end_date or datetime.utcnow()
-
-            _wrker = worker_wrapper((_name, _ids, st, end, params))
-            return _wrker
+        if return_generator:
+            if combined or as_arrays:
+                # the generators yield samples one at a time, from a walk per data type
+                raise ValueError('return_generator can not be used with combined or as_arrays')
+            return {name: merged_worker_wrapper((name, self.device_ids, st, end, params), api=self,
+                                                time_shards=time_shards, as_records=as_records)
+                    for name in worker_names}
 
-        # processing the data_types in parallel
-        pool = ThreadPool(processes=len(worker_names))
-        all_data = pool.map(helper, worker_names)
-        pool.close()
+        if combined:
+            return combined_worker_wrapper((worker_names, self.device_ids, st, end, params), api=self,
+                                           time_shards=time_shards, as_arrays=as_arrays, as_records=as_records)
 
-        all_data = {name: l for name, l in zip(worker_names, all_data)}
+        # queue the walks of all data types before waiting on any of them, so idle workers pick up
+        # whichever data type still has work
+        submitted = [_submit_worker(_worker(_name, as_arrays), (_name, self.device_ids, st, end, params), self,
+                                    time_shards, self.scheduler, as_records) for _name in worker_names]
 
-        # if len(all_data) > 0:
-        #     all_data.sort(key=lambda x: x['timestamp'])
+        all_data = {name: _collect_worker(*wrk, self.scheduler, as_arrays=as_arrays)
+                    for name, wrk in zip(worker_names, submitted)}
 
         return all_data
 
@@ -314,9 +471,12 @@ class WaveDataQuery(SofarConnection):
     """
     General Query class
     """
+    __slots__ = ('spotter_id', '_limit', 'start_date', 'end_date', '_params', '_as_records')
+
     _MISSING = object()
 
-    def __init__(self, spotter_id: str, limit: int = 20, start_date=_MISSING, end_date=_MISSING, params=None):
+    def __init__(self, spotter_id: str, limit: int = 20, start_date=_MISSING, end_date=_MISSING, params=None,
+                 api: SofarConnection = None):
         """
         Query the Sofar API for Spotter data
 
@@ -326,8 +486,11 @@ class WaveDataQuery(SofarConnection):
                             a date arbitrarily far back to include all Spotter data
         :param end_date: ISO8601 formatted string for end date, otherwise if not included defaults to present
         :param params: Defaults to None. Parameters to overwrite/add to the default query parameter set
+        :param api: Optional parent connection (usually a SofarApi) whose context (token, endpoint, pooled http
+                    session and throttling) is reused. Without it the token and endpoint are read from the
+                    environment
         """
-        super().__init__()
+        super().__init__(context=_shared_context(api))
         self.spotter_id = spotter_id
         self._limit = limit
 
@@ -359,6 +522,8 @@ class WaveDataQuery(SofarConnection):
         if params is not None:
             self._params.update(params)
 
+        self._as_records = False
+
         if self.start_date is not None:
             self._params.update({'startDate': self.start_date})
 
@@ -370,15 +535,98 @@ class WaveDataQuery(SofarConnection):
         Calls the api wave-data endpoint.
         If successful, returns the queried data with the set query parameters
 
+        If the query has a local store and a start and end date, the data is served from the store when it
+        holds the full page for all included data types, and data returned by the api is stored
+
         :return: Data as a dictionary
         """
+        if self.store is not None and self.start_date is not None and self.end_date is not None:
+            data = self._execute_stored()
+        else:
+            scode, data = self._get('wave-data', params=self._params)
+
+            if scode != 200:
+                raise QueryError(data['message'])
+
+            data = data['data']
+
+        if self._as_records:
+            data = to_records(data)
+
+        return data
+
+    def _execute_stored(self):
+        variant = self.store.variant(self._params)
+        dkeys = [dkey for flag, dkey in _DATA_TYPE_KEYS.values() if self._params.get(flag) == 'true']
+
+        data = {'spotterId': self.spotter_id}
+        for dkey in dkeys:
+            covered = self.store.covered_until(self.spotter_id, dkey, variant, self.start_date)
+            if covered is None:
+                break
+
+            # the page is complete if the covered period holds a full page or reaches the end date
+            results = self.store.get(self.spotter_id, dkey, variant, self.start_date, min(covered, self.end_date),
+                                     limit=self._limit)
+            if len(results) < self._limit and covered < self.end_date:
+                break
+            data[dkey] = results
+        else:
+            return data
+
         scode, data = self._get('wave-data', params=self._params)
 
         if scode != 200:
             raise QueryError(data['message'])
 
+        for dkey in dkeys:
+            results = data['data'].get(dkey, [])
+            # the results are complete from the start date up to the last one returned
+            if len(results) > 0:
+                self.store.put(self.spotter_id, dkey, variant, results, self.start_date, results[-1]['timestamp'])
+
         return data['data']
 
+    def copy(self, start_date=_MISSING, end_date=_MISSING):
+        """
+        Copy of this query with the same parameters, sharing this query's pooled http session
+
+        :param start_date: Optional new start date for the copy, None for no lower bound
+        :param end_date: Optional new end date for the copy, None for no upper bound
+
+        :return: The new WaveDataQuery
+        """
+        start_date = self.start_date if start_date is self._MISSING else start_date
+        end_date = self.end_date if end_date is self._MISSING else end_date
+
+        params = {key: value for key, value in self._params.items() if key not in ('startDate', 'endDate')}
+
+        query = WaveDataQuery(self.spotter_id, self._limit, start_date, end_date, params=params, api=self)
+        query.as_records(self._as_records)
+
+        return query
+
+    def shards(self, count: int):
+        """
+        Splits the period of this query into consecutive time shards
+
+        :param count: The number of shards. Queries without a start date can not be split
+
+        :return: A list of queries, one per shard, in time order
+        """
+        if count <= 1 or self.start_date is None:
+            return [self]
+
+        start = to_epoch_ms(self.start_date)
+        end = to_epoch_ms(self.end_date or datetime.utcnow())
+        if end <= start:
+            return [self]
+
+        bounds = [epoch_ms_to_iso(start + (end - start) * i // count) for i in range(count)]
+        bounds.append(epoch_ms_to_iso(end))
+
+        return [self.copy(start_date=bounds[i], end_date=bounds[i + 1]) for i in range(count)]
+
     def limit(self, value: int):
         """
         Sets the limit on how many query results to return
@@ -390,6 +638,14 @@ class WaveDataQuery(SofarConnection):
         self._limit = value
         self._params.update({'limit': value})
 
+    def as_records(self, include: bool):
+        """
+
+        :param include: True if you want the samples returned as compact record types (see pysofar.records)
+                        instead of dictionaries
+        """
+        self._as_records = include
+
     def barometer(self, include: bool):
         """
 
@@ -542,6 +798,8 @@ class SofarUserRestQuery(SofarConnection):
     """
     I represent a query against the /user-rest endpoint
     """
+    __slots__ = ()
+
     @classmethod
     def get_user_rest_endpoint(cls):
         _endpoint = os.getenv('WF_USER_REST_URL')
@@ -549,14 +807,16 @@ class SofarUserRestQuery(SofarConnection):
             _endpoint = 'https://api.sofarocean.com/user-rest'
         return _endpoint
 
-    def __init__(self, custom_token=None):
-        super().__init__(custom_token)
+    def __init__(self, custom_token=None, api: SofarConnection = None):
+        super().__init__(custom_token, context=_shared_context(api))
         self.endpoint = self.get_user_rest_endpoint()
 
 class CellularSignalMetricsQuery(SofarUserRestQuery):
     """
     I represent a query against the cellular-signal-metrics endpoint
     """
+    __slots__ = ('spotter_id', '_limit', '_params')
+
     _MISSING = object()
 
     def __init__(self,
@@ -565,8 +825,9 @@ class CellularSignalMetricsQuery(SofarUserRestQuery):
             order_ascending: bool = False,
             start_epoch_ms=_MISSING,
             end_epoch_ms=_MISSING,
-            params=None):
-        super().__init__()
+            params=None,
+            api: SofarConnection = None):
+        super().__init__(api=api)
         self.spotter_id = spotter_id
         self._limit = limit
         self._params = {
@@ -600,23 +861,165 @@ class CellularSignalMetricsQuery(SofarUserRestQuery):
         return data if return_raw else data['data']
 
 # ---------------------------------- Util Functions -------------------------------------- #
-def get_and_update_spotters(_api=None):
+def _latest_data_params(spotter_id: str,
+                        include_wind_data: bool = False,
+                        include_directional_moments: bool = False,
+                        include_barometer_data: bool = False,
+                        include_partition_data: bool = False,
+                        include_surface_temp_data: bool = False):
+    # helper function building the query parameters of the latest-data endpoint
+    params = {'spotterId': spotter_id}
+
+    if include_directional_moments:
+        params['includeDirectionalMoments'] = 'true'
+
+    if include_wind_data:
+        params['includeWindData'] = 'true'
+
+    if include_barometer_data:
+        params['includeBarometerData'] = 'true'
+
+    if include_partition_data:
+        params['includePartitionData'] = 'true'
+
+    if include_surface_temp_data:
+        params['includeSurfaceTempData'] = 'true'
+
+    return params
+
+
+def _search_params(shape: str, shape_params: List[Tuple], start_date: str, end_date: str,
+                   radius=None, page_size=100):
+    # helper function validating and building the query parameters of the search endpoint
+    if shape not in ('circle','envelope'):
+        raise TypeError('Shape needs to be one of type Circle or Envelope')
+
+    if page_size > 500:
+        warnings.warn('Maximum page size is 500')
+        page_size=500
+
+    if shape == 'circle' and radius is None:
+        raise ValueError('Radius needs to be set when shape is circle')
+
+    # flatten
+    if shape == 'envelope':
+        vertices = []
+        for point in shape_params:
+            vertices += point
+    elif shape == 'circle':
+        vertices = shape_params
+
+    params = {
+        'shape':shape,
+        # convert list to a comma seperated string of values. Requests does not
+        # like iterators as argument.
+        'shapeParams':','.join([str(x) for x in vertices]),
+        'startDate':start_date,
+        'endDate':end_date,
+        'pageSize':page_size,
+        'radius':radius
+    }
+
+    return params
+
+
+def _snapshot_key(token):
+    # the device snapshot of one account is not used for another
+    return hashlib.sha256(str(token).encode()).hexdigest()
+
+
+def _load_device_snapshot(path: str, token: str, ttl: float):
+    """
+
+    :return: The devices of the snapshot file, or None if there is no valid snapshot for this token
+             younger than ttl seconds
     """
+    try:
+        with open(path) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get('key') != _snapshot_key(token):
+        return None
+    if not 0 <= time.time() - snapshot.get('saved_at', 0) <= ttl:
+        return None
+
+    return snapshot.get('devices')
+
+
+def _save_device_snapshot(path: str, token: str, devices: list):
+    # written next to the snapshot and moved in place, so concurrent jobs never read a partial file
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'w') as snapshot_file:
+            json.dump({'key': _snapshot_key(token), 'saved_at': time.time(), 'devices': devices}, snapshot_file)
+        os.replace(temp_path, path)
+    except OSError as err:
+        warnings.warn(f'Could not write the device snapshot {path}: {err}')
+
+
+def get_and_update_spotters(_api=None, spotters: list = None):
+    """
+    :param spotters: Optional Spotter objects of a previous call to refresh. A single device-radius request tells
+                     which of them reported since their last update, and only those are updated, in place, with
+                     their latest data. Spotters of devices new to the account are added, and those of devices
+                     removed from it are dropped
+
     :return: A list of the Spotter objects associated with this account
     """
     from itertools import repeat
 
     api = _api or SofarApi()
 
-    # grab device id's and query for device data
-    # initialize Spotter objects
-    spot_data = api.devices
+    try:
+        # grab device id's and query for device data
+        # initialize Spotter objects
+        spot_data = api.devices
+
+        if spotters is None:
+            return api.scheduler.starmap(_spot_worker, zip(spot_data, repeat(api)), endpoint='latest-data')
+
+        current, stale, new_devices = _stale_spotters(spotters, spot_data, api._device_radius())
 
-    pool = ThreadPool(processes=16)
-    spotters = pool.starmap(_spot_worker, zip(spot_data, repeat(api)))
-    pool.close()
+        api.scheduler.map(_update_worker, stale, endpoint='latest-data')
+        added = api.scheduler.starmap(_spot_worker, zip(new_devices, repeat(api)), endpoint='latest-data')
 
-    return spotters
+        return current + added
+    finally:
+        if _api is None:
+            # the workers and connections of an api created here are released, its Spotters reopen them on use
+            api.close()
+
+
+def _stale_spotters(spotters: list, devices: list, locations: list):
+    """
+    Finds the Spotters whose data is outdated
+
+    :param spotters: Spotter objects of a previous update
+    :param devices: The devices of the account
+    :param locations: The devices of a device-radius response, with the timestamp of their latest location
+
+    :return: Tuple of the Spotters of devices still in the account, those of them that reported since their last
+             update (or were never updated), and the devices without a Spotter
+    """
+    reported = {device['spotterId']: device.get('timestamp') for device in locations}
+
+    device_ids = {device['spotterId'] for device in devices}
+    current = [spotter for spotter in spotters if spotter.id in device_ids]
+
+    stale = []
+    for spotter in current:
+        timestamp = reported.get(spotter.id)
+        if spotter.timestamp is None or spotter.data is None:
+            stale.append(spotter)
+        elif timestamp is not None and iso_to_epoch_ms(timestamp) > iso_to_epoch_ms(spotter.timestamp):
+            stale.append(spotter)
+
+    known = {spotter.id for spotter in current}
+    new_devices = [device for device in devices if device['spotterId'] not in known]
+
+    return current, stale, new_devices
 
 
 # ---------------------------------- Workers -------------------------------------- #
@@ -640,7 +1043,17 @@ def _spot_worker(device: dict, api: SofarApi):
     return sptr
 
 
-def worker_wrapper(args):
+def _update_worker(spotter):
+    """
+    Worker to update an existing Spotter object with its latest data values
+
+    :param spotter: The Spotter to update
+    """
+    spotter.update()
+
+
+def worker_wrapper(args, api: SofarConnection = None, time_shards: int = 1, as_arrays: bool = False,
+                   as_records: bool = False):
     """
     Wrapper for creating workers to grab lots of data
 
@@ -649,86 +1062,618 @@ def worker_wrapper(args):
                               st_date: str, iso 8601 formatted start date of period to query
                               end_date: str, iso 8601 formatted end date of period to query
                               params: dict, query parameters to set
+    :param api: Optional parent connection whose pooled http session is shared by all of the queries
+    :param time_shards: Number of time shards each Spotter's period is split into. All shards of all Spotters
+                        are fetched in parallel and stitched back together per Spotter
+    :param as_arrays: Set to True to return the data as a struct of NumPy arrays (RecordArrays)
+    :param as_records: Set to True to return the samples as compact record types (see pysofar.records)
 
     :return: All data for that type for all Spotters in the queried period
     """
-    worker_type, _ids, st_date, end_date, params = args
-    queries = [WaveDataQuery(_id, limit=500, start_date=st_date, end_date=end_date, params=params) for _id in _ids]
+    with _borrow_scheduler(api) as scheduler:
+        submitted = _submit_worker(_worker(args[0], as_arrays), args, api, time_shards, scheduler, as_records)
+        return _collect_worker(*submitted, scheduler, as_arrays=as_arrays)
+
+
+def _submit_worker(_wrkr, args, api: SofarConnection, time_shards: int, scheduler: Scheduler,
+                   as_records: bool = False):
+    """
+    Queues the paginated walks of all Spotters (and their shards) on the scheduler
+
+    :param _wrkr: The worker processing a single query
+    :param args: Tuple of the worker_type(s), _ids, st_date, end_date, params. See worker_wrapper
+    :param as_records: Set to True for the queries to return compact record types
+
+    :return: Tuple of the shards of each Spotter's query and the futures of the walks
+    """
+    queries = _spotter_queries(args, api, as_records)
+    sharded = [query.shards(time_shards) for query in queries]
+
+    futures = [scheduler.submit(_wrkr, query, endpoint='wave-data') for query in chain(*sharded)]
 
-    # grabbing data from all of the Spotters in parallel
-    pool = ThreadPool(processes=16)
-    _wrkr = _worker(worker_type)
-    worker_data = pool.map(_wrkr, queries)
-    pool.close()
+    return sharded, futures
+
+
+def _collect_worker(sharded, futures, scheduler: Scheduler, as_arrays: bool = False):
+    """
+    Waits for the walks queued by _submit_worker
+
+    :return: All data for that type for all Spotters in the queried period, sorted by time
+    """
+    # grabbing data from all of the Spotters (and their shards) in parallel
+    shard_data = iter(scheduler.wait(futures))
+
+    if as_arrays:
+        worker_data = [_stitch_arrays([next(shard_data) for _ in shards]) for shards in sharded]
+        return _sort_by_time(RecordArrays.concatenate(worker_data), scheduler.hooks)
+
+    worker_data = [_stitch([next(shard_data) for _ in shards]) for shards in sharded]
 
     # unwrap list of lists
     worker_data = list(chain(*worker_data))
 
-    if len(worker_data) > 0:
-        worker_data.sort(key=lambda x: x['timestamp'])
+    return _sort_by_time(worker_data, scheduler.hooks)
+
 
-    return worker_data
+def spectra_worker_wrapper(args, api: SofarConnection = None, time_shards: int = 1):
+    """
+    Wrapper for creating workers to grab the frequency data of many Spotters as spectral arrays. Each Spotter's
+    spectra are stacked as soon as its walk is done
 
+    :param args: Tuple of the _ids, st_date, end_date, params. See worker_wrapper
+    :param api: Optional parent connection whose pooled http session is shared by all of the queries
+    :param time_shards: Number of time shards each Spotter's period is split into
 
-def _worker(data_type):
+    :return: Dictionary of Spotter id to SpectralData
+    """
+    args = ('frequency',) + tuple(args)
+    _frequency_worker = _worker('frequency')
+
+    def _helper(data_query):
+        return SpectralData.from_records(_frequency_worker(data_query), data_query.spotter_id)
+
+    with _borrow_scheduler(api) as scheduler:
+        sharded, futures = _submit_worker(_helper, args, api, time_shards, scheduler)
+        shard_data = iter(scheduler.wait(futures))
+
+    return {shards[0].spotter_id: SpectralData.concatenate([next(shard_data) for _ in shards])
+            for shards in sharded}
+
+
+def _spotter_queries(args, api: SofarConnection, as_records: bool = False):
+    # one query per Spotter for the period and parameters of the worker arguments
+    _, _ids, st_date, end_date, params = args
+
+    queries = [WaveDataQuery(_id, limit=500, start_date=st_date, end_date=end_date, params=params, api=api)
+               for _id in _ids]
+    for query in queries:
+        query.as_records(as_records)
+
+    return queries
+
+
+def merged_worker_wrapper(args, api: SofarConnection = None, time_shards: int = 1, as_records: bool = False):
+    """
+    Streaming version of worker_wrapper. The first page of every Spotter (and shard) is requested right away, and
+    the next page of a Spotter is requested as soon as its previous page arrives, so at most two pages per Spotter
+    are held at once. Since the pages of each Spotter are in time order, the samples of all Spotters are yielded
+    in time order with a k-way merge, without waiting on the slowest Spotter to finish
+
+    :param args: Tuple of the worker_type, _ids, st_date, end_date, params. See worker_wrapper
+    :param api: Optional SofarApi (or other connection) whose scheduler and settings the queries use
+    :param time_shards: Number of time shards each Spotter's period is split into and fetched concurrently
+    :param as_records: Set to True to return the samples as compact record types (see pysofar.records)
+
+    :return: Generator of all data for that type for all Spotters in the queried period, in time order
+    """
+    data_type = args[0]
+
+    scheduler = getattr(api, 'scheduler', None)
+    owned_scheduler = scheduler is None
+    if owned_scheduler:
+        scheduler = Scheduler(hooks=getattr(api, 'hooks', None))
+
+    queries = _spotter_queries(args, api, as_records)
+    spotter_pages = [_prefetch_pages([_iter_pages(shard, data_type) for shard in query.shards(time_shards)],
+                                     scheduler) for query in queries]
+
+    def _merge():
+        try:
+            # ties are yielded in Spotter order, as with the stable sort of worker_wrapper
+            merged = heapq.merge(*[_keyed_samples(pages) for pages in spotter_pages], key=itemgetter(0))
+            yield from map(itemgetter(1), merged)
+        finally:
+            if owned_scheduler:
+                scheduler.shutdown()
+
+    return _merge()
+
+
+def _prefetch_pages(page_iterators, scheduler: Scheduler):
+    """
+    Requests the first page of each of a Spotter's shards right away
+
+    :param page_iterators: Page generators (see _iter_pages) of the shards of a single Spotter, in time order
+    :param scheduler: Scheduler running the requests
+
+    :return: Generator of the Spotter's pages in time order, with boundary duplicates dropped
+    """
+    futures = [scheduler.submit(next, pages, None, endpoint='wave-data') for pages in page_iterators]
+
+    def _pages():
+        boundary = _Boundary()
+        for pages, future in zip(page_iterators, futures):
+            while True:
+                results = scheduler.wait([future])[0]
+                if results is None:
+                    break
+
+                # the next page is on its way while this one is consumed
+                future = scheduler.submit(next, pages, None, endpoint='wave-data')
+
+                yield boundary.drop_overlap(results)
+
+    return _pages()
+
+
+def combined_worker_wrapper(args, api: SofarConnection = None, time_shards: int = 1, as_arrays: bool = False,
+                            as_records: bool = False):
+    """
+    Wrapper for creating workers to grab lots of data of several types, requesting all of the types together
+    in one paginated walk per Spotter
+
+    :param args: Tuple of the worker_types: list of str (ex. ['wind', 'waves', 'frequency', 'track'])
+                              _ids: list of str, which are the Spotter ids
+                              st_date: str, iso 8601 formatted start date of period to query
+                              end_date: str, iso 8601 formatted end date of period to query
+                              params: dict, query parameters to set
+    :param api: Optional parent connection whose pooled http session is shared by all of the queries
+    :param time_shards: Number of time shards each Spotter's period is split into
+    :param as_arrays: Set to True to return the data of each type as a struct of NumPy arrays (RecordArrays)
+    :param as_records: Set to True to return the samples as compact record types (see pysofar.records)
+
+    :return: Dictionary of all data for each type for all Spotters in the queried period
+    """
+    worker_types = args[0]
+
+    with _borrow_scheduler(api) as scheduler:
+        sharded, futures = _submit_worker(_combined_worker(worker_types, as_arrays), args, api, time_shards,
+                                          scheduler, as_records)
+        shard_data = iter(scheduler.wait(futures))
+
+    # per Spotter, a dictionary of data type to its shards
+    spotter_data = [[next(shard_data) for _ in shards] for shards in sharded]
+
+    all_data = {}
+    for worker_type in worker_types:
+        if as_arrays:
+            worker_data = [_stitch_arrays([shard[worker_type] for shard in shards]) for shards in spotter_data]
+            all_data[worker_type] = _sort_by_time(RecordArrays.concatenate(worker_data), scheduler.hooks)
+            continue
+
+        worker_data = [_stitch([shard[worker_type] for shard in shards]) for shards in spotter_data]
+        all_data[worker_type] = _sort_by_time(list(chain(*worker_data)), scheduler.hooks)
+
+    return all_data
+
+
+@contextmanager
+def _borrow_scheduler(api):
+    # the scheduler of the api if it has one, otherwise a scheduler for the duration of the block
+    scheduler = getattr(api, 'scheduler', None)
+
+    if scheduler is not None:
+        yield scheduler
+        return
+
+    scheduler = Scheduler(hooks=getattr(api, 'hooks', None))
+    try:
+        yield scheduler
+    finally:
+        scheduler.shutdown()
+
+
+def _worker(data_type, as_arrays: bool = False):
     """
     Worker to grab data from certain data type for a specific query
 
     :param data_type: The desired data type
+    :param as_arrays: Set to True for the helper to return a struct of NumPy arrays (RecordArrays), built
+                      page by page
 
     :return: A helper function able to process a query for that specific data type
     """
     def _helper(data_query):
-        st = data_query.start_date
-        end = data_query.end_date
-
-        # setup the query
-        data_query.waves(False)
-        getattr(data_query, data_type)(True)
-
-        if data_type == 'frequency':
-            dkey = 'frequencyData'
-            data_query.directional_moments(True)
-        elif data_type == 'surface_temp':
-            dkey = 'surfaceTemp'
-            data_query.surface_temp(True)
-        elif data_type == 'barometer':
-            dkey = 'barometerData'
-            data_query.barometer(True)
-        elif data_type == 'microphone':
-            dkey = 'microphoneData'
-            data_query.microphone(True)
+        if data_query.store is not None and data_query.start_date is not None:
+            query_data = _stored_walk(data_query, data_type)
+            return records_to_arrays(query_data) if as_arrays else query_data
+
+        if as_arrays:
+            builder = ColumnBuilder()
+            boundary = _Boundary()
+            for results in _iter_pages(data_query, data_type):
+                builder.extend(boundary.drop_overlap(results))
+            return builder.build()
+
+        # here query data is a list of dictionaries
+        return _stitch(_iter_pages(data_query, data_type))
+
+    return _helper
+
+
+def _stored_walk(data_query, data_type):
+    """
+    Pages through only the periods of a query not covered by its local store, then serves the whole
+    query period from the store
+
+    :param data_query: The query to page through
+    :param data_type: The desired data type
+
+    :return: All data of that type for the query's Spotter in the query period, tagged with the Spotter id
+    """
+    store = data_query.store
+    spotter_id = data_query.spotter_id
+
+    dkey = _setup_worker_query(data_query, data_type)
+    variant = store.variant(data_query._params)
+
+    start = data_query.start_date
+    end = data_query.end_date or parse_date(datetime.utcnow())
+
+    for gap_start, gap_end in store.missing(spotter_id, dkey, variant, start, end):
+        gap_query = data_query.copy(start_date=gap_start, end_date=gap_end)
+        gap_query.store = None
+
+        results = _stitch(_iter_pages(gap_query, data_type))
+        store.put(spotter_id, dkey, variant, results, gap_start, gap_end)
+
+    query_data = store.get(spotter_id, dkey, variant, start, end)
+    if data_query._as_records:
+        query_data = to_records({dkey: query_data})[dkey]
+
+    for dt in query_data:
+        dt['spotterId'] = spotter_id
+
+    return query_data
+
+
+def _iter_pages(data_query, data_type):
+    """
+    Generator paging through a query's period for a certain data type
+
+    :param data_query: The query to page through. Its start date is moved forward as pages arrive
+    :param data_type: The desired data type
+
+    :return: Lists of results, one per page, tagged with the Spotter id
+    """
+    walk = _PageWalk(data_query, data_type)
+
+    while not walk.done:
+        results = walk.advance(data_query.execute())
+
+        if len(results) > 0:
+            yield results
+
+
+class _PageWalk:
+    """
+    Paging rules of a walk through a query's period for a certain data type, shared by the workers of SofarApi
+    (_iter_pages) and AsyncSofarApi, which only differ in how the pages are requested
+    """
+    __slots__ = ('data_query', 'data_type', 'dkey', 'st', 'end', 'done')
+
+    def __init__(self, data_query, data_type):
+        """
+
+        :param data_query: The query to page through. Its start date is moved forward as pages arrive
+        :param data_type: The desired data type
+        """
+        self.data_query = data_query
+        self.data_type = data_type
+        self.dkey = _setup_worker_query(data_query, data_type)
+
+        # without an end date the walk goes up to now
+        self.st = iso_to_epoch_ms(data_query.start_date) if data_query.start_date is not None else None
+        self.end = to_epoch_ms(data_query.end_date or datetime.utcnow())
+        self.done = self.st is not None and self.st >= self.end
+
+    def advance(self, response: dict) -> list:
+        """
+        Processes the response of the query at its current start date and moves the start date past the page
+
+        :param response: The data of the wave-data response
+
+        :return: The results of the page, tagged with the Spotter id
+        """
+        results = response[self.dkey]
+
+        spotter_id = response['spotterId']
+        for dt in results:
+            dt['spotterId'] = spotter_id
+
+        if self.data_query.hooks is not None:
+            self.data_query.hooks.page(spotter_id, self.data_type, len(results))
+
+        # done if no results are returned
+        if len(results) == 0:
+            self.done = True
+            return results
+
+        # done if the start date did not move forward, to avoid an infinite loop on a repeated sample, or the
+        # end date is reached, to avoid one on samples at the end time
+        last_timestamp = results[-1]['timestamp']
+        last = iso_to_epoch_ms(last_timestamp)
+        if last == self.st or last >= self.end:
+            self.done = True
+            return results
+
+        self.st = last
+        self.data_query.set_start_date(last_timestamp)
+
+        return results
+
+
+def _combined_worker(data_types, as_arrays: bool = False):
+    """
+    Worker to grab data of several data types for a specific query in a single paginated walk
+
+    :param data_types: The desired data types
+    :param as_arrays: Set to True for the helper to return a struct of NumPy arrays (RecordArrays) per type
+
+    :return: A helper function able to process a query for those data types
+    """
+    def _helper(data_query):
+        if data_query.store is not None and data_query.start_date is not None:
+            # stored periods differ per data type, so only the gaps of each type are walked
+            query_data = {data_type: _stored_walk(data_query.copy(), data_type) for data_type in data_types}
         else:
-            dkey = data_type
+            query_data = {data_type: [] for data_type in data_types}
+            boundaries = {data_type: _Boundary() for data_type in data_types}
+
+            for page in _iter_combined_pages(data_query, data_types):
+                for data_type, results in page.items():
+                    query_data[data_type].extend(boundaries[data_type].drop_overlap(results))
+
+        if as_arrays:
+            return {data_type: records_to_arrays(results) for data_type, results in query_data.items()}
+
+        # here query data is a dictionary of data type to a list of dictionaries
+        return query_data
+
+    return _helper
+
+
+def _iter_combined_pages(data_query, data_types):
+    """
+    Generator paging through a query's period for several data types at once.
 
-        query_data = []
+    Every request includes only the data types furthest behind, so types with a smaller page size (frequency data)
+    do not cause pages of the other types to be downloaded twice. A type is done once it returns no more results
 
-        while st < end:
-            _query = data_query.execute()
+    :param data_query: The query to page through. Its start date is moved forward as pages arrive
+    :param data_types: The desired data types
 
-            results = _query[dkey]
+    :return: Dictionaries of data type to list of results, one per page, tagged with the Spotter id
+    """
+    end = iso_to_epoch_ms(data_query.end_date)
+
+    dkeys = {data_type: _setup_worker_query(data_query, data_type) for data_type in data_types}
+
+    # the last timestamp received for each data type still being paged through, as (epoch ms, ISO 8601)
+    start = data_query.start_date
+    last = {data_type: (iso_to_epoch_ms(start), start) for data_type in data_types}
+
+    while len(last) > 0:
+        st, st_date = min(last.values())
+        if st >= end:
+            break
+
+        included = [data_type for data_type in last if last[data_type][0] == st]
+        for data_type in dkeys:
+            getattr(data_query, data_type)(data_type in included)
+        data_query.set_start_date(st_date)
+
+        _query = data_query.execute()
+        spotter_id = _query['spotterId']
+
+        page = {}
+        for data_type in included:
+            results = _query.get(dkeys[data_type], [])
 
             for dt in results:
-                dt.update({'spotterId': _query['spotterId']})
+                dt['spotterId'] = spotter_id
 
-            query_data.extend(results)
+            if data_query.hooks is not None:
+                data_query.hooks.page(spotter_id, data_type, len(results))
 
-            # break if no results are returned
-            if len(results) == 0:
-                break
+            # the type is done when it has no more results, or its start date would not move forward
+            last_ms = iso_to_epoch_ms(results[-1]['timestamp']) if len(results) > 0 else st
+            if last_ms <= st:
+                del last[data_type]
+            else:
+                last[data_type] = (last_ms, results[-1]['timestamp'])
+
+            if len(results) > 0:
+                page[data_type] = results
+
+        yield page
+
+
+def _stitch(chunks):
+    """
+    Joins time ordered chunks of results (pages or time shards) in order. Samples at the start of a chunk
+    that were already returned at the end of the previous chunk (at the shared boundary timestamp) are dropped
+
+    :param chunks: Iterable of time ordered lists of results
+
+    :return: A single list of results
+    """
+    stitched = []
+    boundary = _Boundary()
+
+    for results in chunks:
+        stitched.extend(boundary.drop_overlap(results))
+
+    return stitched
+
+
+def _stitch_arrays(chunks):
+    """
+    Joins time ordered chunks of results as RecordArrays (time shards) in order. Samples of a chunk at or before
+    the last timestamp of the previous chunks are dropped
+
+    :param chunks: Iterable of time ordered RecordArrays
+
+    :return: A single RecordArrays
+    """
+    stitched = []
+
+    for results in chunks:
+        if len(stitched) > 0 and len(results) > 0:
+            results = results.take(results['timestamp'] > stitched[-1]['timestamp'][-1])
 
-            st = results[-1]['timestamp']
-            data_query.set_start_date(st)
+        if len(results) > 0:
+            stitched.append(results)
 
-            # break if start and end dates are the same to avoid potential infinite loop for samples
-            # at end time
-            if st == end:
+    return RecordArrays.concatenate(stitched)
+
+
+def _sort_by_time(data, hooks: RequestHooks = None):
+    """
+    Orders the samples of all Spotters by time
+
+    :param data: List of samples, or RecordArrays
+    :param hooks: Optional RequestHooks told the time taken, as the 'sort' stage
+
+    :return: The list sorted in place (stable), or new sorted RecordArrays
+    """
+    started = time.perf_counter()
+
+    if isinstance(data, RecordArrays):
+        data = data.sort()
+    elif len(data) > 0:
+        # stable sort of the indices by the timestamps, parsed in a single pass
+        keys = _epoch_keys(data)
+        data[:] = [data[i] for i in sorted(range(len(data)), key=keys.__getitem__)]
+
+    if hooks is not None:
+        hooks.stage('sort', time.perf_counter() - started, len(data))
+
+    return data
+
+
+def _epoch_keys(records) -> list:
+    """
+
+    :param records: Samples with a timestamp
+
+    :return: The timestamps of the samples in epoch milliseconds, parsed in a single NumPy call where available
+    """
+    if np is None:
+        return [iso_to_epoch_ms(record['timestamp']) for record in records]
+    return parse_timestamps([record['timestamp'] for record in records]).view(np.int64).tolist()
+
+
+def _keyed_samples(pages):
+    # the samples of time ordered pages with their timestamps in epoch milliseconds, parsed a page at a time
+    for page in pages:
+        yield from zip(_epoch_keys(page), page)
+
+
+class _Boundary:
+    """
+    Boundary between time ordered chunks of results (pages or time shards): the last timestamp, in epoch
+    milliseconds, of the chunks so far and the samples at it. Kept from chunk to chunk, so only the samples
+    around a boundary are parsed, and each of them once
+    """
+    __slots__ = ('timestamp', 'tail')
+
+    def __init__(self):
+        self.timestamp = None
+        self.tail = []
+
+    def drop_overlap(self, results: list) -> list:
+        """
+        Drops the samples at the start of the next chunk of results that are already at the end of the chunks
+        before it, and moves the boundary to the end of the chunk
+
+        :param results: Time ordered list of results following the previous chunks
+
+        :return: The results which are not in the previous chunks
+        """
+        if len(results) == 0:
+            return results
+
+        skip = 0
+        if self.timestamp is not None:
+            for dt in results:
+                timestamp = iso_to_epoch_ms(dt['timestamp'])
+                if timestamp < self.timestamp or (timestamp == self.timestamp and dt in self.tail):
+                    skip += 1
+                else:
+                    break
+
+            if skip == len(results):
+                return []
+            results = results[skip:] if skip > 0 else results
+
+        # samples at the last timestamp of the chunk
+        last_ts = iso_to_epoch_ms(results[-1]['timestamp'])
+        tail = [results[-1]]
+        for dt in reversed(results[:-1]):
+            if iso_to_epoch_ms(dt['timestamp']) != last_ts:
                 break
+            tail.append(dt)
 
-        # here query data is a list of dictionaries
-        return query_data
+        if last_ts == self.timestamp:
+            self.tail.extend(tail)
+        else:
+            self.timestamp = last_ts
+            self.tail = tail
 
-    return _helper
+        return results
+
+
+# wave-data include flag and response key of each data type
+_DATA_TYPE_KEYS = {
+    'waves': ('includeWaves', 'waves'),
+    'wind': ('includeWindData', 'wind'),
+    'track': ('includeTrack', 'track'),
+    'frequency': ('includeFrequencyData', 'frequencyData'),
+    'surface_temp': ('includeSurfaceTempData', 'surfaceTemp'),
+    'barometer': ('includeBarometerData', 'barometerData'),
+    'microphone': ('includeMicrophoneData', 'microphoneData'),
+}
+
+
+def _setup_worker_query(data_query, data_type):
+    """
+    Sets up a query to only include the given data type
+
+    :param data_query: The WaveDataQuery to set up
+    :param data_type: The desired data type
+
+    :return: The key of that data type in the wave-data response
+    """
+    data_query.waves(False)
+    getattr(data_query, data_type)(True)
+
+    if data_type == 'frequency':
+        dkey = 'frequencyData'
+        data_query.directional_moments(True)
+    elif data_type == 'surface_temp':
+        dkey = 'surfaceTemp'
+        data_query.surface_temp(True)
+    elif data_type == 'barometer':
+        dkey = 'barometerData'
+        data_query.barometer(True)
+    elif data_type == 'microphone':
+        dkey = 'microphoneData'
+        data_query.microphone(True)
+    else:
+        dkey = data_type
+
+    return dkey
 
 
 def unpaginate( get_function, endpoint_suffix , params )->Dict:
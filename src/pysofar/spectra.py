@@ -0,0 +1,206 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Frequency spectra of a Spotter as (time x frequency) NumPy arrays
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from pysofar.arrays import _require_numpy, parse_timestamps
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# per frequency fields of a frequencyData sample, stacked into (time x frequency) arrays
+SPECTRAL_FIELDS = ('varianceDensity', 'a1', 'b1', 'a2', 'b2', 'direction', 'directionalSpread')
+
+
+class SpectralData:
+    """
+    Frequency spectra of a single Spotter, stacked into contiguous (time x frequency) float64 arrays sharing a
+    single frequency axis:
+        - timestamp: int64 epoch milliseconds, one per spectrum
+        - frequency, df: the frequency axis and bin widths
+        - spectra['varianceDensity'], spectra['a1'], ...: (time x frequency) arrays of the fields in the data
+        - latitude, longitude: float64, nan where missing
+    """
+    def __init__(self, spotter_id: str, timestamp, frequency, df, fields: dict, latitude=None, longitude=None):
+        self.spotter_id = spotter_id
+        self.timestamp = timestamp
+        self.frequency = frequency
+        self.df = df
+        self.fields = fields
+        self.latitude = latitude if latitude is not None else np.full(len(timestamp), np.nan)
+        self.longitude = longitude if longitude is not None else np.full(len(timestamp), np.nan)
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    def __getitem__(self, key):
+        return self.fields[key]
+
+    def __contains__(self, key):
+        return key in self.fields
+
+    def keys(self):
+        return self.fields.keys()
+
+    @property
+    def times(self):
+        """
+
+        :return: The timestamps as datetime64[ms] (a view of the same data)
+        """
+        return self.timestamp.view('datetime64[ms]')
+
+    def take(self, indices) -> 'SpectralData':
+        """
+
+        :param indices: Integer array of the spectra to select, or a boolean mask
+
+        :return: New SpectralData of the selected spectra
+        """
+        return SpectralData(self.spotter_id, self.timestamp[indices], self.frequency, self.df,
+                            {key: values[indices] for key, values in self.fields.items()},
+                            self.latitude[indices], self.longitude[indices])
+
+    def on_axis(self, frequency, df=None) -> 'SpectralData':
+        """
+        Linearly interpolates the spectra onto another frequency axis, nan outside of this axis
+
+        :param frequency: The new frequency axis
+        :param df: Optional bin widths of the new axis
+
+        :return: New SpectralData on the given axis
+        """
+        frequency = np.asarray(frequency, dtype=np.float64)
+        if len(frequency) == len(self.frequency) and np.array_equal(frequency, self.frequency):
+            return self
+
+        fields = {key: _interpolate(values, self.frequency, frequency) for key, values in self.fields.items()}
+        df = np.asarray(df, dtype=np.float64) if df is not None else np.gradient(frequency)
+
+        return SpectralData(self.spotter_id, self.timestamp, frequency, df, fields, self.latitude, self.longitude)
+
+    def __repr__(self):
+        return f"SpectralData({self.spotter_id}, {len(self)} spectra x {len(self.frequency)} frequencies, " \
+               f"fields: {', '.join(self.fields)})"
+
+    @staticmethod
+    def from_records(records, spotter_id: str = None) -> 'SpectralData':
+        """
+        Stacks frequencyData samples of a single Spotter. Samples whose frequency axis differs from the most
+        common one are interpolated onto it, and samples without a frequency axis (no spectrum) are left out
+
+        :param records: List of frequencyData samples (dictionaries of per frequency lists), in time order
+        :param spotter_id: Optional id of the Spotter, otherwise taken from the spotterId of the samples
+
+        :return: SpectralData of the samples
+        """
+        _require_numpy()
+
+        records = [record for record in records if record.get('frequency')]
+
+        spotter_ids = {record['spotterId'] for record in records if record.get('spotterId') is not None}
+        if spotter_id is None:
+            if len(spotter_ids) > 1:
+                raise ValueError(f"the samples are of several Spotters ({', '.join(sorted(spotter_ids))}). "
+                                 f"Stack the samples of each Spotter separately")
+            spotter_id = next(iter(spotter_ids), None)
+
+        if len(records) == 0:
+            empty = np.empty(0)
+            return SpectralData(spotter_id, np.empty(0, dtype=np.int64), empty, empty, {})
+
+        # the most common axis is the shared one
+        counts = {}
+        axis_records = {}
+        for record in records:
+            axis = tuple(record['frequency'])
+            counts[axis] = counts.get(axis, 0) + 1
+            axis_records.setdefault(axis, record)
+        axis = max(counts, key=counts.get)
+
+        frequency = np.array(axis, dtype=np.float64)
+        df = axis_records[axis].get('df')
+        df = np.array(df, dtype=np.float64) if df else np.gradient(frequency)
+
+        fields = {}
+        for key in SPECTRAL_FIELDS:
+            rows = [record.get(key) for record in records]
+            if all(row is None for row in rows):
+                continue
+
+            if len(counts) == 1 and all(row is not None for row in rows):
+                # a single conversion of all the nested lists
+                fields[key] = np.array(rows, dtype=np.float64)
+                continue
+
+            values = fields[key] = np.full((len(records), len(frequency)), np.nan)
+            for i, (record, row) in enumerate(zip(records, rows)):
+                if row is None:
+                    continue
+                if tuple(record['frequency']) == axis:
+                    values[i] = row
+                else:
+                    values[i] = _interpolate(np.array(row, dtype=np.float64),
+                                             np.array(record['frequency'], dtype=np.float64), frequency)
+
+        timestamp = parse_timestamps([record['timestamp'] for record in records]).view(np.int64)
+        latitude = np.array([_number(record.get('latitude')) for record in records], dtype=np.float64)
+        longitude = np.array([_number(record.get('longitude')) for record in records], dtype=np.float64)
+
+        return SpectralData(spotter_id, timestamp, frequency, df, fields, latitude, longitude)
+
+    @staticmethod
+    def concatenate(parts) -> 'SpectralData':
+        """
+        Joins time ordered SpectralData of the same Spotter (ex. time shards). Spectra at or before the last
+        timestamp of the previous parts are dropped, and the parts are put on the frequency axis of the first
+
+        :param parts: List of SpectralData, in time order
+
+        :return: New SpectralData with the spectra of all parts
+        """
+        _require_numpy()
+
+        spotter_id = parts[0].spotter_id if len(parts) > 0 else None
+        parts = [part for part in parts if len(part) > 0]
+        if len(parts) == 0:
+            empty = np.empty(0)
+            return SpectralData(spotter_id, np.empty(0, dtype=np.int64), empty, empty, {})
+        if len(parts) == 1:
+            return parts[0]
+
+        first = parts[0]
+        joined = [first]
+        for part in parts[1:]:
+            part = part.take(part.timestamp > joined[-1].timestamp[-1])
+            if len(part) > 0:
+                joined.append(part.on_axis(first.frequency, first.df))
+
+        keys = [key for key in first.keys() if all(key in part for part in joined)]
+
+        return SpectralData(first.spotter_id,
+                            np.concatenate([part.timestamp for part in joined]),
+                            first.frequency, first.df,
+                            {key: np.concatenate([part[key] for part in joined]) for key in keys},
+                            np.concatenate([part.latitude for part in joined]),
+                            np.concatenate([part.longitude for part in joined]))
+
+
+def _interpolate(values, frequency, target):
+    # linear interpolation of (time x frequency) or single spectra along the frequency axis
+    if values.ndim == 1:
+        return np.interp(target, frequency, values, left=np.nan, right=np.nan)
+
+    return np.stack([np.interp(target, frequency, row, left=np.nan, right=np.nan) for row in values]) \
+        if len(values) > 0 else np.empty((0, len(target)))
+
+
+def _number(value):
+    return np.nan if value is None else value
@@ -8,7 +8,13 @@ Sofar Ocean Technologies
 
 Authors: Mike Sosa et al.
 """
+from pysofar.arrays import records_to_arrays
 from pysofar.sofar import SofarApi, WaveDataQuery, CellularSignalMetricsQuery
+from pysofar.spectra import SpectralData
+from pysofar.watch import watch
+
+# Data types of grab_data(as_arrays=True) returned as RecordArrays, their samples holding a value per field
+_ARRAY_TYPES = ('waves', 'wind', 'track')
 
 
 # --------------------- Devices ----------------------------------------------#
@@ -21,6 +27,7 @@ class Spotter:
 
         :param spotter_id: The Spotter id as a string
         :param name: The name of the Spotter
+        :param session: The SofarApi used for requests. If not given one is created on first use
         """
         self.id = spotter_id
         self.name = name
@@ -38,11 +45,19 @@ class Spotter:
         self._humidity = None
         self._timestamp = None
 
-        if session is None:
-            session = SofarApi()
         self._session = session
 
     # -------------------------- Properties -------------------------------------- #
+    @property
+    def session(self):
+        """
+
+        :return: The SofarApi used by this Spotter for requests
+        """
+        if self._session is None:
+            self._session = SofarApi()
+        return self._session
+
     @property
     def mode(self):
         """
@@ -168,7 +183,7 @@ class Spotter:
 
         :param new_name: The new desired Spotter name
         """
-        self.name = self._session.update_spotter_name(self.id, new_name)
+        self.name = self.session.update_spotter_name(self.id, new_name)
 
     def update(self):
         """
@@ -178,8 +193,15 @@ class Spotter:
         """
         # TODO: also add the latest data for this (Since it does return it)
         # TODO: disambiguate & de-duplicate update() vs latest_data()
-        _data = self._session.get_latest_data(self.id)
+        _data = self.session.get_latest_data(self.id)
+        self._apply_latest_data(_data)
+
+    def _apply_latest_data(self, _data: dict):
+        """
+        Sets this Spotter's attribute values from a latest-data response
 
+        :param _data: The data of a latest-data response for this Spotter
+        """
         self.name = _data['spotterName']
         self._mode = _data['payloadType']
 
@@ -226,7 +248,7 @@ class Spotter:
 
         :return: The latest data values based on the given parameters from this Spotter
         """
-        _data = self._session.get_latest_data(self.id,
+        _data = self.session.get_latest_data(self.id,
                                               include_wind_data=include_wind,
                                               include_directional_moments=include_directional_moments,
                                               include_barometer_data=include_barometer_data,
@@ -268,7 +290,9 @@ class Spotter:
                   smooth_sg_window: int = 135,
                   smooth_sg_order: int = 4,
                   interpolate_utc: bool = False,
-                  interpolate_period_seconds: int = 3600):
+                  interpolate_period_seconds: int = 3600,
+                  as_arrays: bool = False,
+                  as_records: bool = False):
         """
         Grabs the requested data for this Spotter based on the given keyword arguments
 
@@ -291,10 +315,15 @@ class Spotter:
         :param include_spikes: Defaults to False. Set to True if you wish to include data points that our system has
                                         identified as a potentially unwanted spike.
         :param processing_sources: Optional string for which processingSources to include (embedded, hdr, all)
+        :param as_arrays: Defaults to False. Set to True to return the waves, wind and track data as structs of
+                          NumPy arrays (RecordArrays), and the frequency data as SpectralData, instead of lists.
+                          Other data types are returned as lists
+        :param as_records: Defaults to False. Set to True to get the samples as compact record types
+                           (see pysofar.records) instead of dictionaries
 
         :return: Data as a json based on the given query parameters
         """
-        _query = WaveDataQuery(self.id, limit, start_date, end_date)
+        _query = WaveDataQuery(self.id, limit, start_date, end_date, api=self.session)
         _query.waves(include_waves)
         _query.wind(include_wind)
         _query.track(include_track)
@@ -310,11 +339,30 @@ class Spotter:
         _query.smooth_sg_order(smooth_sg_order)
         _query.interpolate_utc(interpolate_utc)
         _query.interpolate_period_seconds(interpolate_period_seconds)
+        _query.as_records(as_records)
 
         _data = _query.execute()
 
+        if as_arrays:
+            for key in _ARRAY_TYPES:
+                if key in _data:
+                    _data[key] = records_to_arrays(_data[key])
+
+            # the per frequency lists are stacked into (time x frequency) arrays
+            if 'frequencyData' in _data:
+                _data['frequencyData'] = SpectralData.from_records(_data['frequencyData'], self.id)
+
         return _data
 
+    def watch(self, **options):
+        """
+        Generator polling the latest data of this Spotter just after its next report is expected, yielding only
+        the new samples. See pysofar.watch.watch for the options
+
+        :return: Generator of dictionaries with the spotterId and, per data type, the list of new samples
+        """
+        return watch(self.session, [self.id], **options)
+
     def grab_cellular_signal_metrics(self, 
         limit: int = 20,
         order_ascending: bool = False,
@@ -337,6 +385,7 @@ class Spotter:
             order_ascending=order_ascending,
             start_epoch_ms=start_epoch_ms,
             end_epoch_ms=end_epoch_ms,
+            api=self.session,
         )
         _data = _query.execute()
 
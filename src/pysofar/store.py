@@ -0,0 +1,187 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Persistent local store of Spotter data, used to only request data not already downloaded
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from datetime import datetime, timedelta
+from pysofar.tools import parse_date
+
+import json
+import sqlite3
+import threading
+import zlib
+
+# Query parameters which select the data types or the period, and so do not change the data itself
+_SELECTION_PARAMS = frozenset([
+    'spotterId', 'limit', 'startDate', 'endDate', 'includeWaves', 'includeWindData', 'includeTrack',
+    'includeFrequencyData', 'includeSurfaceTempData', 'includeBarometerData', 'includeMicrophoneData'
+])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    spotter_id TEXT NOT NULL,
+    data_type TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    UNIQUE (spotter_id, data_type, variant, timestamp)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    spotter_id TEXT NOT NULL,
+    data_type TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS coverage_key ON coverage (spotter_id, data_type, variant, start);
+"""
+
+
+class DataStore:
+    """
+    On disk (sqlite) store of Spotter samples, compressed, keyed by Spotter id, data type and timestamp.
+
+    The store records which periods it fully covers, so only the gaps need to be requested from the API.
+    Periods are like the wave-data endpoint: exclusive of the start date and inclusive of the end date.
+    Recent data may still arrive late, so periods are only marked as covered up to settle_seconds ago
+    """
+    def __init__(self, path: str, settle_seconds: float = 6 * 3600):
+        """
+
+        :param path: Path of the sqlite database file, created if it does not exist
+        :param settle_seconds: Age after which samples are assumed to be final. Periods more recent than this are
+                               always requested again
+        """
+        self.path = path
+        self.settle_seconds = settle_seconds
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def variant(params: dict) -> str:
+        """
+        Key of the query parameters that change the returned data (ex. smoothing or processing sources), so data
+        of differently configured queries is stored apart
+
+        :param params: Query parameters of a wave-data request
+        """
+        return json.dumps({key: str(value) for key, value in params.items() if key not in _SELECTION_PARAMS},
+                          sort_keys=True)
+
+    def missing(self, spotter_id: str, data_type: str, variant: str, start: str, end: str) -> list:
+        """
+        Periods within (start, end] which are not covered by the store
+
+        :return: List of (start, end) tuples of ISO8601 dates, in time order
+        """
+        start, end = parse_date(start), parse_date(end)
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT start, end FROM coverage WHERE spotter_id = ? AND data_type = ? AND variant = ? "
+                "AND end > ? AND start < ? ORDER BY start",
+                (spotter_id, data_type, variant, start, end)).fetchall()
+
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in rows:
+            if covered_start > cursor:
+                gaps.append((cursor, min(covered_start, end)))
+            cursor = max(cursor, covered_end)
+            if cursor >= end:
+                break
+
+        if cursor < end:
+            gaps.append((cursor, end))
+
+        return gaps
+
+    def covered_until(self, spotter_id: str, data_type: str, variant: str, start: str):
+        """
+        End of the covered period continuing from start
+
+        :return: ISO8601 date up to which the store covers the data after start, or None if it does not
+        """
+        start = parse_date(start)
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT end FROM coverage WHERE spotter_id = ? AND data_type = ? AND variant = ? "
+                "AND start <= ? AND end > ?", (spotter_id, data_type, variant, start, start)).fetchone()
+
+        return row[0] if row is not None else None
+
+    def put(self, spotter_id: str, data_type: str, variant: str, records: list, start: str = None, end: str = None):
+        """
+        Stores samples, and marks the period they were requested for as covered. A sample replaces the one stored
+        at the same timestamp, ex. after the API reprocessed it
+
+        :param records: List of samples (dictionaries with a timestamp). A spotterId tag on the samples is not
+                        stored, since the Spotter id is part of the key
+        :param start: Optional start of the period the records are complete for
+        :param end: Optional end of the period the records are complete for
+        """
+        rows = []
+        for record in records:
+            record = {key: value for key, value in record.items() if key != 'spotterId'}
+            payload = json.dumps(record, sort_keys=True, separators=(',', ':')).encode()
+            # timestamps are compared as strings by the range queries, so all are kept in the same format
+            rows.append((spotter_id, data_type, variant, parse_date(record['timestamp']), zlib.compress(payload)))
+
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?)", rows)
+
+            if start is not None and end is not None:
+                self._cover(spotter_id, data_type, variant, parse_date(start), parse_date(end))
+
+    def get(self, spotter_id: str, data_type: str, variant: str, start: str, end: str, limit: int = None) -> list:
+        """
+        Stored samples in (start, end]
+
+        :param limit: Optional maximum number of samples to return
+
+        :return: List of samples in time order
+        """
+        query = "SELECT payload FROM samples WHERE spotter_id = ? AND data_type = ? AND variant = ? " \
+                "AND timestamp > ? AND timestamp <= ? ORDER BY timestamp, rowid"
+        args = (spotter_id, data_type, variant, parse_date(start), parse_date(end))
+
+        if limit is not None:
+            query += " LIMIT ?"
+            args += (limit,)
+
+        with self._lock:
+            rows = self._db.execute(query, args).fetchall()
+
+        return [json.loads(zlib.decompress(payload)) for payload, in rows]
+
+    def _cover(self, spotter_id, data_type, variant, start, end):
+        # marks (start, end] as covered, merging with overlapping or adjacent covered periods
+        settled = parse_date(datetime.utcnow() - timedelta(seconds=self.settle_seconds))
+        end = min(end, settled)
+        if start >= end:
+            return
+
+        key = (spotter_id, data_type, variant)
+        overlapping = self._db.execute(
+            "SELECT rowid, start, end FROM coverage WHERE spotter_id = ? AND data_type = ? AND variant = ? "
+            "AND end >= ? AND start <= ?", key + (start, end)).fetchall()
+
+        for rowid, covered_start, covered_end in overlapping:
+            start = min(start, covered_start)
+            end = max(end, covered_end)
+            self._db.execute("DELETE FROM coverage WHERE rowid = ?", (rowid,))
+
+        self._db.execute("INSERT INTO coverage VALUES (?, ?, ?, ?, ?)", key + (start, end))
@@ -0,0 +1,151 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Client side rate limiting and retry policies for requests to the API
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+import random
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter shared by all threads making requests through a client
+    """
+    def __init__(self, rate: float, capacity: float = None, clock=time.monotonic, sleep=time.sleep):
+        """
+
+        :param rate: Sustained number of requests allowed per second
+        :param capacity: Maximum burst of requests. Defaults to one second worth of requests
+        :param clock: Monotonic clock in seconds
+        :param sleep: Function used to wait
+        """
+        if rate <= 0:
+            raise ValueError('rate needs to be positive')
+
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+
+    def acquire(self):
+        """
+        Takes a token, waiting until one is available.
+        Tokens are reserved in order, so waiting threads are served first come first served
+        """
+        wait = self.reserve()
+        if wait > 0:
+            self._sleep(wait)
+
+    def reserve(self) -> float:
+        """
+        Takes a token without waiting for it, ex. for asyncio code waiting with asyncio.sleep
+
+        :return: Seconds to wait before the token may be used
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            # a negative balance is a reservation against tokens refilled in the future
+            self._tokens -= 1
+            return max(-self._tokens / self.rate, self._paused_until - now)
+
+    def pause(self, seconds: float):
+        """
+        Holds back all requests for the given time, ex. when the API asks to retry after a while
+
+        :param seconds: Time to pause for
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+class RetryPolicy:
+    """
+    Retry policy with jittered exponential backoff for throttled or failed requests
+    """
+    def __init__(self, max_retries: int = 5, backoff_factor: float = 0.5, max_backoff: float = 60.0,
+                 retry_statuses=(429, 500, 502, 503, 504), sleep=time.sleep):
+        """
+
+        :param max_retries: Maximum number of retries of a request. Set to 0 to disable retries
+        :param backoff_factor: Base of the backoff in seconds, doubled on every retry
+        :param max_backoff: Upper bound of a single backoff in seconds
+        :param retry_statuses: Response status codes which are retried
+        :param sleep: Function used to wait
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.sleep = sleep
+
+    def should_retry(self, attempt: int, status: int = None) -> bool:
+        """
+
+        :param attempt: Number of the attempt which just failed, starting at 0
+        :param status: Response status code, or None if the request failed without a response
+
+        :return: True if the request should be retried
+        """
+        if attempt >= self.max_retries:
+            return False
+
+        return status is None or status in self.retry_statuses
+
+    def backoff(self, attempt: int, retry_after: str = None) -> float:
+        """
+        Time to wait before the next attempt. Uses the Retry-After header of the response if given, otherwise
+        an exponential backoff with full jitter
+
+        :param attempt: Number of the attempt which just failed, starting at 0
+        :param retry_after: Optional value of the Retry-After response header (seconds or http date)
+
+        :return: Seconds to wait
+        """
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            return min(delay, self.max_backoff)
+
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+
+
+def parse_retry_after(value: str):
+    """
+
+    :param value: Value of a Retry-After header, either in seconds or an http date
+
+    :return: Seconds to wait, or None if not given or not valid
+    """
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
@@ -30,6 +30,10 @@ def parse_date(date_object):
     """
     _date = None
 
+    if isinstance(date_object, str) and _iso_datetime(date_object) is not None:
+        # already in the format returned by the API and by this function, with or without milliseconds
+        return date_object if len(date_object) == 24 else f"{date_object[:19]}.000Z"
+
     if isinstance(date_object, (int, float)):
         _date = datetime.datetime.utcfromtimestamp(date_object)
     elif isinstance(date_object, str):
@@ -54,3 +58,80 @@ def parse_date(date_object):
     # make zone unaware
     f_string = _date.replace(tzinfo=None).isoformat(timespec="milliseconds")
     return f"{f_string}Z"
+
+
+def to_datetime(date_object):
+    """
+
+    :param date_object: Give in utc format, either epoch, string, or datetime object
+    :return: Timezone unaware datetime object in utc
+    """
+    if isinstance(date_object, datetime.datetime):
+        # truncated to milliseconds, as when formatted
+        _date = date_object.replace(tzinfo=None)
+        return _date.replace(microsecond=_date.microsecond // 1000 * 1000)
+
+    return _EPOCH + datetime.timedelta(milliseconds=iso_to_epoch_ms(parse_date(date_object)))
+
+
+def to_epoch_ms(date_object):
+    """
+
+    :param date_object: Give in utc format, either epoch, string, or datetime object
+    :return: Integer milliseconds since the unix epoch
+    """
+    if isinstance(date_object, str):
+        return iso_to_epoch_ms(date_object)
+
+    _date = to_datetime(date_object)
+    return calendar.timegm(_date.timetuple()) * 1000 + _date.microsecond // 1000
+
+
+def iso_to_epoch_ms(date_string: str) -> int:
+    """
+    Fast conversion of the timestamps of the API. The common 'YYYY-MM-DDTHH:MM:SS.fffZ' and 'YYYY-MM-DDTHH:MM:SSZ'
+    forms are parsed directly, anything else through parse_date
+
+    :param date_string: Date string formatted as iso
+    :return: Integer milliseconds since the unix epoch
+    """
+    _date = _iso_datetime(date_string)
+    if _date is None:
+        _date = datetime.datetime.strptime(parse_date(date_string), "%Y-%m-%dT%H:%M:%S.%fZ")
+
+    seconds = (_date.toordinal() - _EPOCH_ORDINAL) * 86400 + _date.hour * 3600 + _date.minute * 60 + _date.second
+    return seconds * 1000 + _date.microsecond // 1000
+
+
+def epoch_ms_to_iso(epoch_ms: int) -> str:
+    """
+
+    :param epoch_ms: Integer milliseconds since the unix epoch
+    :return: String date formatted in ISO 8601 format, as parse_date
+    """
+    _date = _EPOCH + datetime.timedelta(milliseconds=int(epoch_ms))
+    return f"{_date.isoformat(timespec='milliseconds')}Z"
+
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+
+def _iso_datetime(date_string):
+    # datetime of a valid 'YYYY-MM-DDTHH:MM:SS[.fff]Z', otherwise None
+    length = len(date_string)
+    if length == 24:
+        if date_string[19] != '.' or not date_string[20:23].isdigit():
+            return None
+    elif length != 20:
+        return None
+
+    if date_string[-1] != 'Z' or date_string[10] != 'T':
+        return None
+
+    try:
+        _date = datetime.datetime.fromisoformat(date_string[:-1])
+    except ValueError:
+        return None
+
+    return _date if _date.tzinfo is None else None
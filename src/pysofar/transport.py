@@ -0,0 +1,286 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Transports sending the http requests of a connection: the default pooled requests transport, an HTTP/2
+capable httpx transport, a transport recording the responses of another one and an in memory replay of recorded
+responses, ex. to test or benchmark the client without the network
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import gzip
+import json
+import requests
+import threading
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Default number of pooled keep-alive connections kept open per host
+DEFAULT_POOL_SIZE = 32
+
+# Default timeout in seconds of a request, see RequestsTransport
+DEFAULT_TIMEOUT = 60.0
+
+
+def new_http_session(pool_size: int = DEFAULT_POOL_SIZE):
+    """
+    Creates a keep-alive http session with a connection pool
+
+    :param pool_size: Maximum number of connections kept open per host
+
+    :return: A requests Session whose connections are reused across requests
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class Response(NamedTuple):
+    """
+    Response of a transport without a response type of its own
+    """
+    status_code: int
+    content: bytes
+    headers: CaseInsensitiveDict
+
+
+class Transport(ABC):
+    """
+    Sends the http requests of a connection. Subclass and implement request to plug in another http client, and
+    set errors to the exceptions of the client the connection retries
+    """
+    # exceptions of failures without a response (ex. connection errors, timeouts), which the connection retries
+    errors = (requests.ConnectionError, requests.Timeout)
+
+    @abstractmethod
+    def request(self, method: str, url: str, headers: dict, params: dict = None, json: dict = None):
+        """
+        Sends a request. Failures without a response are raised as one of the transport's errors
+
+        :param method: Http method, ex. 'GET' or 'POST'
+        :param url: Full url of the request
+        :param headers: Headers of the request, including the token
+        :param params: Optional query parameters. Parameters set to None are left out
+        :param json: Optional body of the request, encoded as json
+
+        :return: The response, with a status_code, the raw bytes of the body as content and the headers
+        """
+
+    def close(self):
+        """
+        Closes the connections of the transport
+        """
+
+
+class RequestsTransport(Transport):
+    """
+    Default transport, sending the requests through a pooled keep-alive requests Session
+    """
+    def __init__(self, session: requests.Session = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_TIMEOUT):
+        """
+
+        :param session: Optional session to send the requests through, otherwise a new pooled one is created
+        :param pool_size: Number of pooled connections per host when creating a new session
+        :param timeout: Timeout in seconds to connect and between bytes received, so a stalled connection fails
+                        (and is retried) rather than hanging. None waits forever
+        """
+        self.session = session if session is not None else new_http_session(pool_size)
+        self.timeout = timeout
+
+    def request(self, method: str, url: str, headers: dict, params: dict = None, json: dict = None):
+        kwargs = {'timeout': self.timeout}
+        if params is not None:
+            kwargs['params'] = params
+        if json is not None:
+            kwargs['json'] = json
+
+        if method == 'GET':
+            return self.session.get(url, headers=headers, **kwargs)
+        return self.session.request(method, url, headers=headers, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class HttpxTransport(Transport):
+    """
+    Transport sending the requests through an httpx Client, multiplexing them over HTTP/2 connections where the
+    server supports it. Requires `pip install pysofar[http2]`
+    """
+    errors = (httpx.TransportError,) if httpx is not None else ()
+
+    def __init__(self, client=None, http2: bool = True, pool_size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = DEFAULT_TIMEOUT):
+        """
+
+        :param client: Optional httpx.Client to send the requests through, otherwise a new one is created
+        :param http2: Defaults to True. Set to False for HTTP/1.1 only
+        :param pool_size: Maximum number of connections when creating a new client
+        :param timeout: Timeout in seconds of the requests of a new client, as RequestsTransport
+        """
+        if httpx is None:
+            raise ImportError('httpx is required for the HTTP/2 transport. '
+                              'Install it with `pip install pysofar[http2]`')
+
+        if client is None:
+            limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            client = httpx.Client(http2=http2, limits=limits, timeout=timeout)
+        self.client = client
+
+    def request(self, method: str, url: str, headers: dict, params: dict = None, json: dict = None):
+        if params is not None:
+            # unlike requests, httpx does not drop parameters without a value
+            params = {key: value for key, value in params.items() if value is not None}
+
+        return self.client.request(method, url, headers=headers, params=params, json=json)
+
+    def close(self):
+        self.client.close()
+
+
+def request_key(method: str, url: str, params: dict = None) -> str:
+    """
+
+    :return: Key identifying a request regardless of the host it is sent to, ex.
+             'GET /api/wave-data?limit=500&spotterId=SPOT-0001'. The query parameters are sorted
+    """
+    parts = urlsplit(url)
+    path = '/' + '/'.join(segment for segment in parts.path.split('/') if segment)
+
+    query = parse_qsl(parts.query)
+    if params is not None:
+        query += [(key, str(value)) for key, value in params.items() if value is not None]
+
+    return f'{method} {path}?{urlencode(sorted(query))}'
+
+
+def _open(path, mode):
+    # recordings are gzip compressed if the path ends with .gz
+    return gzip.open(path, mode) if path.endswith('.gz') else open(path, mode)
+
+
+class RecordingTransport(Transport):
+    """
+    Transport passing the requests on to another transport and recording their responses, to be replayed with
+    ReplayTransport
+    """
+    def __init__(self, transport: Transport = None):
+        """
+
+        :param transport: Transport sending the requests. Defaults to a new RequestsTransport
+        """
+        self.transport = transport if transport is not None else RequestsTransport()
+        self.recordings = []
+        self._lock = threading.Lock()
+
+    @property
+    def errors(self):
+        # the failures of the transport recorded
+        return self.transport.errors
+
+    def request(self, method: str, url: str, headers: dict, params: dict = None, json: dict = None):
+        response = self.transport.request(method, url, headers, params=params, json=json)
+
+        recording = {'request': request_key(method, url, params), 'status': response.status_code,
+                     'headers': dict(response.headers), 'body': response.content.decode('utf-8')}
+        with self._lock:
+            self.recordings.append(recording)
+
+        return response
+
+    def save(self, path: str):
+        """
+        Writes the recorded responses to a json file, gzip compressed if the path ends with .gz
+
+        :param path: Path of the file
+        """
+        with self._lock:
+            recordings = list(self.recordings)
+
+        with _open(path, 'wt') as f:
+            json.dump({'responses': recordings}, f)
+
+    def close(self):
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    In memory transport answering requests with recorded responses, without the network. Responses are matched by
+    method, path and query parameters (see request_key), regardless of the host. A request recorded several times
+    is answered with its responses in order, repeating the last one. Requests without a recorded response are
+    answered with a 404
+    """
+    def __init__(self, recordings: list = ()):
+        """
+
+        :param recordings: Optional list of recordings, as RecordingTransport.recordings
+        """
+        self._responses = defaultdict(list)
+        self._served = defaultdict(int)
+        self._lock = threading.Lock()
+        self.requests = []
+
+        for recording in recordings:
+            self._responses[recording['request']].append(
+                Response(recording['status'], recording['body'].encode(), CaseInsensitiveDict(recording['headers'])))
+
+    @classmethod
+    def load(cls, path: str) -> 'ReplayTransport':
+        """
+
+        :param path: Path of a file written by RecordingTransport.save
+
+        :return: ReplayTransport answering with the recorded responses
+        """
+        with _open(path, 'rt') as f:
+            return cls(json.load(f)['responses'])
+
+    def add(self, method: str, url: str, body, status: int = 200, params: dict = None, headers: dict = None):
+        """
+        Adds a response
+
+        :param method: Http method of the request
+        :param url: Url, or just the path, of the request
+        :param body: Body of the response, as bytes or a dictionary encoded as json
+        :param status: Status of the response
+        :param params: Optional query parameters of the request
+        :param headers: Optional headers of the response
+        """
+        content = body if isinstance(body, bytes) else json.dumps(body).encode()
+        with self._lock:
+            self._responses[request_key(method, url, params)].append(
+                Response(status, content, CaseInsensitiveDict(headers or {})))
+
+    def request(self, method: str, url: str, headers: dict, params: dict = None, json: dict = None):
+        key = request_key(method, url, params)
+
+        with self._lock:
+            self.requests.append(key)
+            responses = self._responses.get(key)
+            if not responses:
+                return Response(404, _message(f'No recorded response for {key}'), CaseInsensitiveDict())
+
+            served = self._served[key]
+            self._served[key] = served + 1
+
+        return responses[min(served, len(responses) - 1)]
+
+
+def _message(message):
+    return json.dumps({'message': message}).encode()
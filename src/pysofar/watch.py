@@ -0,0 +1,185 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Polling of the latest data of Spotters, scheduled by the reporting cadence of each Spotter
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from collections import deque
+from functools import partial
+from pysofar.tools import iso_to_epoch_ms
+from pysofar.wavefleet_exceptions import QueryError
+
+import heapq
+import time
+import warnings
+
+# Number of recent report intervals the cadence of a Spotter is estimated from
+DEFAULT_HISTORY = 8
+
+
+class _SpotterWatch:
+    """
+    Polling state of a single Spotter: the last sample seen of every data type and its recent report times
+    """
+    def __init__(self, spotter_id: str, history: int):
+        self.spotter_id = spotter_id
+        self.last_seen = {}
+        self.reports = deque(maxlen=history + 1)
+        self.misses = 0
+        self.failures = 0
+
+    def cadence(self):
+        """
+
+        :return: The median interval in seconds between the recent reports, None until two reports are seen
+        """
+        if len(self.reports) < 2:
+            return None
+
+        reports = list(self.reports)
+        intervals = sorted(b - a for a, b in zip(reports, reports[1:]))
+        return intervals[len(intervals) // 2] / 1000
+
+    def update(self, data: dict) -> dict:
+        """
+        Records a latest-data response
+
+        :param data: The latest data of the Spotter
+
+        :return: Dictionary of data type to the samples not seen before, only including types with new samples
+        """
+        new = {}
+        report_times = set()
+
+        for key, samples in data.items():
+            if not isinstance(samples, list) or len(samples) == 0 or not isinstance(samples[0], dict):
+                continue
+
+            last = self.last_seen.get(key)
+            fresh = []
+            for sample in samples:
+                timestamp = sample.get('timestamp')
+                if timestamp is None:
+                    continue
+                timestamp = iso_to_epoch_ms(timestamp)
+                if last is None or timestamp > last:
+                    fresh.append(sample)
+                    report_times.add(timestamp)
+
+            if len(fresh) > 0:
+                self.last_seen[key] = max(iso_to_epoch_ms(sample['timestamp']) for sample in fresh)
+                new[key] = fresh
+
+        latest = self.reports[-1] if len(self.reports) > 0 else None
+        for report in sorted(report_times):
+            if latest is None or report > latest:
+                self.reports.append(report)
+                latest = report
+
+        self.misses = 0 if len(new) > 0 else self.misses + 1
+        self.failures = 0
+        return new
+
+    def fail(self):
+        """
+        Records a poll which failed, backing off the next one
+        """
+        self.failures += 1
+
+    def next_poll(self, now: float, min_interval: float, max_interval: float, delay: float) -> float:
+        """
+
+        :return: Time (epoch seconds) of the next poll: just after the next expected report, or with an
+                 exponential backoff while no report is expected, the expected one is late or polls fail
+        """
+        if self.failures > 0:
+            return now + min(min_interval * 2 ** self.failures, max_interval)
+
+        cadence = self.cadence()
+        if cadence is not None:
+            expected = self.reports[-1] / 1000 + cadence + delay
+            if expected > now:
+                return min(max(expected, now + min_interval), now + max_interval)
+
+        return now + min(min_interval * 2 ** self.misses, max_interval)
+
+
+def watch(api, spotter_ids: list = None, min_interval: float = 60.0, max_interval: float = 3600.0,
+          delay: float = 60.0, history: int = DEFAULT_HISTORY, initial: bool = False, timeout: float = None,
+          clock=time.time, sleep=time.sleep, **latest_data_options):
+    """
+    Generator polling the latest data of Spotters and yielding only the samples not seen before.
+
+    Instead of polling at a fixed rate, the reporting cadence of each Spotter is learned from the timestamps of
+    its recent samples and the Spotter is polled just after its next report is expected. While no report is
+    expected, or an expected report is late, polls back off exponentially from min_interval to max_interval.
+
+    The Spotters due at the same time are polled concurrently on the api's scheduler. A failed poll (an error
+    response, or a failed request once retries are exhausted) is reported with a warning and backs off that
+    Spotter only
+
+    :param api: SofarApi used for the requests, and whose scheduler runs them
+    :param spotter_ids: Ids of the Spotters to watch. Defaults to all devices of the account
+    :param min_interval: Shortest time in seconds between polls of a Spotter
+    :param max_interval: Longest time in seconds between polls of a Spotter
+    :param delay: Time in seconds after the expected report at which to poll, allowing for the report to arrive
+    :param history: Number of recent report intervals the cadence is estimated from
+    :param initial: Set to True to also yield the samples of the first poll of every Spotter
+    :param timeout: Optional time in seconds after which the generator stops
+    :param clock: Clock in epoch seconds
+    :param sleep: Function used to wait
+    :param latest_data_options: Keyword arguments of get_latest_data, ex. include_wind_data=True
+
+    :return: Generator of dictionaries with the spotterId and, per data type, the list of new samples
+    """
+    if spotter_ids is None:
+        spotter_ids = api.device_ids
+
+    deadline = clock() + timeout if timeout is not None else None
+    watches = {spotter_id: _SpotterWatch(spotter_id, history) for spotter_id in spotter_ids}
+
+    # (time of the next poll, order, Spotter id), all Spotters are polled right away at first
+    start = clock()
+    schedule = [(start, order, spotter_id) for order, spotter_id in enumerate(spotter_ids)]
+    heapq.heapify(schedule)
+    polled = set()
+
+    poll = partial(api.get_latest_data, **latest_data_options)
+    errors = (QueryError,) + tuple(api.transport.errors)
+
+    while len(schedule) > 0:
+        due = schedule[0][0]
+        if deadline is not None and due > deadline:
+            return
+
+        wait = due - clock()
+        if wait > 0:
+            sleep(wait)
+
+        # every Spotter due by now is polled at once, so a slow one does not hold back the others
+        now = clock()
+        batch = []
+        while len(schedule) > 0 and schedule[0][0] <= now:
+            batch.append(heapq.heappop(schedule))
+        futures = [api.scheduler.submit(poll, spotter_id, endpoint='latest-data') for _, _, spotter_id in batch]
+
+        for (_, order, spotter_id), future in zip(batch, futures):
+            spotter_watch = watches[spotter_id]
+
+            try:
+                data = api.scheduler.wait([future])[0]
+            except errors as err:
+                spotter_watch.fail()
+                warnings.warn(f'Polling the latest data of {spotter_id} failed: {err}')
+            else:
+                new = spotter_watch.update(data)
+                if len(new) > 0 and (initial or spotter_id in polled):
+                    yield {'spotterId': spotter_id, **new}
+                polled.add(spotter_id)
+
+            heapq.heappush(schedule, (spotter_watch.next_poll(clock(), min_interval, max_interval, delay),
+                                      order, spotter_id))
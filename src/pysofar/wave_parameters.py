@@ -0,0 +1,132 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Ocean's Spotter API
+
+Contents: Vectorized computation of bulk wave parameters from frequency spectra
+
+Copyright 2019-2024
+Sofar Ocean Technologies
+
+Authors: Mike Sosa et al.
+"""
+from pysofar.arrays import RecordArrays, records_to_arrays, _require_numpy
+from pysofar.spectra import SpectralData
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def bulk_parameters(spectra, fmin: float = None, fmax: float = None) -> RecordArrays:
+    """
+    Computes the bulk wave parameters of whole batches of spectra at once:
+        - significantWaveHeight: 4 * sqrt(m0) in meters
+        - peakPeriod: 1 / frequency of the spectral peak in seconds
+        - meanPeriod: m0 / m1 in seconds
+        - meanDirection, meanDirectionalSpread: from the energy weighted a1 and b1, in degrees (nautical, coming
+          from) when the spectra include directional moments, nan otherwise
+        - peakDirection, peakDirectionalSpread: from a1 and b1 at the spectral peak, in degrees
+
+    :param spectra: SpectralData (ex. from get_frequency_data(as_spectra=True)), or a list of frequencyData samples
+                    (ex. from get_frequency_data or Spotter.grab_data), of one or several Spotters
+    :param fmin: Optional lowest frequency (Hz) to integrate over
+    :param fmax: Optional highest frequency (Hz) to integrate over
+
+    :return: RecordArrays with the timestamp, spotterId and parameters of each spectrum. Given samples, there is
+             one row per sample in the same order, with nan parameters for samples without a spectrum
+    """
+    _require_numpy()
+
+    if isinstance(spectra, SpectralData):
+        parameters = _parameters(spectra, fmin, fmax)
+        if spectra.spotter_id is not None:
+            parameters.columns['spotterId'] = np.zeros(len(spectra), dtype=np.int32)
+            parameters.categories['spotterId'] = np.array([spectra.spotter_id], dtype=object)
+        return parameters
+
+    records = list(spectra)
+    parameters = records_to_arrays([{'timestamp': record.get('timestamp'), 'spotterId': record.get('spotterId')}
+                                    for record in records])
+
+    # the spectra of each Spotter are stacked separately, as their frequency axes can differ
+    rows = {}
+    for i, record in enumerate(records):
+        if record.get('frequency'):
+            rows.setdefault(record.get('spotterId'), []).append(i)
+
+    for spotter_id, indices in rows.items():
+        part = _parameters(SpectralData.from_records([records[i] for i in indices], spotter_id), fmin, fmax)
+        for key, values in part.items():
+            if key == 'timestamp':
+                continue
+            if key not in parameters:
+                parameters.columns[key] = np.full(len(records), np.nan)
+            parameters.columns[key][indices] = values
+
+    return parameters
+
+
+def _parameters(spectra: SpectralData, fmin: float, fmax: float) -> RecordArrays:
+    # the parameters of stacked spectra
+    columns = {'timestamp': spectra.timestamp}
+    if len(spectra) == 0:
+        return RecordArrays(columns, length=0)
+
+    frequency = spectra.frequency
+    band = np.ones(len(frequency), dtype=bool)
+    if fmin is not None:
+        band &= frequency >= fmin
+    if fmax is not None:
+        band &= frequency <= fmax
+
+    if not band.any():
+        # no frequencies within the band, so no energy to compute the parameters from
+        names = _BULK + (_DIRECTIONAL if 'a1' in spectra and 'b1' in spectra else ())
+        columns.update((name, np.full(len(spectra), np.nan)) for name in names)
+        return RecordArrays(columns)
+
+    frequency = frequency[band]
+    df = spectra.df[band]
+    density = spectra['varianceDensity'][:, band]
+
+    energy = np.where(np.isnan(density), 0.0, density) * df
+    m0 = energy.sum(axis=1)
+    m1 = (energy * frequency).sum(axis=1)
+    valid = m0 > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns['significantWaveHeight'] = np.where(valid, 4 * np.sqrt(m0), np.nan)
+        columns['meanPeriod'] = np.where(valid, m0 / m1, np.nan)
+
+        peak = np.argmax(np.where(np.isnan(density), -np.inf, density), axis=1)
+        columns['peakPeriod'] = np.where(valid, 1 / frequency[peak], np.nan)
+
+        if 'a1' in spectra and 'b1' in spectra:
+            a1 = spectra['a1'][:, band]
+            b1 = spectra['b1'][:, band]
+
+            # energy weighted moments of the whole spectrum
+            mean_a1 = np.nansum(a1 * energy, axis=1) / m0
+            mean_b1 = np.nansum(b1 * energy, axis=1) / m0
+            direction, spread = _direction(mean_a1, mean_b1)
+            columns['meanDirection'] = np.where(valid, direction, np.nan)
+            columns['meanDirectionalSpread'] = np.where(valid, spread, np.nan)
+
+            rows = np.arange(len(peak))
+            direction, spread = _direction(a1[rows, peak], b1[rows, peak])
+            columns['peakDirection'] = np.where(valid, direction, np.nan)
+            columns['peakDirectionalSpread'] = np.where(valid, spread, np.nan)
+
+    return RecordArrays(columns)
+
+
+# parameters of all spectra, and of spectra with directional moments
+_BULK = ('significantWaveHeight', 'meanPeriod', 'peakPeriod')
+_DIRECTIONAL = ('meanDirection', 'meanDirectionalSpread', 'peakDirection', 'peakDirectionalSpread')
+
+
+def _direction(a1, b1):
+    # nautical direction the waves come from, and the directional spread, both in degrees
+    direction = np.mod(270 - np.degrees(np.arctan2(b1, a1)), 360)
+    spread = np.degrees(np.sqrt(2 * np.clip(1 - np.sqrt(a1 ** 2 + b1 ** 2), 0, None)))
+    return direction, spread
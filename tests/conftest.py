@@ -0,0 +1,69 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Shared fixtures of the tests, a fake wave-data endpoint
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pytest
+
+from pysofar.records import to_records
+from pysofar.sofar import WaveDataQuery, _DATA_TYPE_KEYS
+from unittest.mock import patch
+
+# wave-data include flag of each response key
+_FLAGS = {dkey: flag for flag, dkey in _DATA_TYPE_KEYS.values()}
+
+
+class FakeWaveData:
+    """
+    Stands in for WaveDataQuery.execute: answers with the samples of every included data type whose timestamp is
+    after the start date and at or before the end date, like the wave-data endpoint, at most limit per page
+    """
+    def __init__(self, series: dict, sample=None, max_limits: dict = None):
+        """
+
+        :param series: Dictionary of response key (ex. 'waves', 'frequencyData') to the timestamps of its samples
+        :param sample: Optional function of the response key, index and timestamp building a sample. Defaults to
+                       samples with only a timestamp
+        :param max_limits: Optional dictionary of response key to the maximum page size of that data type
+        """
+        self.series = series
+        self.sample = sample or (lambda dkey, index, timestamp: {'timestamp': timestamp})
+        self.max_limits = max_limits or {}
+        # (start date, end date) of every page requested
+        self.calls = []
+
+    def __call__(self, query: WaveDataQuery) -> dict:
+        params = query._params
+        start = params.get('startDate', '')
+        self.calls.append((params.get('startDate'), params.get('endDate')))
+
+        data = {'spotterId': query.spotter_id}
+        for dkey, series in self.series.items():
+            if params.get(_FLAGS[dkey]) != 'true':
+                continue
+
+            end = params.get('endDate', series[-1])
+            limit = min(params['limit'], self.max_limits.get(dkey, params['limit']))
+            data[dkey] = [self.sample(dkey, i, ts) for i, ts in enumerate(series) if start < ts <= end][:limit]
+
+        return to_records(data) if query._as_records else data
+
+    def patch(self):
+        """
+
+        :return: Context manager replacing WaveDataQuery.execute with this fake
+        """
+        return patch.object(WaveDataQuery, 'execute', lambda query: self(query))
+
+
+@pytest.fixture
+def fake_wave_data():
+    """
+    Factory of FakeWaveData, see its arguments
+    """
+    return FakeWaveData
@@ -0,0 +1,133 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the columnar (NumPy) output mode
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from datetime import datetime, timedelta
+from pysofar.arrays import ColumnBuilder, RecordArrays, parse_timestamps, records_to_arrays
+from pysofar.sofar import SofarApi, worker_wrapper
+from pysofar.spectra import SpectralData
+from pysofar.spotter import Spotter
+from pysofar.tools import parse_date, to_epoch_ms
+from unittest.mock import patch
+
+SERIES = [parse_date(datetime(2021, 1, 1) + timedelta(minutes=30 * i)) for i in range(200)]
+
+
+def _sample(dkey, index, timestamp):
+    if dkey == 'frequencyData':
+        return {'timestamp': timestamp, 'frequency': [0.05, 0.06, 0.07], 'df': [0.01] * 3,
+                'varianceDensity': [1.0, 2.0, 1.0]}
+    if dkey == 'surfaceTemp':
+        return {'timestamp': timestamp, 'degrees': 15.0}
+    return {'timestamp': timestamp, 'significantWaveHeight': index / 10, 'latitude': 37.0,
+            'processing_source': 'embedded'}
+
+
+def test_builder_columns():
+    arrays = records_to_arrays([
+        {'timestamp': '2021-01-01T00:00:00.000Z', 'significantWaveHeight': 1.5, 'spotterId': 'SPOT-0001'},
+        {'timestamp': '2021-01-01T00:30:00.000Z', 'spotterId': 'SPOT-0002', 'peakPeriod': 8},
+        {'timestamp': '2021-01-01T01:00:00.000Z', 'significantWaveHeight': None, 'spotterId': 'SPOT-0001'},
+    ])
+
+    assert len(arrays) == 3
+    assert arrays['timestamp'].dtype == np.int64
+    assert arrays['timestamp'][0] == to_epoch_ms('2021-01-01T00:00:00.000Z')
+    assert arrays['significantWaveHeight'][0] == 1.5
+    assert np.isnan(arrays['significantWaveHeight'][1:]).all()
+    assert np.isnan(arrays['peakPeriod'][0]) and arrays['peakPeriod'][1] == 8
+    assert arrays['spotterId'].dtype == np.int32
+    assert list(arrays.labels('spotterId')) == ['SPOT-0001', 'SPOT-0002', 'SPOT-0001']
+
+
+def test_builder_mixed_types():
+    builder = ColumnBuilder()
+    builder.extend([{'timestamp': '2021-01-01T00:00:00.000Z', 'value': 1},
+                    {'timestamp': '2021-01-01T00:30:00.000Z', 'value': 'n/a'}])
+
+    arrays = builder.build()
+
+    assert arrays['value'].dtype == object
+    assert list(arrays['value']) == [1.0, 'n/a']
+
+
+def test_concatenate_and_sort():
+    first = records_to_arrays([{'timestamp': '2021-01-02T00:00:00.000Z', 'spotterId': 'SPOT-0002', 'a': 1}])
+    second = records_to_arrays([{'timestamp': '2021-01-01T00:00:00.000Z', 'spotterId': 'SPOT-0001', 'b': 2}])
+
+    arrays = RecordArrays.concatenate([first, second]).sort()
+
+    assert list(arrays.labels('spotterId')) == ['SPOT-0001', 'SPOT-0002']
+    assert np.isnan(arrays['a'][0]) and arrays['a'][1] == 1
+    assert arrays['b'][0] == 2 and np.isnan(arrays['b'][1])
+
+
+def test_concatenate_categories_with_other_kinds():
+    strings = records_to_arrays([{'processing_source': 'embedded'}, {'processing_source': None}])
+    floats = records_to_arrays([{'processing_source': 3.0}])
+    objects = records_to_arrays([{'processing_source': [1]}])
+
+    assert list(RecordArrays.concatenate([strings, floats])['processing_source']) == ['embedded', None, 3.0]
+    assert list(RecordArrays.concatenate([floats, strings, objects])['processing_source']) == \
+        [3.0, 'embedded', None, [1]]
+
+
+def test_worker_arrays_match_lists(fake_wave_data):
+    args = ('waves', ['SPOT-0001', 'SPOT-0002'], '2020-12-31', '2021-01-12', {'limit': 30})
+    with fake_wave_data({'waves': SERIES}, _sample).patch():
+        records = worker_wrapper(args)
+        arrays = worker_wrapper(args, as_arrays=True)
+        sharded = worker_wrapper(args, time_shards=3, as_arrays=True)
+
+    assert len(arrays) == len(records) == 2 * len(SERIES)
+    assert list(arrays['timestamp']) == [to_epoch_ms(record['timestamp']) for record in records]
+    assert list(arrays['significantWaveHeight']) == [record['significantWaveHeight'] for record in records]
+    assert list(arrays.labels('spotterId')) == [record['spotterId'] for record in records]
+    assert list(sharded['timestamp']) == list(arrays['timestamp'])
+
+
+def test_grab_data_arrays(fake_wave_data):
+    fake = fake_wave_data({'waves': SERIES, 'frequencyData': SERIES[:2], 'surfaceTemp': SERIES[:1]}, _sample)
+
+    spotter = Spotter('SPOT-0001', 'one', SofarApi(custom_token='token'))
+    with fake.patch():
+        data = spotter.grab_data(limit=5, start_date='2020-12-31', include_frequency_data=True,
+                                 include_surface_temp_data=True, as_arrays=True)
+
+    assert isinstance(data['waves'], RecordArrays) and len(data['waves']) == 5
+    # the per frequency lists are stacked, not kept as object arrays
+    assert isinstance(data['frequencyData'], SpectralData)
+    assert data['frequencyData'].spotter_id == 'SPOT-0001'
+    assert data['frequencyData']['varianceDensity'].shape == (2, 3)
+    assert data['surfaceTemp'] == [{'timestamp': SERIES[0], 'degrees': 15.0}]
+
+
+def test_parse_timestamps_matches_scalar_parse():
+    timestamps = ['2021-01-01T00:00:00.000Z', '2021-01-01T00:30:00Z', '2021-01-01T01:00:00.250', '2021-01-02', None]
+
+    parsed = parse_timestamps(timestamps)
+
+    assert parsed.dtype == np.dtype('datetime64[ms]')
+    assert list(parsed[:4].view(np.int64)) == [to_epoch_ms(timestamp) for timestamp in timestamps[:4]]
+    assert np.isnat(parsed[4])
+
+
+def test_page_timestamps_parsed_at_once():
+    page = [{'timestamp': '2021-01-01T00:00:00.000Z', 'a': 1}, {'timestamp': '2021-01-01T00:30:00.000Z', 'a': 2}]
+    builder = ColumnBuilder()
+
+    with patch('pysofar.arrays.iso_to_epoch_ms') as scalar_parse:
+        builder.extend(page)
+
+    scalar_parse.assert_not_called()
+    assert list(builder.build()['timestamp']) == [to_epoch_ms(record['timestamp']) for record in page]
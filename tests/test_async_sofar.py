@@ -0,0 +1,191 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the asyncio client against a local fake api
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import asyncio
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+
+from pysofar.async_sofar import AsyncSofarApi, AsyncWaveDataQuery
+from pysofar.records import WaveSample
+from pysofar.throttle import RetryPolicy
+from pysofar.wavefleet_exceptions import QueryError
+
+DEVICES = [{'spotterId': 'SPOT-0001', 'name': 'one'}, {'spotterId': 'SPOT-0002', 'name': 'two'}]
+TIMESTAMPS = ['2021-01-01T00:00:00.000Z', '2021-01-01T00:30:00.000Z', '2021-01-01T01:00:00.000Z']
+
+
+def _fake_api(inclusive_start=False, throttled=0):
+    in_flight = {'now': 0, 'max': 0, 'devices': 0}
+
+    async def devices(request):
+        in_flight['devices'] += 1
+        if in_flight['devices'] <= throttled:
+            return web.json_response({'message': 'slow down'}, status=429, headers={'Retry-After': '0'})
+        return web.json_response({'data': {'devices': DEVICES}})
+
+    async def latest_data(request):
+        spotter_id = request.query['spotterId']
+        track = [{'latitude': 1.0, 'longitude': 2.0, 'timestamp': TIMESTAMPS[-1]}]
+        return web.json_response({'data': {
+            'spotterId': spotter_id, 'spotterName': spotter_id, 'payloadType': 'waves', 'batteryPower': 1,
+            'batteryVoltage': 4, 'solarVoltage': 5, 'humidity': 6, 'waves': [], 'track': track, 'frequencyData': []
+        }})
+
+    async def wave_data(request):
+        in_flight['now'] += 1
+        in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        await asyncio.sleep(0.01)
+        in_flight['now'] -= 1
+
+        start = request.query['startDate']
+        # the api's start date is exclusive, an inclusive one repeats the last sample of the previous page
+        samples = [{'timestamp': ts, 'value': 1.0} for ts in TIMESTAMPS
+                   if ts > start or (inclusive_start and ts == start)][:2]
+        data = {key: samples for key in ('waves', 'wind', 'track', 'frequencyData')}
+        data['spotterId'] = request.query['spotterId']
+        return web.json_response({'data': data})
+
+    async def search(request):
+        if 'page' not in request.query:
+            page = {'hasMoreData': True, 'nextPage': 'http://localhost/api/search?page=2'}
+            return web.json_response({'data': [{'id': 1}], 'metadata': {'page': page}})
+        return web.json_response({'data': [{'id': 2}], 'metadata': {'page': {'hasMoreData': False}}})
+
+    async def change_name(request):
+        body = await request.json()
+        return web.json_response({'message': 'updated', 'data': body})
+
+    app = web.Application()
+    # the client keeps the leading slash of some endpoint suffixes, which the api tolerates
+    app.router.add_get('/api//devices', devices)
+    app.router.add_get('/api//latest-data', latest_data)
+    app.router.add_get('/api/wave-data', wave_data)
+    app.router.add_get('/api/search', search)
+    app.router.add_post('/api/change-name', change_name)
+
+    return app, in_flight
+
+
+async def _with_api(coroutine, max_concurrency=64, max_retries=5, rate_limit=None, **options):
+    app, in_flight = _fake_api(**options)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    try:
+        retry_policy = RetryPolicy(max_retries=max_retries, backoff_factor=0.01)
+        async with AsyncSofarApi(custom_token='token', max_concurrency=max_concurrency, retry_policy=retry_policy,
+                                 rate_limit=rate_limit) as api:
+            api.endpoint = f'http://127.0.0.1:{port}/api'
+            return await coroutine(api), in_flight
+    finally:
+        await runner.cleanup()
+
+
+def test_async_get_wave_data():
+    async def run(api):
+        return await api.get_wave_data(start_date='2020-12-31', end_date='2021-01-01T01:00:00.000Z')
+
+    dat, _ = asyncio.run(_with_api(run))
+
+    assert len(dat['waves']) == len(DEVICES) * len(TIMESTAMPS)
+    assert [d['timestamp'] for d in dat['waves']] == sorted(d['timestamp'] for d in dat['waves'])
+    assert {d['spotterId'] for d in dat['waves']} == {'SPOT-0001', 'SPOT-0002'}
+
+
+def test_async_repeated_boundary_sample():
+    async def run(api):
+        # without an end date, the walk stops once the start date no longer moves forward
+        return await asyncio.wait_for(api.get_wave_data(start_date='2020-12-31'), timeout=5)
+
+    dat, _ = asyncio.run(_with_api(run, inclusive_start=True))
+
+    # the sample repeated at the page boundary is kept once
+    assert len(dat['waves']) == len(DEVICES) * len(TIMESTAMPS)
+    assert len({(d['spotterId'], d['timestamp']) for d in dat['waves']}) == len(dat['waves'])
+
+
+def test_async_concurrency_limit():
+    async def run(api):
+        return await api.get_all_data(start_date='2020-12-31', end_date='2021-01-01T01:00:00.000Z')
+
+    _, in_flight = asyncio.run(_with_api(run, max_concurrency=2))
+
+    assert in_flight['max'] <= 2
+
+
+def test_async_get_spotters_and_search():
+    async def run(api):
+        spotters = await api.get_spotters()
+        found = await api.search('circle', [1, 2], '2021-01-01', '2021-01-02', radius=10)
+
+        # the Spotters share a SofarApi with the token and endpoint of the client
+        assert all(s.session is api.sync_api for s in spotters)
+        assert api.sync_api.token == 'token' and api.sync_api.endpoint == api.endpoint
+        return spotters, found
+
+    (spotters, found), _ = asyncio.run(_with_api(run))
+
+    assert [s.id for s in spotters] == ['SPOT-0001', 'SPOT-0002']
+    assert spotters[0].timestamp == TIMESTAMPS[-1]
+    assert found == [{'id': 1}, {'id': 2}]
+
+
+def test_async_throttled_requests_are_retried():
+    async def run(api):
+        await api.sync()
+        return api.device_ids
+
+    device_ids, in_flight = asyncio.run(_with_api(run, throttled=2, rate_limit=1000))
+    assert device_ids == ['SPOT-0001', 'SPOT-0002']
+    assert in_flight['devices'] == 3
+
+    with pytest.raises(QueryError, match='slow down'):
+        asyncio.run(_with_api(run, throttled=2, max_retries=1))
+
+
+def test_async_query_as_records():
+    async def run(api):
+        query = AsyncWaveDataQuery('SPOT-0001', limit=100, start_date='2020-12-31', api=api)
+        query.as_records(True)
+        return await query.execute()
+
+    data, _ = asyncio.run(_with_api(run))
+
+    assert len(data['waves']) == 2 and all(isinstance(sample, WaveSample) for sample in data['waves'])
+    assert data['waves'][0]['timestamp'] == TIMESTAMPS[0]
+
+
+def test_async_query_copies_and_shards():
+    api = AsyncSofarApi(custom_token='token')
+    query = AsyncWaveDataQuery('SPOT-0001', limit=100, start_date='2021-01-01', end_date='2021-01-02', api=api)
+    query.as_records(True)
+
+    copy = query.copy(start_date='2021-01-01T12:00:00.000Z')
+    shards = query.shards(4)
+
+    assert isinstance(copy, AsyncWaveDataQuery) and copy._api is api
+    assert copy.start_date == '2021-01-01T12:00:00.000Z' and copy.end_date == query.end_date
+    assert copy._params['limit'] == 100 and copy._as_records
+    assert len(shards) == 4 and all(isinstance(shard, AsyncWaveDataQuery) for shard in shards)
+    assert shards[0].start_date == query.start_date and shards[-1].end_date == query.end_date
+
+
+def test_async_update_spotter_name_posts():
+    async def run(api):
+        return await api.update_spotter_name('SPOT-0001', 'renamed')
+
+    name, _ = asyncio.run(_with_api(run))
+
+    assert name == 'renamed'
@@ -0,0 +1,56 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for fetching several data types in one paginated walk
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+from datetime import datetime, timedelta
+from pysofar.sofar import worker_wrapper, combined_worker_wrapper
+from pysofar.tools import parse_date
+
+
+def _series(count, minutes):
+    return [parse_date(datetime(2021, 1, 1) + timedelta(minutes=minutes * i)) for i in range(count)]
+
+
+# the different data types have different cadences and page sizes, like the wave-data endpoint
+SERIES = {'waves': _series(300, 30), 'wind': _series(100, 90), 'track': _series(50, 30),
+          'frequencyData': _series(300, 30)}
+MAX_LIMITS = {'waves': 40, 'wind': 40, 'track': 40, 'frequencyData': 10}
+
+
+def _sample(dkey, index, timestamp):
+    return {'timestamp': timestamp, 'type': dkey}
+
+
+def test_combined_matches_separate_walks(fake_wave_data):
+    types = ['waves', 'wind', 'frequency', 'track']
+    ids = ['SPOT-0001', 'SPOT-0002']
+    fake = fake_wave_data(SERIES, _sample, MAX_LIMITS)
+
+    with fake.patch():
+        separate = {name: worker_wrapper((name, ids, '2020-12-31', '2021-01-12', None)) for name in types}
+        separate_calls = len(fake.calls)
+
+        fake.calls.clear()
+        combined = combined_worker_wrapper((types, ids, '2020-12-31', '2021-01-12', None))
+        combined_calls = len(fake.calls)
+
+    assert combined == separate
+    assert len(combined['frequency']) == 2 * 300
+    assert combined_calls < separate_calls
+
+
+def test_combined_with_time_shards(fake_wave_data):
+    types = ['waves', 'frequency']
+    ids = ['SPOT-0001']
+
+    with fake_wave_data(SERIES, _sample, MAX_LIMITS).patch():
+        expected = combined_worker_wrapper((types, ids, '2020-12-31', '2021-01-12', None))
+        sharded = combined_worker_wrapper((types, ids, '2020-12-31', '2021-01-12', None), time_shards=5)
+
+    assert sharded == expected
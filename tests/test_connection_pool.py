@@ -0,0 +1,99 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the pooled http session shared between the api and its queries
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+from pysofar import SofarConnection
+from pysofar.decoding import default_decoder, stdlib_decoder
+from pysofar.sofar import SofarApi, WaveDataQuery, CellularSignalMetricsQuery
+from pysofar.spotter import Spotter
+from unittest.mock import MagicMock, patch
+
+
+with patch.object(SofarApi, '_sync', return_value=None):
+    api = SofarApi(custom_token='custom_api_token_here', pool_size=4)
+
+
+def test_api_owns_pooled_session():
+    adapter = api.http_session.get_adapter('https://api.sofarocean.com')
+
+    assert adapter._pool_maxsize == 4
+
+
+def test_queries_share_api_session():
+    # queries and Spotters created from the api reuse its session instead of opening their own
+    query = WaveDataQuery('SPOT-0350', api=api)
+    cell_query = CellularSignalMetricsQuery('SPOT-0350', api=api)
+    sptr = Spotter('SPOT-0350', 'test', session=api)
+
+    assert query.http_session is api.http_session
+    assert cell_query.http_session is api.http_session
+    assert sptr._session.http_session is api.http_session
+
+
+def test_get_goes_through_session():
+    session = MagicMock()
+    session.get.return_value.status_code = 200
+    session.get.return_value.content = b'{"data": {"spotterId": "SPOT-0350"}}'
+
+    query = WaveDataQuery('SPOT-0350')
+    query.http_session = session
+    data = query.execute()
+
+    assert data == {'spotterId': 'SPOT-0350'}
+    assert session.get.call_count == 1
+    assert session.get.call_args[1]['params']['spotterId'] == 'SPOT-0350'
+
+
+def test_query_does_not_close_borrowed_session():
+    query = WaveDataQuery('SPOT-0350', api=api)
+    with patch.object(api.http_session, 'close') as mock_close:
+        query.close()
+
+    assert mock_close.call_count == 0
+
+
+def test_stdlib_decoder_fallback():
+    with patch('pysofar.decoding.orjson', None):
+        assert default_decoder() is stdlib_decoder
+
+    assert stdlib_decoder(b'{"data": [1.5, null]}') == {'data': [1.5, None]}
+
+
+def test_queries_borrow_api_context():
+    with patch('pysofar.get_token', side_effect=AssertionError('token read from the environment')):
+        query = WaveDataQuery('SPOT-0350', api=api)
+        cell_query = CellularSignalMetricsQuery('SPOT-0350', api=api)
+
+    assert query.header['token'] == 'custom_api_token_here'
+    assert cell_query.header['token'] == 'custom_api_token_here'
+    assert query.endpoint == api.endpoint
+    assert not hasattr(query, '__dict__')
+
+    # changing a setting of a query does not change the api
+    query.store = 'query store'
+    assert api.store is None
+
+
+def test_session_ownership_follows_the_session_set():
+    conn = SofarConnection(custom_token='token')
+    created = conn.http_session
+    given = MagicMock()
+
+    # the session the connection created is closed when replaced, a given one is left to its owner
+    with patch.object(created, 'close') as mock_close:
+        conn.http_session = given
+        assert mock_close.call_count == 1
+    conn.close()
+    assert given.close.call_count == 0
+
+    # after unsetting it, the connection owns the session it creates again
+    conn.http_session = None
+    with patch.object(conn.http_session, 'close') as mock_close:
+        conn.close()
+        assert mock_close.call_count == 1
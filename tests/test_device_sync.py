@@ -0,0 +1,126 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the lazy device sync and the device snapshot
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+from pysofar.sofar import SofarApi, get_and_update_spotters
+from pysofar.spotter import Spotter
+from unittest.mock import patch
+
+import threading
+
+DEVICES = [{'spotterId': 'SPOT-0001', 'name': 'one'}, {'spotterId': 'SPOT-0002', 'name': 'two'}]
+RESPONSE = (200, {'data': {'devices': DEVICES}})
+
+
+def test_devices_are_synced_on_first_use():
+    with patch.object(SofarApi, '_get', return_value=RESPONSE) as mock_get:
+        api = SofarApi(custom_token='token')
+        spotter = Spotter('SPOT-0001', 'one')
+        assert mock_get.call_count == 0
+
+        assert api.device_ids == ['SPOT-0001', 'SPOT-0002']
+        assert api.devices == DEVICES
+        assert mock_get.call_count == 1
+
+    assert spotter._session is None
+
+
+def test_device_snapshot(tmp_path):
+    path = str(tmp_path / 'devices.json')
+
+    with patch.object(SofarApi, '_get', return_value=RESPONSE) as mock_get:
+        assert SofarApi(custom_token='token', device_cache=path).device_ids == ['SPOT-0001', 'SPOT-0002']
+        assert SofarApi(custom_token='token', device_cache=path).devices == DEVICES
+        assert mock_get.call_count == 1
+
+        # snapshots of other accounts or older than the ttl are not used
+        SofarApi(custom_token='other token', device_cache=path).devices
+        assert mock_get.call_count == 2
+        SofarApi(custom_token='other token', device_cache=path, device_cache_ttl=-1).devices
+        assert mock_get.call_count == 3
+
+
+def test_token_change_bypasses_snapshot(tmp_path):
+    path = str(tmp_path / 'devices.json')
+
+    with patch.object(SofarApi, '_get', return_value=RESPONSE) as mock_get:
+        api = SofarApi(custom_token='token', device_cache=path)
+        api.devices
+        api.token = 'token'
+        assert mock_get.call_count == 2
+
+
+def _latest_data(spotter_id, timestamp):
+    track = [{'latitude': 1.0, 'longitude': 2.0, 'timestamp': timestamp}]
+    return {'spotterId': spotter_id, 'spotterName': spotter_id, 'payloadType': 'waves', 'batteryPower': 1,
+            'batteryVoltage': 4.0, 'solarVoltage': 0.0, 'humidity': 10, 'waves': [], 'track': track,
+            'frequencyData': []}
+
+
+def test_incremental_spotter_refresh():
+    reported = {'SPOT-0001': '2021-01-01T00:00:00.000Z', 'SPOT-0002': '2021-01-01T00:00:00.000Z'}
+    devices = list(DEVICES)
+
+    def fake_get(endpoint, params=None):
+        if endpoint == '/devices':
+            return 200, {'data': {'devices': devices}}
+        if endpoint == 'device-radius':
+            return 200, {'data': {'devices': [{'spotterId': _id, 'timestamp': ts} for _id, ts in reported.items()]}}
+        return 200, {'data': _latest_data(params['spotterId'], reported.get(params['spotterId']))}
+
+    with patch.object(SofarApi, '_get', side_effect=fake_get) as mock_get:
+        api = SofarApi(custom_token='token')
+        spotters = api.get_spotters()
+
+        def latest_data_calls():
+            return [call.kwargs['params']['spotterId'] for call in mock_get.call_args_list
+                    if call.args[0] == '/latest-data']
+
+        # nothing reported since, so only the device-radius request is made
+        assert api.get_spotters(spotters) == spotters
+        assert latest_data_calls() == ['SPOT-0001', 'SPOT-0002']
+
+        reported['SPOT-0002'] = '2021-01-01T00:30:00.000Z'
+        refreshed = api.get_spotters(spotters)
+        assert latest_data_calls()[2:] == ['SPOT-0002']
+        assert refreshed[1] is spotters[1]
+        assert spotters[1].timestamp == '2021-01-01T00:30:00.000Z'
+
+        # new devices of the account are added
+        devices.append({'spotterId': 'SPOT-0003', 'name': 'three'})
+        reported['SPOT-0003'] = '2021-01-01T00:00:00.000Z'
+        api.devices = devices
+        refreshed = api.get_spotters(refreshed)
+        assert [spotter.id for spotter in refreshed] == ['SPOT-0001', 'SPOT-0002', 'SPOT-0003']
+        assert latest_data_calls()[3:] == ['SPOT-0003']
+
+        # and those of devices removed from it are dropped, even if they reported since
+        del devices[0]
+        reported['SPOT-0001'] = '2021-01-01T01:00:00.000Z'
+        api.devices = devices
+        refreshed = api.get_spotters(refreshed)
+        assert [spotter.id for spotter in refreshed] == ['SPOT-0002', 'SPOT-0003']
+        assert latest_data_calls()[4:] == []
+
+
+def test_spotters_without_api_release_their_workers():
+    def fake_get(endpoint, params=None):
+        if endpoint == '/devices':
+            return RESPONSE
+        return 200, {'data': _latest_data(params['spotterId'], '2021-01-01T00:00:00.000Z')}
+
+    with patch.object(SofarApi, '_get', side_effect=fake_get):
+        threads = threading.active_count()
+        for _ in range(5):
+            spotters = get_and_update_spotters()
+            assert threading.active_count() == threads
+
+        # the Spotters can still use the closed api
+        spotters[0].update()
+        assert spotters[0].timestamp == '2021-01-01T00:00:00.000Z'
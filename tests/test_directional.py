@@ -0,0 +1,71 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the directional spectrum estimators
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pysofar.directional import default_directions, directional_spectrum, iter_directional_spectrum
+from pysofar.spectra import SpectralData
+
+FREQUENCY = np.linspace(0.05, 0.5, 10)
+
+
+def _spectra(coming_from):
+    # moments of a cosine-2s distribution (s = 10) around each given nautical direction
+    angles = np.radians(np.arange(0, 360, 0.5))
+    fields = {key: np.empty((len(coming_from), len(FREQUENCY))) for key in ('a1', 'b1', 'a2', 'b2')}
+
+    for i, direction in enumerate(coming_from):
+        spreading = np.cos((angles - np.radians(270 - direction)) / 2) ** 20
+        spreading /= spreading.sum()
+        fields['a1'][i] = (np.cos(angles) * spreading).sum()
+        fields['b1'][i] = (np.sin(angles) * spreading).sum()
+        fields['a2'][i] = (np.cos(2 * angles) * spreading).sum()
+        fields['b2'][i] = (np.sin(2 * angles) * spreading).sum()
+
+    fields['varianceDensity'] = np.ones((len(coming_from), len(FREQUENCY)))
+    return SpectralData('SPOT-0001', np.arange(len(coming_from), dtype=np.int64), FREQUENCY,
+                        np.full(len(FREQUENCY), 0.05), fields)
+
+
+@pytest.mark.parametrize('method', ['mem', 'cos2s'])
+def test_estimators_recover_direction(method):
+    spectra = _spectra([45.0, 200.0, 330.0])
+
+    density = directional_spectrum(spectra, method=method)
+
+    assert density.shape == (3, len(FREQUENCY), len(default_directions()))
+    # the mean (not necessarily the peak, MEM can split narrow peaks) direction is recovered
+    angles = np.radians(270 - default_directions())
+    mean = np.angle((density[:, 0] * np.exp(1j * angles)).sum(axis=1))
+    assert np.allclose(np.mod(270 - np.degrees(mean), 360), [45.0, 200.0, 330.0], atol=0.5)
+    # the spreading keeps the energy of each frequency
+    assert np.allclose(density.sum(axis=2) * 5.0, 1.0)
+
+
+def test_chunks_match():
+    spectra = _spectra(np.linspace(0, 350, 11))
+
+    whole = directional_spectrum(spectra, chunk_size=100)
+    chunks = list(iter_directional_spectrum(spectra, chunk_size=4))
+
+    assert [start for start, _ in chunks] == [0, 4, 8]
+    assert np.allclose(np.concatenate([chunk for _, chunk in chunks]), whole)
+
+
+def test_missing_moments():
+    spectra = _spectra([45.0])
+    del spectra.fields['a2']
+
+    with pytest.raises(ValueError):
+        directional_spectrum(spectra)
+
+    assert directional_spectrum(spectra, method='cos2s').shape == (1, len(FREQUENCY), 72)
@@ -0,0 +1,43 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the partitioned Parquet export
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pytest
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+from datetime import datetime, timedelta
+from pysofar import SofarConnection
+from pysofar.export import export_parquet, partition_path
+from pysofar.tools import parse_date
+
+# hourly samples over 3 days
+SERIES = [parse_date(datetime(2021, 1, 1) + timedelta(hours=i)) for i in range(72)]
+
+
+def _wave(dkey, index, timestamp):
+    return {'timestamp': timestamp, 'significantWaveHeight': 1.0}
+
+
+def test_export_partitions(tmp_path, fake_wave_data):
+    api = SofarConnection(custom_token='token')
+
+    with fake_wave_data({'waves': SERIES}, _wave).patch():
+        written = export_parquet(api, str(tmp_path), '2020-12-31', '2021-01-05',
+                                 spotter_ids=['SPOT-0001', 'SPOT-0002'])
+
+    assert len(written) == 6
+    assert partition_path(str(tmp_path), 'waves', 'SPOT-0002', '2021-01-03') in written
+
+    table = pq.read_table(partition_path(str(tmp_path), 'waves', 'SPOT-0001', '2021-01-02'))
+    assert table.num_rows == 24
+    assert 'spotterId' not in table.column_names
+
+    dataset = pq.read_table(str(tmp_path / 'data_type=waves'))
+    assert dataset.num_rows == 2 * len(SERIES)
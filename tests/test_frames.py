@@ -0,0 +1,110 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the pandas and Arrow conversions
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pytest
+
+pd = pytest.importorskip('pandas')
+pa = pytest.importorskip('pyarrow')
+
+from pysofar.arrays import records_to_arrays
+from pysofar.frames import to_arrow, to_dataframe
+from pysofar.sofar import SofarApi, WaveDataQuery
+from pysofar.spectra import SpectralData
+from unittest.mock import patch
+
+RECORDS = [
+    {'timestamp': '2021-01-01T00:00:00.000Z', 'significantWaveHeight': 1.5, 'spotterId': 'SPOT-0001'},
+    {'timestamp': '2021-01-01T00:30:00.000Z', 'significantWaveHeight': None, 'spotterId': 'SPOT-0002'},
+    {'timestamp': '2021-01-01T01:00:00.000Z', 'significantWaveHeight': 1.7, 'spotterId': None},
+]
+
+
+def test_dataframe_from_generator():
+    frame = to_dataframe(record for record in RECORDS)
+
+    assert list(frame.columns) == ['timestamp', 'significantWaveHeight', 'spotterId']
+    assert str(frame['timestamp'].dt.tz) == 'UTC'
+    assert frame['timestamp'][1] == pd.Timestamp('2021-01-01T00:30:00Z')
+    assert frame['significantWaveHeight'].isna().tolist() == [False, True, False]
+    assert frame['spotterId'].dtype == 'category'
+    assert frame['spotterId'].tolist()[:2] == ['SPOT-0001', 'SPOT-0002']
+    assert pd.isna(frame['spotterId'][2])
+
+
+def test_dataframe_of_results_dictionary():
+    frames = to_dataframe({'spotterId': 'SPOT-0001', 'waves': RECORDS, 'wind': records_to_arrays([])})
+
+    assert set(frames) == {'waves', 'wind'}
+    assert len(frames['waves']) == 3
+    assert len(frames['wind']) == 0
+
+
+def test_dataframe_of_arrays():
+    frame = to_dataframe(records_to_arrays(RECORDS))
+
+    assert list(frame.columns) == ['timestamp', 'significantWaveHeight', 'spotterId']
+    assert frame['timestamp'][2] == pd.Timestamp('2021-01-01T01:00:00Z')
+    assert frame['spotterId'].tolist()[:2] == ['SPOT-0001', 'SPOT-0002']
+
+
+def test_dataframe_of_all_data():
+    api = SofarApi(custom_token='token')
+    api.devices = [{'spotterId': 'SPOT-0001'}]
+
+    def execute(query):
+        # one page per data type, then an empty one
+        data = {'spotterId': 'SPOT-0001'}
+        for key in ('waves', 'wind', 'track', 'frequencyData'):
+            data[key] = RECORDS[:1] if query.start_date < RECORDS[0]['timestamp'] else []
+        return data
+
+    with patch.object(WaveDataQuery, 'execute', execute):
+        arrays = api.get_all_data('2020-12-31T00:00:00.000Z', '2021-01-02T00:00:00.000Z', as_arrays=True)
+        generators = api.get_all_data('2020-12-31T00:00:00.000Z', '2021-01-02T00:00:00.000Z',
+                                      return_generator=True)
+
+        for data in (arrays, generators):
+            frames = to_dataframe(data)
+            assert set(frames) == {'waves', 'wind', 'frequency', 'track'}
+            assert all(len(frame) == 1 for frame in frames.values())
+            assert frames['waves']['spotterId'].tolist() == ['SPOT-0001']
+
+
+def test_dataframe_of_spectra():
+    samples = [{'timestamp': record['timestamp'], 'frequency': [0.1, 0.2], 'df': [0.1, 0.1],
+                'varianceDensity': [1.0 + i, 2.0 + i]} for i, record in enumerate(RECORDS[:2])]
+    spectra = SpectralData.from_records(samples, 'SPOT-0001')
+
+    frame = to_dataframe(spectra)
+    assert len(frame) == 4
+    assert frame['frequency'].tolist() == [0.1, 0.2, 0.1, 0.2]
+    assert frame['varianceDensity'].tolist() == [1.0, 2.0, 2.0, 3.0]
+    assert frame['timestamp'][2] == pd.Timestamp('2021-01-01T00:30:00Z')
+    assert frame['spotterId'].tolist() == ['SPOT-0001'] * 4
+
+    # as_spectra=True results, a dictionary of Spotter id to SpectralData
+    other = SpectralData.from_records(samples[:1], 'SPOT-0002')
+    frames = to_dataframe({'frequency': {'SPOT-0001': spectra, 'SPOT-0002': other}})
+    assert frames['frequency']['spotterId'].tolist() == ['SPOT-0001'] * 4 + ['SPOT-0002'] * 2
+    assert to_arrow(spectra).num_rows == 4
+
+    with pytest.raises(TypeError):
+        to_dataframe({'waves': RECORDS, 'unknown': object()})
+
+
+def test_arrow_table():
+    table = to_arrow(records_to_arrays(RECORDS + [{'timestamp': None, 'extra': [1, 2]}]))
+
+    assert table.schema.field('timestamp').type == pa.timestamp('ms', tz='UTC')
+    assert table.column('timestamp').null_count == 1
+    assert table.column('significantWaveHeight').null_count == 2
+    assert pa.types.is_dictionary(table.schema.field('spotterId').type)
+    assert table.column('spotterId').to_pylist() == ['SPOT-0001', 'SPOT-0002', None, None]
+    assert table.column('extra').to_pylist() == [None, None, None, [1, 2]]
@@ -0,0 +1,158 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the request instrumentation hooks and the metrics collector
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import json
+import requests
+
+from datetime import datetime, timedelta
+from pysofar import SofarConnection
+from pysofar.metrics import LATENCY_BUCKETS, MetricsCollector, RequestHooks, endpoint_name
+from pysofar.scheduler import Scheduler
+from pysofar.sofar import SofarApi
+from pysofar.throttle import RetryPolicy
+from pysofar.tools import parse_date
+from unittest.mock import MagicMock
+
+SERIES = [parse_date(datetime(2021, 1, 1) + timedelta(minutes=30 * i)) for i in range(100)]
+
+
+def _response(status, body):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = {}
+    response.content = json.dumps(body).encode()
+    return response
+
+
+class RecordingHooks(RequestHooks):
+    def __init__(self):
+        self.events = []
+
+    def request_start(self, endpoint):
+        self.events.append(('request_start', endpoint))
+
+    def request_end(self, endpoint, status, seconds, bytes_in, retries):
+        self.events.append(('request_end', endpoint, status, bytes_in, retries))
+
+    def retry(self, endpoint, attempt, status, delay):
+        self.events.append(('retry', endpoint, attempt, status))
+
+    def decode(self, endpoint, seconds, bytes_in):
+        self.events.append(('decode', endpoint, bytes_in))
+
+
+def test_endpoint_name():
+    assert endpoint_name('/latest-data') == 'latest-data'
+    assert endpoint_name('devices/SPOT-0001/cellular-signal-metrics') == 'cellular-signal-metrics'
+
+
+def test_request_events():
+    hooks = RecordingHooks()
+    body = {'data': {'spotterId': 'SPOT-0001'}}
+    conn = SofarConnection(custom_token='token', hooks=hooks, retry_policy=RetryPolicy(sleep=lambda _: None))
+    conn.http_session = MagicMock()
+    conn.http_session.get.side_effect = [_response(503, {}), _response(200, body)]
+
+    assert conn._get('/latest-data', params={'spotterId': 'SPOT-0001'}) == (200, body)
+
+    size = len(json.dumps(body))
+    assert hooks.events == [('request_start', 'latest-data'), ('retry', 'latest-data', 0, 503),
+                            ('request_end', 'latest-data', 200, size, 1), ('decode', 'latest-data', size)]
+
+
+def test_failed_request_events():
+    hooks = RecordingHooks()
+    conn = SofarConnection(custom_token='token', hooks=hooks, retry_policy=RetryPolicy(max_retries=0))
+    conn.http_session = MagicMock()
+    conn.http_session.get.side_effect = requests.ConnectionError()
+
+    try:
+        conn._get('wave-data')
+    except requests.ConnectionError:
+        pass
+
+    assert hooks.events == [('request_start', 'wave-data'), ('request_end', 'wave-data', None, 0, 0)]
+
+
+def test_collector_summary_and_histogram():
+    collector = MetricsCollector()
+    collector.request_end('wave-data', 200, 0.02, 100, 0)
+    collector.request_end('wave-data', 429, 0.2, 10, 2)
+    collector.decode('wave-data', 0.001, 100)
+    collector.queue_wait('wave-data', 0.5)
+    collector.queue_wait('wave-data', 1.5)
+    collector.page('SPOT-0001', 'waves', 20)
+    collector.page('SPOT-0001', 'waves', 5)
+    collector.stage('sort', 0.01, 25)
+
+    summary = collector.summary()
+    stats = summary['endpoints']['wave-data']
+    assert stats['requests'] == 2 and stats['retries'] == 2 and stats['errors'] == 1
+    assert stats['statuses'] == {200: 1, 429: 1}
+    assert stats['bytes_in'] == 110
+    assert stats['max_seconds'] == 0.2
+    assert stats['mean_queue_wait'] == 1.0
+    assert summary['pages'] == {'pages': 2, 'samples': 25}
+    assert summary['stages'] == {'sort': {'runs': 1, 'seconds': 0.01, 'items': 25}}
+    assert collector.pages() == {('SPOT-0001', 'waves'): (2, 25)}
+
+    histogram = dict(collector.histogram('wave-data'))
+    assert sum(histogram.values()) == 2
+    assert histogram[0.025] == 1 and histogram[0.25] == 1
+    assert len(collector.histogram('latest-data')) == len(LATENCY_BUCKETS) + 1
+
+    collector.reset()
+    assert collector.summary()['endpoints'] == {}
+
+
+def test_scheduler_queue_wait():
+    collector = MetricsCollector()
+    scheduler = Scheduler(2, hooks=collector)
+    try:
+        assert scheduler.map(lambda x: x * 2, range(4), endpoint='wave-data') == [0, 2, 4, 6]
+    finally:
+        scheduler.shutdown()
+
+    assert collector.summary()['endpoints']['wave-data']['mean_queue_wait'] >= 0
+
+
+def test_pages_and_sort_of_a_multi_spotter_walk(fake_wave_data):
+    collector = MetricsCollector()
+    api = SofarApi(custom_token='token', hooks=collector)
+    api.devices = [{'spotterId': 'SPOT-0001', 'name': 'one'}, {'spotterId': 'SPOT-0002', 'name': 'two'}]
+
+    try:
+        with fake_wave_data({'waves': SERIES}).patch():
+            data = api.get_wave_data(start_date='2020-12-31', end_date='2021-01-12')['waves']
+    finally:
+        api.close()
+
+    summary = collector.summary()
+    assert summary['pages']['samples'] == len(data)
+    assert {spotter_id for spotter_id, _ in collector.pages()} == {'SPOT-0001', 'SPOT-0002'}
+    assert summary['stages']['sort']['items'] == len(data)
+    assert summary['endpoints']['wave-data']['mean_queue_wait'] is not None
+
+
+def test_paginated_search_is_one_endpoint():
+    pages = [_response(200, {'data': [{'id': 1}], 'metadata': {'page': {
+                 'hasMoreData': True, 'nextPage': 'http://localhost/api/search?shape=circle&cursor=1'}}}),
+             _response(200, {'data': [{'id': 2}], 'metadata': {'page': {
+                 'hasMoreData': True, 'nextPage': 'http://localhost/api/search?shape=circle&cursor=2'}}}),
+             _response(200, {'data': [{'id': 3}], 'metadata': {'page': {'hasMoreData': False}}})]
+
+    collector = MetricsCollector()
+    api = SofarApi(custom_token='token', hooks=collector)
+    api.http_session = MagicMock()
+    api.http_session.get.side_effect = pages
+
+    assert len(api.search('circle', [1, 2], '2021-01-01', '2021-01-02', radius=10)) == 3
+    assert list(collector.summary()['endpoints']) == ['search']
+    assert collector.summary()['endpoints']['search']['requests'] == 3
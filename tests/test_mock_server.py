@@ -0,0 +1,116 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the local mock of the Wave API, driven by the client
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pytest
+import time
+
+from benchmarks.mock_server import MockServer, SyntheticFleet
+from pysofar.sofar import CellularSignalMetricsQuery, SofarApi, WaveDataQuery
+from pysofar.throttle import RetryPolicy
+from pysofar.tools import iso_to_epoch_ms
+from pysofar.wavefleet_exceptions import QueryError
+
+ORIGIN = '2021-01-01T00:00:00.000Z'
+# the fleet has reported for three days
+NOW = iso_to_epoch_ms('2021-01-04T00:00:00.000Z') / 1000
+
+
+def _fleet(spotters=3):
+    return SyntheticFleet(spotters, origin=ORIGIN, clock=lambda: NOW)
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    servers = []
+
+    def _serve(fleet=None, **options):
+        server = MockServer(fleet or _fleet(), **options).start()
+        servers.append(server)
+        for name, value in server.environ().items():
+            monkeypatch.setenv(name, value)
+        return server
+
+    yield _serve
+
+    for server in servers:
+        server.stop()
+
+
+def test_wave_data_paging(serve):
+    serve()
+    api = SofarApi(custom_token='mock')
+
+    # two days of half hourly reports, the start date is exclusive and the end date inclusive
+    waves = api.get_wave_data('2021-01-01T12:00:00.000Z', '2021-01-03T12:00:00.000Z')['waves']
+    assert len(waves) == 3 * 96
+    assert sorted(sample['spotterId'] for sample in waves) == sorted(['SPOT-0000', 'SPOT-0001', 'SPOT-0002'] * 96)
+    assert [iso_to_epoch_ms(sample['timestamp']) for sample in waves] == \
+        sorted(iso_to_epoch_ms(sample['timestamp']) for sample in waves)
+
+    # pages of frequency data hold at most 100 spectra, and all reports end at the clock of the fleet
+    query = WaveDataQuery('SPOT-0001', limit=500, start_date=ORIGIN, end_date='2022-01-01', api=api)
+    query.frequency(True)
+    query.directional_moments(True)
+    assert len(query.execute()['frequencyData']) == 100
+    assert len(api.get_frequency_data(ORIGIN, '2022-01-01')['frequency']) == 3 * 144
+
+
+def test_search_pages(serve):
+    server = serve()
+    api = SofarApi(custom_token='mock')
+
+    results = api.search('envelope', [(-160, 20), (-120, 50)], ORIGIN, '2021-01-02T00:00:00.000Z', page_size=50)
+    assert len(results) == 3 * 48
+    assert len({(sample['spotterId'], sample['timestamp']) for sample in results}) == len(results)
+    assert server.stats()['requests']['search'] == 3
+
+    # only the Spotters within the circle
+    latitude, longitude = server.fleet.homes[1]
+    results = api.search('circle', [longitude, latitude], ORIGIN, '2021-01-02T00:00:00.000Z', radius=1000)
+    assert {sample['spotterId'] for sample in results} == {'SPOT-0001'}
+
+
+def test_fleet_endpoints(serve):
+    serve()
+    api = SofarApi(custom_token='mock')
+
+    spotters = api.get_spotters()
+    assert [spotter.id for spotter in spotters] == api.device_ids == ['SPOT-0000', 'SPOT-0001', 'SPOT-0002']
+    assert all(spotter.timestamp is not None for spotter in spotters)
+    assert api.get_spotters(spotters) == spotters
+
+    assert api.update_spotter_name('SPOT-0001', 'renamed') == 'renamed'
+    assert api.get_latest_data('SPOT-0001')['spotterName'] == 'renamed'
+
+    metrics = CellularSignalMetricsQuery('SPOT-0002', limit=5, api=api).execute(return_raw=True)
+    assert len(metrics['data']) == 5
+    assert metrics['options']['limit'] == 5
+
+
+def test_throttling_and_errors(serve):
+    server = serve(rate_limit=5, burst=1)
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        time.sleep(seconds)
+
+    api = SofarApi(custom_token='mock', retry_policy=RetryPolicy(sleep=sleep))
+
+    api.get_latest_data('SPOT-0000')
+    api.get_latest_data('SPOT-0000')
+    assert 429 in server.stats()['statuses']
+    # the retry waited as long as the server asked for
+    assert len(sleeps) > 0 and 0 < sleeps[0] <= 0.2
+
+    serve(error_rate=1.0)
+    api = SofarApi(custom_token='mock', retry_policy=RetryPolicy(max_retries=0))
+    with pytest.raises(QueryError):
+        api.get_latest_data('SPOT-0000')
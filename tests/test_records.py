@@ -0,0 +1,89 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the compact record types
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pickle
+import pytest
+import sys
+
+from datetime import datetime, timedelta
+from pysofar.records import TrackPoint, WaveSample, to_records
+from pysofar.sofar import WaveDataQuery, worker_wrapper
+from pysofar.tools import parse_date
+from unittest.mock import patch
+
+SAMPLE = {'timestamp': '2021-01-01T00:00:00.000Z', 'significantWaveHeight': 1.2, 'peakPeriod': 9.5,
+          'latitude': 37.5, 'longitude': -122.5, 'processing_source': 'embedded'}
+
+SERIES = [parse_date(datetime(2021, 1, 1) + timedelta(minutes=30 * i)) for i in range(100)]
+
+
+def _wave(dkey, index, timestamp):
+    return dict(SAMPLE, timestamp=timestamp)
+
+
+def test_record_is_dict_compatible():
+    record = WaveSample(SAMPLE)
+
+    assert record == SAMPLE
+    assert dict(record) == SAMPLE
+    assert list(record) == list(SAMPLE)
+    assert len(record) == len(SAMPLE)
+    assert record['peakPeriod'] == record.peakPeriod == 9.5
+    assert record.get('meanPeriod') is None
+    assert 'meanPeriod' not in record
+
+    with pytest.raises(KeyError):
+        record['meanPeriod']
+
+    record['spotterId'] = 'SPOT-0001'
+    record['newField'] = 1
+    assert record['newField'] == 1
+    assert set(record) == set(SAMPLE) | {'spotterId', 'newField'}
+
+
+def test_record_pickles_and_is_small():
+    record = TrackPoint({'timestamp': '2021-01-01T00:00:00.000Z', 'latitude': 1.0, 'longitude': 2.0})
+
+    assert pickle.loads(pickle.dumps(record)) == record
+    assert not hasattr(record, '__dict__')
+    assert sys.getsizeof(WaveSample(SAMPLE)) < sys.getsizeof(dict(SAMPLE))
+
+
+def test_worker_records_match_dictionaries(fake_wave_data):
+    args = ('waves', ['SPOT-0001', 'SPOT-0002'], '2020-12-31', '2021-01-12', {'limit': 30})
+    with fake_wave_data({'waves': SERIES}, _wave).patch():
+        dictionaries = worker_wrapper(args)
+        records = worker_wrapper(args, as_records=True, time_shards=3)
+
+    assert records == dictionaries
+    assert all(isinstance(record, WaveSample) for record in records)
+
+
+def test_query_returns_records():
+    query = WaveDataQuery('SPOT-0001')
+    query.as_records(True)
+
+    with patch.object(WaveDataQuery, '_get', return_value=(200, {'data': {'spotterId': 'SPOT-0001',
+                                                                           'waves': [dict(SAMPLE)], 'track': []}})):
+        data = query.execute()
+
+    assert isinstance(data['waves'][0], WaveSample)
+    assert data['track'] == []
+    assert query.copy()._as_records
+
+
+def test_samples_are_replaced_in_place():
+    waves = [dict(SAMPLE), dict(SAMPLE)]
+    data = to_records({'waves': waves, 'track': [{'timestamp': SAMPLE['timestamp']}]})
+
+    # the page's list is reused, so each dictionary is released once its record replaces it
+    assert data['waves'] is waves
+    assert all(isinstance(sample, WaveSample) for sample in waves)
+    assert isinstance(data['track'][0], TrackPoint)
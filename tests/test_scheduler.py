@@ -0,0 +1,87 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the bounded scheduler shared by the api
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pytest
+import threading
+import time
+
+from pysofar.scheduler import Scheduler
+
+
+class Tracker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak = {}
+
+    def task(self, key):
+        with self.lock:
+            self.running[key] = self.running.get(key, 0) + 1
+            self.peak[key] = max(self.peak.get(key, 0), self.running[key])
+            total = sum(self.running.values())
+            self.peak['total'] = max(self.peak.get('total', 0), total)
+
+        time.sleep(0.005)
+
+        with self.lock:
+            self.running[key] -= 1
+        return key
+
+
+def test_global_and_endpoint_limits():
+    tracker = Tracker()
+    scheduler = Scheduler(max_concurrency=4, endpoint_limits={'latest-data': 1})
+
+    futures = [scheduler.submit(tracker.task, 'wave-data', endpoint='wave-data') for _ in range(20)]
+    futures += [scheduler.submit(tracker.task, 'latest-data', endpoint='latest-data') for _ in range(10)]
+    results = scheduler.wait(futures)
+    scheduler.shutdown()
+
+    assert results == ['wave-data'] * 20 + ['latest-data'] * 10
+    assert tracker.peak['total'] <= 4
+    assert tracker.peak['latest-data'] == 1
+
+
+def test_nested_map_does_not_deadlock():
+    # a single worker running a task that fans out more tasks runs them itself while waiting
+    scheduler = Scheduler(max_concurrency=1)
+
+    def outer(i):
+        return sum(scheduler.map(lambda j: i * j, range(5)))
+
+    assert scheduler.map(outer, range(4)) == [0, 10, 20, 30]
+    scheduler.shutdown()
+
+
+def test_exceptions_are_raised_on_wait():
+    scheduler = Scheduler(max_concurrency=2)
+
+    def fail(_):
+        raise ValueError('failed')
+
+    with pytest.raises(ValueError):
+        scheduler.map(fail, range(3))
+    scheduler.shutdown()
+
+
+def test_idle_workers_exit():
+    scheduler = Scheduler(max_concurrency=4, idle_timeout=0.05)
+
+    assert scheduler.map(lambda i: i * 2, range(8)) == [0, 2, 4, 6, 8, 10, 12, 14]
+    assert len(scheduler._threads) > 0
+
+    deadline = time.monotonic() + 5
+    while len(scheduler._threads) > 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert scheduler._threads == []
+
+    # workers are started again for new tasks
+    assert scheduler.map(lambda i: i + 1, range(3)) == [1, 2, 3]
+    scheduler.shutdown()
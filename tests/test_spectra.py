@@ -0,0 +1,75 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the stacked frequency spectra
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from datetime import datetime, timedelta
+from pysofar.sofar import spectra_worker_wrapper
+from pysofar.spectra import SpectralData
+from pysofar.tools import parse_date, to_epoch_ms
+
+FREQUENCY = [0.03 + 0.01 * i for i in range(39)]
+SERIES = [parse_date(datetime(2021, 1, 1) + timedelta(hours=i)) for i in range(60)]
+
+
+def _spectrum(ts, scale=1.0, frequency=FREQUENCY):
+    return {'timestamp': ts, 'frequency': list(frequency), 'df': [0.01] * len(frequency),
+            'varianceDensity': [scale * f for f in frequency], 'a1': [0.5] * len(frequency),
+            'b1': [-0.5] * len(frequency), 'latitude': 37.0, 'longitude': None}
+
+
+def _sample(dkey, index, timestamp):
+    return _spectrum(timestamp, index)
+
+
+def test_stack_spectra():
+    spectra = SpectralData.from_records([_spectrum(ts, i) for i, ts in enumerate(SERIES[:3])], 'SPOT-0001')
+
+    assert len(spectra) == 3
+    assert spectra['varianceDensity'].shape == (3, len(FREQUENCY))
+    assert spectra['varianceDensity'][2, 1] == pytest.approx(2 * FREQUENCY[1])
+    assert 'a2' not in spectra
+    assert spectra.timestamp[0] == to_epoch_ms(SERIES[0])
+    assert np.isnan(spectra.longitude).all()
+    assert np.allclose(spectra.df, 0.01)
+
+
+def test_differing_axis_is_interpolated():
+    shifted = [f + 0.005 for f in FREQUENCY]
+    records = [_spectrum(SERIES[0]), _spectrum(SERIES[1], frequency=shifted), _spectrum(SERIES[2])]
+
+    spectra = SpectralData.from_records(records)
+
+    assert np.allclose(spectra.frequency, FREQUENCY)
+    # the density is linear in the frequency, so is interpolated exactly within the shifted axis
+    assert spectra['varianceDensity'][1, 1] == pytest.approx(FREQUENCY[1])
+    assert np.isnan(spectra['varianceDensity'][1, 0])
+
+
+def test_samples_of_several_spotters_are_refused():
+    records = [dict(_spectrum(SERIES[0]), spotterId='SPOT-0001'), dict(_spectrum(SERIES[1]), spotterId='SPOT-0002')]
+
+    with pytest.raises(ValueError):
+        SpectralData.from_records(records)
+    assert SpectralData.from_records(records[:1]).spotter_id == 'SPOT-0001'
+
+
+def test_spectra_worker_stitches_shards(fake_wave_data):
+    args = (['SPOT-0001', 'SPOT-0002'], '2020-12-31', '2021-01-04', {'limit': 25})
+    with fake_wave_data({'frequencyData': SERIES}, _sample).patch():
+        spectra = spectra_worker_wrapper(args)
+        sharded = spectra_worker_wrapper(args, time_shards=4)
+
+    assert set(spectra) == {'SPOT-0001', 'SPOT-0002'}
+    assert len(spectra['SPOT-0001']) == len(SERIES)
+    assert np.array_equal(sharded['SPOT-0002'].timestamp, spectra['SPOT-0002'].timestamp)
+    assert np.array_equal(sharded['SPOT-0002']['varianceDensity'], spectra['SPOT-0002']['varianceDensity'])
@@ -0,0 +1,108 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the local data store and gap only fetching
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+from datetime import datetime, timedelta
+from pysofar import SofarConnection
+from pysofar.sofar import WaveDataQuery, worker_wrapper
+from pysofar.store import DataStore
+from pysofar.tools import parse_date
+from unittest.mock import patch
+
+SERIES = [parse_date(datetime(2021, 1, 1) + timedelta(minutes=30 * i)) for i in range(480)]
+
+
+def _wave(dkey, index, timestamp):
+    return {'timestamp': timestamp, 'significantWaveHeight': 1.0}
+
+
+def _api(store):
+    return SofarConnection(custom_token='token', store=store)
+
+
+def test_missing_periods(tmp_path):
+    store = DataStore(str(tmp_path / 'store.db'))
+    key = ('SPOT-0001', 'waves', '{}')
+
+    store.put(*key, [], '2021-01-02', '2021-01-03')
+    store.put(*key, [], '2021-01-05', '2021-01-06')
+    store.put(*key, [], '2021-01-03', '2021-01-04')
+
+    assert store.missing(*key, '2021-01-01', '2021-01-07') == [
+        ('2021-01-01T00:00:00.000Z', '2021-01-02T00:00:00.000Z'),
+        ('2021-01-04T00:00:00.000Z', '2021-01-05T00:00:00.000Z'),
+        ('2021-01-06T00:00:00.000Z', '2021-01-07T00:00:00.000Z'),
+    ]
+    assert store.missing(*key, '2021-01-02T06:00:00', '2021-01-04') == []
+
+
+def test_samples_are_keyed_by_timestamp(tmp_path):
+    store = DataStore(str(tmp_path / 'store.db'))
+    key = ('SPOT-0001', 'waves', '{}')
+
+    store.put(*key, [{'timestamp': '2021-01-01T01:00:00.000Z', 'significantWaveHeight': 1.0},
+                     {'timestamp': '2021-01-01T02:00:00Z', 'significantWaveHeight': 1.0}])
+    # a reprocessed sample replaces the stored one, whatever the format of its timestamp
+    store.put(*key, [{'timestamp': '2021-01-01T01:00:00.000+00:00', 'significantWaveHeight': 2.0}])
+
+    samples = store.get(*key, '2021-01-01T00:30:00.000Z', '2021-01-01T02:00:00.000Z')
+    assert [sample['significantWaveHeight'] for sample in samples] == [2.0, 1.0]
+
+
+def test_recent_periods_are_not_covered(tmp_path):
+    store = DataStore(str(tmp_path / 'store.db'), settle_seconds=3600)
+    key = ('SPOT-0001', 'waves', '{}')
+    now = datetime.utcnow()
+
+    store.put(*key, [], now - timedelta(days=1), now)
+    settled = parse_date(datetime.utcnow() - timedelta(seconds=3600))
+
+    gaps = store.missing(*key, now - timedelta(days=1), now)
+    assert len(gaps) == 1
+    assert gaps[0][0] <= settled
+
+
+def test_walk_only_fetches_gaps(tmp_path, fake_wave_data):
+    store = DataStore(str(tmp_path / 'store.db'))
+    api = _api(store)
+    args = ('waves', ['SPOT-0001'], '2020-12-31', '2021-01-05', {'limit': 50})
+    fake = fake_wave_data({'waves': SERIES}, _wave)
+    calls = fake.calls
+
+    with fake.patch(), patch.object(WaveDataQuery, 'http_session'):
+        first = worker_wrapper(args, api=api)
+        first_calls = len(calls)
+
+        calls.clear()
+        second = worker_wrapper(args, api=api)
+        assert calls == []
+
+        # a longer period only requests the new part
+        calls.clear()
+        longer = worker_wrapper(('waves', ['SPOT-0001'], '2020-12-31', '2021-01-08', {'limit': 50}), api=api)
+
+    assert first_calls > 0
+    assert second == first
+    assert longer[:len(first)] == first
+    assert all(start >= '2021-01-05' for start, _ in calls)
+    assert longer[-1]['spotterId'] == 'SPOT-0001'
+
+
+def test_query_served_from_store(tmp_path, fake_wave_data):
+    store = DataStore(str(tmp_path / 'store.db'))
+    query = WaveDataQuery('SPOT-0001', limit=10, start_date='2021-01-01', end_date='2021-01-02', api=_api(store))
+    page = fake_wave_data({'waves': SERIES}, _wave)(query)
+
+    with patch.object(WaveDataQuery, '_get', return_value=(200, {'data': page})) as mock_get:
+        first = query.execute()
+        second = query.execute()
+
+    # only the first page was requested, the same page is then complete in the store
+    assert mock_get.call_count == 1
+    assert second['waves'] == first['waves']
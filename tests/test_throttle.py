@@ -0,0 +1,129 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for rate limiting and retries of requests
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import json
+import pytest
+import requests
+
+from pysofar import SofarConnection
+from pysofar.throttle import RetryPolicy, TokenBucket, parse_retry_after
+from unittest.mock import MagicMock
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _response(status, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    response.content = json.dumps({'data': status}).encode()
+    return response
+
+
+def _connection(responses, **kwargs):
+    conn = SofarConnection(custom_token='token', **kwargs)
+    conn.http_session = MagicMock()
+    conn.http_session.get.side_effect = responses
+    return conn
+
+
+def test_token_bucket_paces_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(12):
+        bucket.acquire()
+
+    # the burst of 2 goes through immediately, the other 10 requests take a second
+    assert clock.now == pytest.approx(1.0)
+
+
+def test_token_bucket_pause():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, clock=clock, sleep=clock.sleep)
+
+    bucket.pause(5)
+    bucket.acquire()
+
+    assert clock.now == pytest.approx(5)
+
+
+def test_token_bucket_reserve_does_not_wait():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=1, clock=clock, sleep=clock.sleep)
+
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1)
+    assert bucket.reserve() == pytest.approx(0.2)
+    assert clock.now == 0
+
+
+def test_retry_honours_retry_after():
+    sleeps = []
+    conn = _connection([_response(429, {'Retry-After': '3'}), _response(503), _response(200)],
+                       retry_policy=RetryPolicy(backoff_factor=0.1, sleep=sleeps.append))
+
+    status, data = conn._get('wave-data')
+
+    assert status == 200
+    assert conn.http_session.get.call_count == 3
+    assert sleeps[0] == 3
+    assert 0 <= sleeps[1] <= 0.2
+
+
+def test_retry_connection_errors():
+    conn = _connection([requests.ConnectionError(), _response(200)], retry_policy=RetryPolicy(sleep=lambda _: None))
+
+    assert conn._get('wave-data')[0] == 200
+
+
+def test_retries_exhausted():
+    conn = _connection([_response(500)] * 3, retry_policy=RetryPolicy(max_retries=2, sleep=lambda _: None))
+
+    assert conn._get('wave-data')[0] == 500
+    assert conn.http_session.get.call_count == 3
+
+
+def test_client_errors_are_not_retried():
+    conn = _connection([_response(400)], retry_policy=RetryPolicy(sleep=lambda _: None))
+
+    assert conn._get('wave-data')[0] == 400
+    assert conn.http_session.get.call_count == 1
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('2.5') == 2.5
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+
+def test_custom_decoder():
+    decoded = []
+
+    def decoder(content):
+        decoded.append(content)
+        return json.loads(content)
+
+    conn = _connection([_response(200)], decoder=decoder)
+
+    assert conn._get('wave-data') == (200, {'data': 200})
+    assert decoded == [b'{"data": 200}']
@@ -0,0 +1,83 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for time sharded pagination of wave data queries
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+from datetime import datetime, timedelta
+from pysofar.sofar import SofarApi, WaveDataQuery, merged_worker_wrapper, worker_wrapper, _stitch
+from pysofar.tools import parse_date
+
+import pytest
+
+# half hourly samples over 10 days
+SERIES = [parse_date(datetime(2021, 1, 1) + timedelta(minutes=30 * i)) for i in range(480)]
+
+
+def test_shards_cover_period():
+    query = WaveDataQuery('SPOT-0001', start_date='2021-01-01', end_date='2021-01-11')
+    shards = query.shards(4)
+
+    assert len(shards) == 4
+    assert shards[0].start_date == '2021-01-01T00:00:00.000Z'
+    assert shards[-1].end_date == '2021-01-11T00:00:00.000Z'
+    assert all(a.end_date == b.start_date for a, b in zip(shards, shards[1:]))
+    assert all(shard.http_session is query.http_session for shard in shards)
+
+
+def test_unbounded_query_is_not_sharded():
+    query = WaveDataQuery('SPOT-0001')
+
+    assert query.shards(4) == [query]
+
+
+def test_sharded_matches_sequential(fake_wave_data):
+    args = ('waves', ['SPOT-0001', 'SPOT-0002'], '2020-12-31', '2021-01-12', {'limit': 50})
+    with fake_wave_data({'waves': SERIES}).patch():
+        sequential = worker_wrapper(args)
+        sharded = worker_wrapper(args, time_shards=7)
+
+    assert len(sequential) == 2 * len(SERIES)
+    assert sharded == sequential
+
+
+def test_stitch_drops_boundary_duplicates_only():
+    a, b, c = '2021-01-01T00:00:00.000Z', '2021-01-01T00:30:00.000Z', '2021-01-01T01:00:00.000Z'
+    first = [{'timestamp': a, 'v': 1}, {'timestamp': b, 'v': 1}, {'timestamp': b, 'v': 2}]
+    second = [{'timestamp': b, 'v': 2}, {'timestamp': b, 'v': 3}, {'timestamp': c, 'v': 1}]
+
+    stitched = _stitch([first, second])
+
+    assert stitched == first + second[1:]
+
+    # a chunk entirely at the boundary timestamp moves it forward with its new samples only
+    third = [{'timestamp': c, 'v': 1}, {'timestamp': c, 'v': 2}]
+    fourth = [{'timestamp': c, 'v': 1}, {'timestamp': c, 'v': 2}, {'timestamp': c, 'v': 3}]
+
+    assert _stitch([second, third, fourth]) == second + third[1:] + fourth[2:]
+
+
+def test_merged_generator_matches_sorted_list(fake_wave_data):
+    args = ('waves', ['SPOT-0001', 'SPOT-0002', 'SPOT-0003'], '2020-12-31', '2021-01-12', {'limit': 50})
+    with fake_wave_data({'waves': SERIES}).patch():
+        records = worker_wrapper(args)
+        merged = merged_worker_wrapper(args)
+        first = next(merged)
+        streamed = [first] + list(merged)
+        sharded = list(merged_worker_wrapper(args, time_shards=4))
+
+    assert streamed == records
+    assert sharded == records
+
+
+def test_generator_rejects_combined_and_arrays():
+    api = SofarApi(custom_token='token')
+    api.devices = [{'spotterId': 'SPOT-0001'}]
+
+    for options in ({'combined': True}, {'as_arrays': True}):
+        with pytest.raises(ValueError):
+            api.get_all_data('2020-12-31', '2021-01-12', return_generator=True, **options)
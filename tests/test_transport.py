@@ -0,0 +1,159 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the transports sending the requests of a connection
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import pytest
+
+from benchmarks.mock_server import MockServer, SyntheticFleet
+from pysofar import SofarConnection
+from pysofar.metrics import MetricsCollector
+from pysofar.sofar import SofarApi, WaveDataQuery
+from pysofar.throttle import RetryPolicy
+from pysofar.tools import iso_to_epoch_ms
+from pysofar.transport import DEFAULT_TIMEOUT, RecordingTransport, ReplayTransport, RequestsTransport, Response, \
+    Transport, request_key
+from pysofar.wavefleet_exceptions import QueryError
+from unittest.mock import MagicMock
+
+WAVES = {'data': {'spotterId': 'SPOT-0001', 'waves': [{'timestamp': '2021-01-01T00:30:00.000Z'}]}}
+
+
+def test_post_requests_use_post():
+    conn = SofarConnection(custom_token='token')
+    conn.http_session = MagicMock()
+    conn.http_session.request.return_value.status_code = 200
+    conn.http_session.request.return_value.content = b'{"message": "updated"}'
+
+    assert conn._post('change-name', {'spotterId': 'SPOT-0001', 'name': 'renamed'}) == (200, {'message': 'updated'})
+    assert conn.http_session.get.call_count == 0
+
+    method, url = conn.http_session.request.call_args[0]
+    assert method == 'POST' and url.endswith('/change-name')
+    assert conn.http_session.request.call_args[1]['json'] == {'spotterId': 'SPOT-0001', 'name': 'renamed'}
+    assert conn.http_session.request.call_args[1]['timeout'] == DEFAULT_TIMEOUT
+
+
+def test_requests_transport_timeout():
+    transport = RequestsTransport(MagicMock(), timeout=5)
+    transport.request('GET', 'http://localhost/api/wave-data', {}, params={'spotterId': 'SPOT-0001'})
+
+    assert transport.session.get.call_args[1]['timeout'] == 5
+
+
+def test_default_transport_follows_session():
+    conn = SofarConnection(custom_token='token')
+    assert isinstance(conn.transport, RequestsTransport)
+    assert conn.transport.session is conn.http_session
+
+    conn.http_session = MagicMock()
+    assert conn.transport.session is conn.http_session
+
+
+class Dropped(Exception):
+    pass
+
+
+class FlakyTransport(Transport):
+    # fails without a response with an exception of its own, a number of times
+    errors = (Dropped,)
+
+    def __init__(self, failures, error=Dropped):
+        self.failures = failures
+        self.error = error
+
+    def request(self, method, url, headers, params=None, json=None):
+        if self.failures > 0:
+            self.failures -= 1
+            raise self.error('dropped')
+        return Response(200, b'{"data": {"spotterId": "SPOT-0001"}}', {})
+
+
+def test_transport_errors_are_retried_and_reported():
+    with pytest.raises(TypeError):
+        Transport()
+
+    collector = MetricsCollector()
+    retry_policy = RetryPolicy(max_retries=2, sleep=lambda seconds: None)
+
+    api = SofarApi(custom_token='token', transport=FlakyTransport(2), retry_policy=retry_policy, hooks=collector)
+    assert api.get_latest_data('SPOT-0001')['spotterId'] == 'SPOT-0001'
+
+    api = SofarApi(custom_token='token', transport=FlakyTransport(3), retry_policy=retry_policy, hooks=collector)
+    with pytest.raises(Dropped):
+        api.get_latest_data('SPOT-0001')
+
+    # errors which are not the transport's are not retried, but still reported
+    api = SofarApi(custom_token='token', transport=FlakyTransport(1, KeyError), retry_policy=retry_policy,
+                   hooks=collector)
+    with pytest.raises(KeyError):
+        api.get_latest_data('SPOT-0001')
+
+    stats = collector.summary()['endpoints']['latest-data']
+    assert stats['requests'] == 3
+    assert stats['retries'] == 4
+    assert stats['errors'] == 2
+
+
+def test_request_key():
+    # independent of the host, duplicate slashes and the order of the parameters
+    assert request_key('GET', 'https://api.sofarocean.com/api//latest-data', {'b': 1, 'a': 'x', 'c': None}) == \
+        request_key('GET', 'http://127.0.0.1/api/latest-data?a=x', {'b': '1'}) == 'GET /api/latest-data?a=x&b=1'
+
+
+def test_replay_transport():
+    replay = ReplayTransport()
+    params = {'spotterId': 'SPOT-0001', 'limit': 20}
+    replay.add('GET', '/api/latest-data', {'data': {'spotterId': 'SPOT-0001', 'value': 1}}, params=params)
+    replay.add('GET', '/api/latest-data', {'data': {'spotterId': 'SPOT-0001', 'value': 2}}, params=params)
+
+    api = SofarApi(custom_token='token', transport=replay)
+    query = WaveDataQuery('SPOT-0001', api=api)
+    assert query.transport is replay
+
+    # repeated requests are answered in order, repeating the last response
+    assert [api._get('latest-data', params)[1]['data']['value'] for _ in range(3)] == [1, 2, 2]
+
+    with pytest.raises(QueryError, match='No recorded response'):
+        query.execute()
+
+
+def test_record_and_replay(tmp_path, monkeypatch):
+    fleet = SyntheticFleet(3, origin='2021-01-01T00:00:00.000Z',
+                           clock=lambda: iso_to_epoch_ms('2021-01-03T00:00:00.000Z') / 1000)
+    path = str(tmp_path / 'responses.json.gz')
+
+    with MockServer(fleet) as server:
+        for name, value in server.environ().items():
+            monkeypatch.setenv(name, value)
+
+        recorder = RecordingTransport()
+        waves = SofarApi(custom_token='token', transport=recorder).get_wave_data('2021-01-01', '2021-01-02')
+        recorder.save(path)
+
+    # the same walk is answered from the recorded responses, without the server
+    replay = ReplayTransport.load(path)
+    assert SofarApi(custom_token='token', transport=replay).get_wave_data('2021-01-01', '2021-01-02') == waves
+    assert len(waves['waves']) == 3 * 48
+    assert sorted(replay.requests) == sorted(recording['request'] for recording in recorder.recordings)
+
+
+def test_httpx_transport(monkeypatch):
+    pytest.importorskip('httpx')
+    from pysofar.transport import HttpxTransport
+
+    with MockServer(SyntheticFleet(2)) as server:
+        for name, value in server.environ().items():
+            monkeypatch.setenv(name, value)
+
+        # the mock server speaks HTTP/1.1 only
+        transport = HttpxTransport(http2=False)
+        api = SofarApi(custom_token='token', transport=transport)
+        assert api.device_ids == ['SPOT-0000', 'SPOT-0001']
+        assert api.update_spotter_name('SPOT-0001', 'renamed') == 'renamed'
+        transport.close()
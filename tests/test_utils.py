@@ -9,7 +9,10 @@ Sofar Ocean Technologies
 Authors: Mike Sosa
 """
 from datetime import datetime
-from pysofar.tools import parse_date, time_stamp_to_epoch
+from pysofar.tools import epoch_ms_to_iso, iso_to_epoch_ms, parse_date, time_stamp_to_epoch, to_datetime, \
+    to_epoch_ms
+
+import pytest
 
 
 def test_time_stamp_to_epoch():
@@ -92,3 +95,31 @@ def test_parse_date_datetime_unaware():
     dt = parse_date(ts)
 
     assert dt is not None
+
+
+@pytest.mark.parametrize('ts', ['1985-11-15T12:34:56.789Z', '1985-11-15T12:34:56Z', '1969-12-31T23:59:59.999Z',
+                                '2000-02-29T00:00:00.000Z', '2400-12-31T23:00:00.001Z'])
+def test_iso_to_epoch_ms_fast_path(ts):
+    # the integer arithmetic agrees with parsing through datetime
+    dt = datetime.strptime(ts.replace('Z', '.000Z') if '.' not in ts else ts, '%Y-%m-%dT%H:%M:%S.%fZ')
+    expected = round((dt - datetime(1970, 1, 1)).total_seconds() * 1000)
+
+    assert iso_to_epoch_ms(ts) == expected
+    assert epoch_ms_to_iso(expected) == parse_date(ts)
+
+
+def test_iso_to_epoch_ms_other_formats():
+    assert iso_to_epoch_ms('1985-11-15') == to_epoch_ms(datetime(1985, 11, 15))
+    assert iso_to_epoch_ms('1985-11-15T12:34:56.000+00:00') == iso_to_epoch_ms('1985-11-15T12:34:56.000Z')
+
+
+def test_invalid_dates_are_rejected():
+    with pytest.raises(ValueError):
+        parse_date('2021-02-29T00:00:00.000Z')
+    with pytest.raises(ValueError):
+        iso_to_epoch_ms('2021-13-01T00:00:00.000Z')
+
+
+def test_to_datetime_truncates_to_milliseconds():
+    assert to_datetime(datetime(2021, 1, 1, 0, 0, 0, 123456)) == datetime(2021, 1, 1, 0, 0, 0, 123000)
+    assert to_datetime('2021-01-01T00:00:00.123Z') == datetime(2021, 1, 1, 0, 0, 0, 123000)
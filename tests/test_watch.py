@@ -0,0 +1,151 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for watching the latest data of Spotters
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+from itertools import islice
+from pysofar.sofar import SofarApi
+from pysofar.spotter import Spotter
+from pysofar.tools import epoch_ms_to_iso
+from pysofar.wavefleet_exceptions import QueryError
+
+import pytest
+import threading
+
+START = 1609459200.0  # 2021-01-01T00:00:00Z
+
+
+class FakeFleet:
+    """
+    Spotters reporting on their own cadence (in seconds), each report arriving 30 seconds after its timestamp
+    """
+    def __init__(self, cadences: dict, now: float, silent_after: float = None):
+        self.cadences = cadences
+        self.now = now
+        self.silent_after = silent_after
+        self.polls = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def get_latest_data(self, spotter_id, **options):
+        self.polls.append((spotter_id, self.now))
+        cadence = self.cadences[spotter_id]
+
+        # the last 3 reports which have arrived by now
+        last = int((min(self.now - 30, self.silent_after or self.now) - START) // cadence)
+        waves = [{'timestamp': epoch_ms_to_iso(int((START + i * cadence) * 1000)), 'significantWaveHeight': i}
+                 for i in range(last - 2, last + 1)]
+        return {'spotterId': spotter_id, 'waves': waves, 'track': []}
+
+
+def test_watch_follows_cadence():
+    fleet = FakeFleet({'SPOT-0001': 1800, 'SPOT-0002': 600}, START + 24 * 3600)
+    api = SofarApi(custom_token='token')
+    api.get_latest_data = fleet.get_latest_data
+
+    updates = list(api.watch(['SPOT-0001', 'SPOT-0002'], timeout=6 * 3600, delay=60, clock=fleet.clock,
+                             sleep=fleet.sleep))
+
+    # every report after the first poll is yielded exactly once, in order per Spotter
+    for spotter_id, cadence in fleet.cadences.items():
+        heights = [sample['significantWaveHeight'] for update in updates if update['spotterId'] == spotter_id
+                   for sample in update['waves']]
+        first = 24 * 3600 // cadence
+        assert heights == list(range(first, first + len(heights)))
+        assert len(heights) >= 6 * 3600 // cadence - 1
+
+    # one poll per report, plus the first
+    polls = [spotter_id for spotter_id, _ in fleet.polls]
+    assert polls.count('SPOT-0001') <= 6 * 3600 // 1800 + 2
+    assert polls.count('SPOT-0002') <= 6 * 3600 // 600 + 2
+
+
+def test_watch_backs_off_without_reports():
+    # the Spotter stopped reporting after its report at 00:50, the next one is expected at 01:00
+    fleet = FakeFleet({'SPOT-0001': 600}, START + 3600, silent_after=START + 3000)
+    spotter = Spotter('SPOT-0001', 'one', SofarApi(custom_token='token'))
+    spotter.session.get_latest_data = fleet.get_latest_data
+
+    assert list(spotter.watch(timeout=3 * 3600, min_interval=60, max_interval=1800, delay=60, clock=fleet.clock,
+                              sleep=fleet.sleep)) == []
+
+    intervals = [b - a for (_, a), (_, b) in zip(fleet.polls, fleet.polls[1:])]
+    assert intervals[:5] == [60, 120, 240, 480, 960]
+    assert intervals[-1] == 1800
+
+
+def test_watch_polls_rare_reporters_at_max_interval():
+    fleet = FakeFleet({'SPOT-0001': 24 * 3600}, START + 3600)
+    api = SofarApi(custom_token='token')
+    api.get_latest_data = fleet.get_latest_data
+
+    assert list(api.watch(['SPOT-0001'], timeout=3 * 3600, max_interval=1800, clock=fleet.clock,
+                          sleep=fleet.sleep)) == []
+
+    intervals = [b - a for (_, a), (_, b) in zip(fleet.polls, fleet.polls[1:])]
+    assert intervals == [1800] * 6
+
+
+def test_watch_initial_samples():
+    fleet = FakeFleet({'SPOT-0001': 1800}, START + 3 * 3600)
+    api = SofarApi(custom_token='token')
+    api.get_latest_data = fleet.get_latest_data
+
+    first = next(islice(api.watch(['SPOT-0001'], initial=True, clock=fleet.clock, sleep=fleet.sleep), 1))
+
+    assert [sample['significantWaveHeight'] for sample in first['waves']] == [3, 4, 5]
+
+
+def test_watch_polls_due_spotters_concurrently():
+    fleet = FakeFleet({'SPOT-0001': 1800, 'SPOT-0002': 1800}, START + 3 * 3600)
+    api = SofarApi(custom_token='token')
+
+    # the first poll of each Spotter only returns once the other one is being polled as well
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_latest_data(spotter_id, **options):
+        if len(fleet.polls) < 2:
+            barrier.wait()
+        return fleet.get_latest_data(spotter_id, **options)
+
+    api.get_latest_data = get_latest_data
+
+    first = next(api.watch(['SPOT-0001', 'SPOT-0002'], initial=True, clock=fleet.clock, sleep=fleet.sleep))
+
+    assert first['spotterId'] == 'SPOT-0001'
+    assert not barrier.broken
+
+
+def test_watch_backs_off_failing_spotter():
+    fleet = FakeFleet({'SPOT-0001': 600, 'SPOT-0002': 600}, START + 3600)
+    api = SofarApi(custom_token='token')
+
+    def get_latest_data(spotter_id, **options):
+        if spotter_id == 'SPOT-0002' and len([poll for poll in fleet.polls if poll[0] == spotter_id]) < 3:
+            fleet.polls.append((spotter_id, fleet.now))
+            raise QueryError('unavailable')
+        return fleet.get_latest_data(spotter_id, **options)
+
+    api.get_latest_data = get_latest_data
+
+    with pytest.warns(UserWarning, match='SPOT-0002'):
+        updates = list(api.watch(['SPOT-0001', 'SPOT-0002'], timeout=2 * 3600, min_interval=60, clock=fleet.clock,
+                                 sleep=fleet.sleep))
+
+    # the other Spotter keeps being polled on its cadence
+    assert len([update for update in updates if update['spotterId'] == 'SPOT-0001']) >= 2 * 3600 // 600 - 1
+
+    # while the failing one backs off, then recovers
+    polls = [now for spotter_id, now in fleet.polls if spotter_id == 'SPOT-0002']
+    intervals = [b - a for a, b in zip(polls, polls[1:])]
+    assert intervals[:3] == [120, 240, 480]
+    assert any(update['spotterId'] == 'SPOT-0002' for update in updates)
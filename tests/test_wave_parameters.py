@@ -0,0 +1,77 @@
+"""
+This file is part of pysofar: A client for interfacing with Sofar Oceans Spotter API
+
+Contents: Tests for the vectorized bulk wave parameters
+
+Copyright (C) 2019
+Sofar Ocean Technologies
+
+Authors: Mike Sosa
+"""
+import math
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from pysofar.wave_parameters import bulk_parameters
+
+FREQUENCY = [0.05 + 0.01 * i for i in range(30)]
+
+
+def _spectrum(peak_index, height, coming_from, spotter_id=None):
+    # a single bin holding all of the energy, with waves coming from the given nautical direction
+    density = [0.0] * len(FREQUENCY)
+    density[peak_index] = (height / 4) ** 2 / 0.01
+    angle = math.radians(270 - coming_from)
+    return {'timestamp': '2021-01-01T00:00:00.000Z', 'frequency': FREQUENCY, 'df': [0.01] * len(FREQUENCY),
+            'varianceDensity': density, 'a1': [0.9 * math.cos(angle)] * len(FREQUENCY),
+            'b1': [0.9 * math.sin(angle)] * len(FREQUENCY), 'spotterId': spotter_id}
+
+
+def test_single_bin_spectra():
+    parameters = bulk_parameters([_spectrum(5, 2.0, 45.0), _spectrum(10, 1.0, 300.0)])
+
+    assert parameters['significantWaveHeight'] == pytest.approx([2.0, 1.0])
+    assert parameters['peakPeriod'] == pytest.approx([1 / FREQUENCY[5], 1 / FREQUENCY[10]])
+    assert parameters['meanPeriod'] == pytest.approx([1 / FREQUENCY[5], 1 / FREQUENCY[10]])
+    assert parameters['meanDirection'] == pytest.approx([45.0, 300.0])
+    assert parameters['peakDirection'] == pytest.approx([45.0, 300.0])
+    assert parameters['meanDirectionalSpread'] == pytest.approx([math.degrees(math.sqrt(0.2))] * 2)
+
+
+def test_mixed_spotters_and_missing_sample():
+    missing = {'timestamp': '2021-01-01T00:30:00.000Z', 'spotterId': 'SPOT-0002', 'frequency': []}
+    # the second Spotter reports on a coarser frequency axis
+    coarse = dict(_spectrum(10, 1.0, 300.0, 'SPOT-0002'), frequency=FREQUENCY[::2], df=[0.02] * 15)
+    coarse['varianceDensity'] = [0.0] * 15
+    coarse['varianceDensity'][5] = (1.0 / 4) ** 2 / 0.02
+    coarse['a1'], coarse['b1'] = coarse['a1'][::2], coarse['b1'][::2]
+
+    parameters = bulk_parameters([_spectrum(5, 2.0, 45.0, 'SPOT-0001'), missing, coarse])
+
+    assert len(parameters) == 3
+    assert parameters.labels('spotterId').tolist() == ['SPOT-0001', 'SPOT-0002', 'SPOT-0002']
+    assert parameters['significantWaveHeight'][[0, 2]] == pytest.approx([2.0, 1.0])
+    assert np.isnan(parameters['significantWaveHeight'][1])
+    assert parameters['peakPeriod'][2] == pytest.approx(1 / FREQUENCY[10])
+
+
+def test_frequency_band_and_empty_spectra():
+    flat = {'timestamp': '2021-01-01T00:00:00.000Z', 'frequency': FREQUENCY, 'df': [0.01] * len(FREQUENCY),
+            'varianceDensity': [1.0] * len(FREQUENCY)}
+    empty = dict(flat, varianceDensity=[0.0] * len(FREQUENCY))
+
+    parameters = bulk_parameters([flat, empty], fmax=0.1)
+
+    assert parameters['significantWaveHeight'][0] == pytest.approx(4 * math.sqrt(0.06))
+    assert np.isnan(parameters['significantWaveHeight'][1])
+    assert 'meanDirection' not in parameters
+    assert len(bulk_parameters([])) == 0
+
+
+def test_band_without_frequencies():
+    parameters = bulk_parameters([_spectrum(5, 2.0, 45.0), _spectrum(10, 1.0, 300.0)], fmin=1.0, fmax=2.0)
+
+    assert len(parameters) == 2
+    for name in ('significantWaveHeight', 'peakPeriod', 'meanPeriod', 'meanDirection', 'peakDirectionalSpread'):
+        assert np.isnan(parameters[name]).all()